@@ -105,10 +105,9 @@ class DuplicateFinder:
             # Prepare results
             results = []
 
-            # For each pending item, search for similar items
+            # Collect every pending vector first so FAISS is queried in one batch
+            queued = []
             for pending_item in all_pending:
-                print(f"Searching for duplicates for {pending_item.__class__.__name__} {pending_item.id}...")
-
                 # Get embedding for this pending item
                 pending_emb = session.query(Embedding).filter(
                     Embedding.entity_id == pending_item.id,
@@ -119,28 +118,22 @@ class DuplicateFinder:
                     print(f"  ⚠️  No embedding found for {pending_item.id}, skipping")
                     continue
 
-                # Convert embedding vector
-                pending_vector = emb_repo.to_numpy(pending_emb)
-
-                # Search in FAISS
-                # If compare_pending is True, only compare to other pending items
-                # Otherwise compare to all non-pending items (synced/rejected)
-                if compare_pending:
-                    # For pending vs pending comparison, search with full index but filter results later
-                    distances, indices = faiss_manager.search(pending_vector.reshape(1, -1), limit * 2)  # Search more to have pending items
-                else:
-                    # Search all and then filter based on status
-                    distances, indices = faiss_manager.search(pending_vector.reshape(1, -1), limit * 2)  # Search more to filter later
-
-                # Handle potential shape issues with FAISS results
-                # FAISS may return 1D arrays that need to be treated as 2D
-                if len(distances.shape) == 1:
-                    distances = distances.reshape(1, -1)
-                    indices = indices.reshape(1, -1)
+                queued.append((pending_item, emb_repo.to_numpy(pending_emb)))
+
+            if queued:
+                # Search more than limit so enough hits survive the filters below:
+                # pending vs pending when compare_pending, otherwise non-pending only
+                query_matrix = np.vstack([vector for _, vector in queued]).astype(np.float32)
+                all_distances, all_indices = faiss_manager.search_batch(query_matrix, limit * 2)
+
+            # For each pending item, walk its similar items
+            for row, (pending_item, _) in enumerate(queued):
+                print(f"Searching for duplicates for {pending_item.__class__.__name__} {pending_item.id}...")
+                distances, indices = all_distances[row], all_indices[row]
 
                 # Get the results and filter based on sync_status if not comparing pending
                 added = 0
-                for dist, idx in zip(distances[0], indices[0]):
+                for dist, idx in zip(distances, indices):
                     if added >= limit:  # Only take top limit results after filtering
                         break
 
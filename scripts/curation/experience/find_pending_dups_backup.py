@@ -235,10 +235,10 @@ def find_duplicates(
         # Prepare results
         results = []
         
-        # For each pending item, search for similar items
+        # Collect every pending vector first so FAISS is queried in one batch
+        import numpy as np
+        queued = []
         for pending_item in all_pending:
-            print(f"Searching for duplicates for {pending_item.__class__.__name__} {pending_item.id}...")
-            
             # Get embedding for this pending item
             pending_emb = session.query(Embedding).filter(
                 Embedding.entity_id == pending_item.id,
@@ -249,27 +249,26 @@ def find_duplicates(
                 print(f"  ⚠️  No embedding found for {pending_item.id}, skipping")
                 continue
             
-            # Convert embedding vector
-            import numpy as np
-            pending_vector = emb_repo.to_numpy(pending_emb)
-            
-            # Search in FAISS
-            # If compare_pending is True, only compare to other pending items
-            # Otherwise compare to all non-pending items (synced/rejected)
-            if compare_pending:
-                # For pending vs pending comparison, search with full index but filter results later
-                distances, indices = faiss_manager.search(pending_vector.reshape(1, -1), limit * 2)  # Search more to have pending items
-            else:
-                # Search all and then filter based on status
-                distances, indices = faiss_manager.search(pending_vector.reshape(1, -1), limit * 2)  # Search more to filter later
+            queued.append((pending_item, emb_repo.to_numpy(pending_emb)))
+        
+        if queued:
+            # Search more than limit so enough hits survive the filters below:
+            # pending vs pending when compare_pending, otherwise non-pending only
+            query_matrix = np.vstack([vector for _, vector in queued]).astype(np.float32)
+            all_distances, all_indices = faiss_manager.search_batch(query_matrix, limit * 2)
+        
+        # For each pending item, walk its similar items
+        for row, (pending_item, _) in enumerate(queued):
+            print(f"Searching for duplicates for {pending_item.__class__.__name__} {pending_item.id}...")
+            distances, indices = all_distances[row], all_indices[row]
             
             # Get the results and filter based on sync_status if not comparing pending
-            for i, (dist, idx) in enumerate(zip(distances[0], indices[0])):
+            for i, (dist, idx) in enumerate(zip(distances, indices)):
                 if i >= limit:  # Only take top limit results
                     break
                     
                 # Get the entity_id from the FAISS metadata
-                faiss_meta = session.query(FAISSMetadata).filter(FAISSMetadata.internal_id == idx).first()
+                faiss_meta = session.query(FAISSMetadata).filter(FAISSMetadata.internal_id == int(idx)).first()
                 if not faiss_meta or faiss_meta.deleted:
                     continue
                 
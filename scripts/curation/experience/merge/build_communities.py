@@ -45,6 +45,9 @@ from src.common.config.config import get_config  # noqa: E402
 from src.common.storage.repository import EmbeddingRepository  # noqa: E402
 from src.common.storage.schema import Embedding, Experience, FAISSMetadata  # noqa: E402
 
+# Query rows per FAISS search call when building neighbor lists.
+SEARCH_BATCH_SIZE = 1024
+
 
 @dataclass(frozen=True)
 class Item:
@@ -183,15 +186,9 @@ def build_neighbors(
     search_k = max(top_k * 2, top_k + 10)
     neighbors: List[dict] = []
 
-    iterator = items if tqdm is None else tqdm(items, desc="Querying FAISS", unit="item")
-    for item in iterator:
-        vec = vectors_array[item.id]
-        distances, indices = faiss_manager.search(vec.reshape(1, -1), search_k)
-        distances = distances.reshape(1, -1) if len(distances.shape) == 1 else distances
-        indices = indices.reshape(1, -1) if len(indices.shape) == 1 else indices
-
+    def _item_neighbors(item: Item, distances: np.ndarray, indices: np.ndarray) -> List[dict]:
         candidates: List[dict] = []
-        for dist, idx in zip(distances[0], indices[0]):
+        for dist, idx in zip(distances, indices):
             internal_id = int(idx)
             if internal_id == -1:
                 continue
@@ -216,7 +213,16 @@ def build_neighbors(
                 }
             )
         candidates.sort(key=lambda x: x["embed_score"], reverse=True)
-        neighbors.extend(candidates[:top_k])
+        return candidates[:top_k]
+
+    # Query FAISS a block of rows at a time instead of one search per item.
+    batches = [items[i : i + SEARCH_BATCH_SIZE] for i in range(0, len(items), SEARCH_BATCH_SIZE)]
+    iterator = batches if tqdm is None else tqdm(batches, desc="Querying FAISS", unit="batch")
+    for batch in iterator:
+        query_matrix = np.vstack([vectors_array[item.id] for item in batch])
+        batch_distances, batch_indices = faiss_manager.search_batch(query_matrix, search_k)
+        for item, distances, indices in zip(batch, batch_distances, batch_indices):
+            neighbors.extend(_item_neighbors(item, distances, indices))
     return neighbors
 
 
@@ -297,14 +303,16 @@ def build_graph(
                     stats["rerank_calls"] += 1
                     a_text = text_for_item(item)
                     b_text = text_for_item(anchor_item)
-                    score_ab = reranker.rerank(
-                        query={"search": item.title, "task": item.playbook},
-                        documents=[b_text],
-                    )[0]
-                    score_ba = reranker.rerank(
-                        query={"search": anchor_item.title, "task": anchor_item.playbook},
-                        documents=[a_text],
-                    )[0]
+                    # Both directions share one padded forward pass.
+                    (score_ab,), (score_ba,) = reranker.rerank_many(
+                        [
+                            ({"search": item.title, "task": item.playbook}, [b_text]),
+                            (
+                                {"search": anchor_item.title, "task": anchor_item.playbook},
+                                [a_text],
+                            ),
+                        ]
+                    )
                     rerank_score = max(score_ab, score_ba)
                     rerank_cache[key] = rerank_score
                     rerank_cache_dir.mkdir(parents=True, exist_ok=True)
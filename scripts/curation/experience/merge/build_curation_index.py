@@ -257,7 +257,6 @@ def main():
         print("Building FAISS index...")
         from src.api.gpu.faiss_manager import FAISSIndexManager
         from src.common.storage.schema import FAISSMetadata
-        import numpy as np
         import shutil
 
         # Determine index path
@@ -284,30 +283,23 @@ def main():
             session=session,
         )
 
-        # Get all embeddings
-        all_embeddings = emb_repo.get_all_by_model(config.embedding_model, entity_type=None)
+        # Stream embeddings in chunks straight into the index
+        total_vectors = 0
+        for chunk in emb_repo.iter_by_model(config.embedding_model):
+            # Add to FAISS index (order: entity_ids, entity_types, embeddings)
+            faiss_manager.add(
+                chunk.entity_ids, chunk.entity_types, chunk.matrix, chunk.category_codes
+            )
+            total_vectors += len(chunk.entity_ids)
 
-        if not all_embeddings:
+        if not total_vectors:
             print("⚠️  No embeddings found, skipping FAISS index build")
             session.close()
             return
 
-        entity_ids = []
-        entity_types = []
-        embedding_vectors = []
-
-        for emb in all_embeddings:
-            entity_ids.append(emb.entity_id)
-            entity_types.append(emb.entity_type)
-            embedding_vectors.append(emb_repo.to_numpy(emb))
-
-        embedding_array = np.vstack(embedding_vectors).astype(np.float32)
-
-        # Add to FAISS index (order: entity_ids, entity_types, embeddings)
-        faiss_manager.add(entity_ids, entity_types, embedding_array)
         faiss_manager.save()
 
-        print(f"✓ FAISS index built ({len(all_embeddings)} vectors, {dimension} dimensions)")
+        print(f"✓ FAISS index built ({total_vectors} vectors, {dimension} dimensions)")
         print(f"✓ Index saved to: {index_dir}")
         print()
 
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Check that prefix-cached reranker scores match uncached scores.
+
+The reranker reuses the KV cache of the shared prompt prefix (system block,
+instruction, search and task) and only runs each document suffix per
+candidate. This script scores the same (query, documents) jobs with the
+cache on and off and reports the largest score difference.
+
+Usage:
+    python scripts/ops/check_reranker_parity.py [--limit 32] [--tolerance 1e-3]
+
+Documents come from the experiences table (title + playbook); built-in
+samples are used when the database is empty. Exits with status 1 when any
+score differs by more than the tolerance.
+
+Preconditions:
+  - GPU-mode setup done and the reranker model downloaded
+  - Torch runtime (the ONNX runtime never uses the prefix cache)
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from src.api.gpu.reranker_client import RerankerClient  # noqa: E402
+from src.common.config.config import get_config  # noqa: E402
+from src.common.storage.database import Database  # noqa: E402
+from src.common.storage.schema import Experience  # noqa: E402
+
+log = logging.getLogger("check_reranker_parity")
+log_level = os.getenv("CHL_LOG_LEVEL", "INFO").upper()
+logging.basicConfig(level=getattr(logging, log_level, logging.INFO), format="%(levelname)s: %(message)s")
+
+QUERIES: List[Dict[str, str]] = [
+    {"search": "database connection timeout", "task": "Fix intermittent timeouts in a web service"},
+    {"search": "flaky tests, race condition", "task": "Stabilize a test suite that fails randomly"},
+    {"search": "", "task": "Write a clear bug report"},
+]
+
+SAMPLE_DOCUMENTS = [
+    "Increase the connection pool size and set a pool timeout to avoid exhausting connections.",
+    "Use a thread-safe logger and add deterministic seeds when tests depend on ordering.",
+    "Include reproduction steps, expected vs actual behavior and environment details.",
+    "Prefer short functions with one responsibility.",
+]
+
+
+def load_documents(limit: int) -> List[str]:
+    config = get_config()
+    try:
+        db = Database(config.database_path, echo=False)
+        db.init_database()
+        with db.session_scope() as session:
+            rows = session.query(Experience.title, Experience.playbook).limit(limit).all()
+        documents = [f"{title}\n\n{playbook}" for title, playbook in rows]
+    except Exception as exc:
+        log.warning("Could not read experiences, using built-in samples: %s", exc)
+        documents = []
+    return documents or list(SAMPLE_DOCUMENTS)
+
+
+def score(reranker: RerankerClient, jobs: List[Tuple[Dict[str, str], List[str]]], cached: bool):
+    reranker.prefix_cache = cached
+    started = time.perf_counter()
+    scores = reranker.rerank_many(jobs)
+    return scores, (time.perf_counter() - started) * 1000.0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare prefix-cached and uncached reranker scores")
+    parser.add_argument("--limit", type=int, default=32, help="Documents per query")
+    parser.add_argument("--tolerance", type=float, default=1e-3, help="Max allowed absolute score difference")
+    args = parser.parse_args()
+
+    config = get_config()
+    reranker = RerankerClient(
+        model_repo=config.reranker_repo,
+        quantization=config.reranker_quant,
+        max_batch_tokens=getattr(config, "reranker_batch_tokens", 8192),
+        max_seq_len=getattr(config, "reranker_max_seq_len", 1024),
+        runtime="torch",
+    )
+    documents = load_documents(args.limit)
+    jobs = [(query, documents) for query in QUERIES]
+
+    # Warm both paths once so timings exclude first-call setup.
+    score(reranker, jobs[:1], cached=False)
+    score(reranker, jobs[:1], cached=True)
+    uncached, uncached_ms = score(reranker, jobs, cached=False)
+    cached, cached_ms = score(reranker, jobs, cached=True)
+
+    diffs = [
+        abs(a - b)
+        for job_a, job_b in zip(uncached, cached)
+        for a, b in zip(job_a, job_b)
+    ]
+    max_diff = max(diffs) if diffs else 0.0
+    report = {
+        "model": reranker.get_model_version(),
+        "device": str(reranker.device),
+        "queries": len(jobs),
+        "documents_per_query": len(documents),
+        "max_abs_diff": max_diff,
+        "tolerance": args.tolerance,
+        "uncached_ms": round(uncached_ms, 1),
+        "cached_ms": round(cached_ms, 1),
+        "ok": max_diff <= args.tolerance,
+    }
+    print(json.dumps(report, indent=2))
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""Offline evaluation of adaptive rerank depth (NDCG loss vs latency saved).
+
+Runs every labelled query through the GPU vector search twice: once
+reranking all CHL_TOPK_RERANK candidates, once with the adaptive policy
+(skip when the top vector score dominates, tiered early stop, depth cap).
+Both runs share the same query embedding and FAISS candidates, so the
+difference is the reranking alone.
+
+IMPORTANT: Loads the embedding and reranker models locally; stop the API
+           server first on machines with limited GPU memory.
+
+Usage:
+    python scripts/ops/eval_rerank_depth.py --labels data/eval/rerank_queries.jsonl \\
+        [--margin 0.2] [--tier-size 8] [--depth-factor 3] [--details]
+
+Labels (JSONL, one query per line):
+    {"query": "[SEARCH] pool timeout [TASK] fix API timeouts",
+     "relevant": {"EXP-ABC-001": 2, "EXP-ABC-007": 1},
+     "top_k": 5, "entity_type": "experience", "category": "ABC"}
+
+``relevant`` may also be a list of ids (grade 1). ``top_k`` defaults to
+--top-k; ``entity_type`` and ``category`` are optional filters.
+
+Output (JSON): mean NDCG@top_k for both runs, the NDCG loss, mean latency
+and reranked documents per query, latency saved and the skip rate (a
+skipped query still reranks its ``top_k`` head).
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from src.api.gpu.embedding_client import EmbeddingClient  # noqa: E402
+from src.api.gpu.faiss_manager import initialize_faiss_with_recovery  # noqa: E402
+from src.api.gpu.onnx_backend import resolve_runtime  # noqa: E402
+from src.api.gpu.rerank_policy import AdaptiveRerankPolicy  # noqa: E402
+from src.api.gpu.reranker_client import RerankerClient  # noqa: E402
+from src.api.gpu.search_provider import VectorFAISSProvider, parse_two_step_query  # noqa: E402
+from src.api.metrics import metrics  # noqa: E402
+from src.common.config.config import get_config  # noqa: E402
+from src.common.storage.database import Database  # noqa: E402
+
+log = logging.getLogger("eval_rerank_depth")
+log_level = os.getenv("CHL_LOG_LEVEL", "INFO").upper()
+logging.basicConfig(level=getattr(logging, log_level, logging.INFO), format="%(levelname)s: %(message)s")
+
+
+class CountingReranker:
+    """Pass-through reranker that counts scored documents."""
+
+    def __init__(self, client: RerankerClient):
+        self._client = client
+        self.documents = 0
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def rerank(self, query: Dict[str, str], documents: List[str], batch_size=None) -> List[float]:
+        self.documents += len(documents)
+        return self._client.rerank(query, documents, batch_size=batch_size)
+
+
+def ndcg(ranked_ids: List[str], grades: Dict[str, float], k: int) -> float:
+    dcg = sum(
+        (2 ** grades.get(entity_id, 0) - 1) / math.log2(rank + 2)
+        for rank, entity_id in enumerate(ranked_ids[:k])
+    )
+    ideal = sorted(grades.values(), reverse=True)[:k]
+    idcg = sum((2 ** grade - 1) / math.log2(rank + 2) for rank, grade in enumerate(ideal))
+    return dcg / idcg if idcg > 0 else 0.0
+
+
+def load_labels(path: Path) -> List[dict]:
+    items = []
+    with path.open(encoding="utf-8") as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            relevant = item.get("relevant") or {}
+            if isinstance(relevant, list):
+                relevant = {entity_id: 1 for entity_id in relevant}
+            item["relevant"] = {str(k): float(v) for k, v in relevant.items()}
+            items.append(item)
+    return items
+
+
+def main() -> int:
+    config = get_config()
+    parser = argparse.ArgumentParser(description="Evaluate adaptive rerank depth against full reranking")
+    parser.add_argument("--labels", required=True, help="Labelled queries (JSONL)")
+    parser.add_argument("--top-k", type=int, default=5, help="Default results per query")
+    parser.add_argument("--margin", type=float, default=config.rerank_dominance_margin)
+    parser.add_argument("--tier-size", type=int, default=config.rerank_tier_size)
+    parser.add_argument("--depth-factor", type=int, default=config.rerank_depth_factor)
+    parser.add_argument("--details", action="store_true", help="Include per-query rows")
+    args = parser.parse_args()
+
+    labels = load_labels(Path(args.labels))
+    if not labels:
+        log.error("No labelled queries in %s", args.labels)
+        return 1
+
+    db = Database(config.database_path, echo=False)
+    db.init_database()
+    runtime = resolve_runtime(config.inference_runtime)
+    onnx_options = {
+        "runtime": runtime,
+        "onnx_cache_dir": config.onnx_cache_dir,
+        "onnx_threads": config.onnx_threads,
+    }
+    embedding_client = EmbeddingClient(
+        model_repo=config.embedding_repo,
+        quantization=config.embedding_quant,
+        max_batch_tokens=config.embedding_batch_tokens,
+        **onnx_options,
+    )
+    with db.session_scope() as session:
+        index_manager = initialize_faiss_with_recovery(
+            config, session, embedding_client, session_factory=db.get_session
+        )
+    if index_manager is None:
+        log.error("FAISS index unavailable; build it first (scripts/ops/rebuild_index.py)")
+        return 1
+    # No score cache: both runs must pay for every reranked document.
+    reranker = CountingReranker(
+        RerankerClient(
+            model_repo=config.reranker_repo,
+            quantization=config.reranker_quant,
+            max_batch_tokens=config.reranker_batch_tokens,
+            prefix_cache=config.reranker_prefix_cache,
+            max_seq_len=config.reranker_max_seq_len,
+            **onnx_options,
+        )
+    )
+    provider = VectorFAISSProvider(
+        index_manager=index_manager,
+        embedding_client=embedding_client,
+        model_name=config.embedding_model,
+        reranker_client=reranker,
+        topk_retrieve=config.topk_retrieve,
+        topk_rerank=config.topk_rerank,
+    )
+    policy = AdaptiveRerankPolicy(
+        dominance_margin=args.margin,
+        tier_size=args.tier_size,
+        depth_factor=args.depth_factor,
+    )
+
+    rows = []
+    for item in labels:
+        query = item["query"]
+        top_k = int(item.get("top_k") or args.top_k)
+        # Warm the query embedding cache so both runs time reranking only.
+        provider._encode_queries([parse_two_step_query(query)[0]])
+        row = {"query": query, "top_k": top_k}
+        for name, run_policy in (("full", None), ("adaptive", policy)):
+            provider.rerank_policy = run_policy
+            reranker.documents = 0
+            skipped_before = metrics.get_snapshot()["counters"].get("search.rerank.skipped", 0)
+            with db.session_scope() as session:
+                started = time.perf_counter()
+                results = provider.search(
+                    session,
+                    query,
+                    entity_type=item.get("entity_type"),
+                    category_code=item.get("category"),
+                    top_k=top_k,
+                )
+                elapsed_ms = (time.perf_counter() - started) * 1000.0
+            row[name] = {
+                "ndcg": ndcg([r.entity_id for r in results], item["relevant"], top_k),
+                "ms": elapsed_ms,
+                "reranked": reranker.documents,
+                "skipped": metrics.get_snapshot()["counters"].get("search.rerank.skipped", 0) > skipped_before,
+            }
+        rows.append(row)
+
+    def mean(name: str, key: str) -> float:
+        return sum(row[name][key] for row in rows) / len(rows)
+
+    full_ms, adaptive_ms = mean("full", "ms"), mean("adaptive", "ms")
+    report = {
+        "queries": len(rows),
+        "policy": {
+            "dominance_margin": policy.dominance_margin,
+            "tier_size": policy.tier_size,
+            "depth_factor": policy.depth_factor,
+            "topk_rerank": provider.topk_rerank,
+        },
+        "ndcg_full": round(mean("full", "ndcg"), 4),
+        "ndcg_adaptive": round(mean("adaptive", "ndcg"), 4),
+        "ndcg_loss": round(mean("full", "ndcg") - mean("adaptive", "ndcg"), 4),
+        "ms_full": round(full_ms, 1),
+        "ms_adaptive": round(adaptive_ms, 1),
+        "latency_saved_pct": round(100.0 * (1 - adaptive_ms / full_ms), 1) if full_ms else 0.0,
+        "reranked_full": round(mean("full", "reranked"), 1),
+        "reranked_adaptive": round(mean("adaptive", "reranked"), 1),
+        "skip_rate": round(sum(1 for row in rows if row["adaptive"]["skipped"]) / len(rows), 4),
+    }
+    if args.details:
+        report["details"] = rows
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
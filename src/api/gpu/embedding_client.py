@@ -1,15 +1,25 @@
 """Embedding client for generating vector embeddings using Qwen3 HF models."""
 
 import logging
-from typing import List, Optional
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
 
 import numpy as np
 
 import torch
 from transformers import AutoModel, AutoTokenizer
 
+from src.api.metrics import metrics
+from .inference_executor import plan_length_batches
+from .onnx_backend import load_quantized_model
+
 logger = logging.getLogger(__name__)
 
+# Inputs are truncated to this many tokens.
+MAX_INPUT_TOKENS = 512
+
 
 class EmbeddingClient:
     """Client for generating embeddings using HF Transformers."""
@@ -22,11 +32,23 @@ class EmbeddingClient:
         batch_size: int = 64,
         n_ctx: int = 2048,
         n_gpu_layers: int = 0,
+        max_batch_tokens: int = 16384,
+        runtime: str = "torch",
+        onnx_cache_dir: Optional[str] = None,
+        onnx_threads: int = 0,
     ):
         self.model_repo = model_repo
         self.quantization = quantization
         self.normalize = normalize
         self.batch_size = batch_size
+        # "torch" (transformers) or "onnx" (int8 ONNX Runtime on CPU)
+        self.runtime = runtime
+        self.onnx_cache_dir = onnx_cache_dir
+        self.onnx_threads = onnx_threads
+        # Padded tokens (rows x longest row) allowed in one forward pass.
+        self.max_batch_tokens = max(max_batch_tokens, MAX_INPUT_TOKENS)
+        self._throughput_lock = threading.Lock()
+        self._throughput = {"texts": 0, "seconds": 0.0, "tokens": 0, "padded_tokens": 0}
         self._init_hf(model_repo)
 
     @property
@@ -68,33 +90,65 @@ class EmbeddingClient:
         embeddings = self.encode([text])
         return embeddings[0]
 
+    def throughput_stats(self) -> Dict[str, float]:
+        """Cumulative encoder throughput: texts/sec and share of padding tokens."""
+        with self._throughput_lock:
+            totals = dict(self._throughput)
+        seconds = totals["seconds"]
+        padded = totals["padded_tokens"]
+        return {
+            "texts_encoded": totals["texts"],
+            "texts_per_sec": round(totals["texts"] / seconds, 2) if seconds else 0.0,
+            "padding_ratio": round(1.0 - totals["tokens"] / padded, 4) if padded else 0.0,
+        }
+
     def get_model_version(self) -> str:
         return f"{self.model_repo}:{self.quantization}"
 
+    @property
+    def vector_space(self) -> str:
+        """Key for cached and reused vectors: the model version plus a non-torch runtime.
+
+        int8 ONNX vectors differ from torch ones, so content-hash reuse and
+        the query cache never mix the two.
+        """
+        model_version = self.get_model_version()
+        return model_version if self.runtime == "torch" else f"{model_version}@{self.runtime}"
+
     def _init_hf(self, model_repo: str) -> None:
         try:
             logger.info("Loading HF embedding model: %s", model_repo)
             self.tokenizer = AutoTokenizer.from_pretrained(model_repo, trust_remote_code=True, local_files_only=True)
 
-            if torch.backends.mps.is_available():
-                self.device = torch.device("mps")
-                torch_dtype = torch.float16
-            elif torch.cuda.is_available():
-                self.device = torch.device("cuda")
-                torch_dtype = torch.float16
-            else:
+            if self.runtime == "onnx":
                 self.device = torch.device("cpu")
-                torch_dtype = None
+                self.model = load_quantized_model(
+                    model_repo,
+                    "feature-extraction",
+                    Path(self.onnx_cache_dir or "onnx"),
+                    threads=self.onnx_threads,
+                    trust_remote_code=True,
+                )
+            else:
+                if torch.backends.mps.is_available():
+                    self.device = torch.device("mps")
+                    torch_dtype = torch.float16
+                elif torch.cuda.is_available():
+                    self.device = torch.device("cuda")
+                    torch_dtype = torch.float16
+                else:
+                    self.device = torch.device("cpu")
+                    torch_dtype = None
 
-            self.model = AutoModel.from_pretrained(
-                model_repo,
-                trust_remote_code=True,
-                torch_dtype=torch_dtype,
-                local_files_only=True
-            )
+                self.model = AutoModel.from_pretrained(
+                    model_repo,
+                    trust_remote_code=True,
+                    torch_dtype=torch_dtype,
+                    local_files_only=True
+                )
 
-            self.model.to(self.device)
-            self.model.eval()
+                self.model.to(self.device)
+                self.model.eval()
 
             # Infer dimension by a tiny forward pass
             with torch.no_grad():
@@ -104,9 +158,10 @@ class EmbeddingClient:
                 self.dimension = int(hidden.shape[-1])
 
             logger.info(
-                "HF embedding model loaded: %s on %s, dimension=%s",
+                "HF embedding model loaded: %s on %s (%s), dimension=%s",
                 model_repo,
                 self.device,
+                self.runtime,
                 self.dimension,
             )
         except Exception as exc:
@@ -115,16 +170,24 @@ class EmbeddingClient:
             ) from exc
 
     def _encode_hf(self, texts: List[str]) -> np.ndarray:
-        embeddings = []
-        for start in range(0, len(texts), self.batch_size):
-            batch = texts[start : start + self.batch_size]
+        started = time.perf_counter()
+        tokenized = self.tokenizer(
+            texts,
+            truncation=True,
+            max_length=MAX_INPUT_TOKENS,
+        )
+        input_ids = tokenized["input_ids"]
+        lengths = [len(ids) for ids in input_ids]
+
+        output: Optional[np.ndarray] = None
+        padded_tokens = 0
+        for batch in plan_length_batches(lengths, self.max_batch_tokens, self.batch_size):
+            features = {
+                key: [tokenized[key][pos] for pos in batch] for key in tokenized.keys()
+            }
             with torch.no_grad():
-                inputs = self.tokenizer(
-                    batch,
-                    return_tensors="pt",
-                    padding=True,
-                    truncation=True,
-                    max_length=512,
+                inputs = self.tokenizer.pad(
+                    features, padding=True, return_tensors="pt"
                 ).to(self.device)
                 outputs = self.model(**inputs)
                 hidden = outputs.last_hidden_state  # [B, T, D]
@@ -135,9 +198,25 @@ class EmbeddingClient:
                 else:
                     mask = attn_mask.unsqueeze(-1).expand(hidden.size()).float()
                     pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
-                embeddings.append(pooled.cpu().numpy())
-
-        return np.concatenate(embeddings, axis=0).astype(np.float32)
+                pooled = pooled.float().cpu().numpy()
+            padded_tokens += int(hidden.shape[0] * hidden.shape[1])
+            if output is None:
+                output = np.empty((len(texts), pooled.shape[1]), dtype=np.float32)
+            # Scatter back so rows line up with the caller's order.
+            output[batch] = pooled
+
+        elapsed = time.perf_counter() - started
+        tokens = sum(lengths)
+        with self._throughput_lock:
+            self._throughput["texts"] += len(texts)
+            self._throughput["seconds"] += elapsed
+            self._throughput["tokens"] += tokens
+            self._throughput["padded_tokens"] += padded_tokens
+        if elapsed > 0:
+            metrics.observe("embedding.encode.texts_per_sec", len(texts) / elapsed)
+        if padded_tokens:
+            metrics.observe("embedding.encode.padding_ratio", 1.0 - tokens / padded_tokens)
+        return output
 
 
 class EmbeddingClientError(Exception):
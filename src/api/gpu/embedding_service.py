@@ -2,12 +2,13 @@
 
 import logging
 import time
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import numpy as np
 from sqlalchemy.exc import OperationalError as SAOperationalError
 from sqlalchemy.orm import Session
 
+from src.api.metrics import metrics
 from src.common.storage.schema import Experience, CategorySkill
 from src.common.storage.repository import (
     EmbeddingRepository,
@@ -30,6 +31,7 @@ class EmbeddingService:
         faiss_index_manager: Optional["FAISSIndexManager"] = None,
         max_tokens: int = 8000,
         skills_enabled: bool = True,
+        batch_size: Optional[int] = None,
     ):
         self.session = session
         self.embedding_client = embedding_client
@@ -37,6 +39,8 @@ class EmbeddingService:
         self.faiss_index_manager = faiss_index_manager
         self.max_tokens = max_tokens
         self.skills_enabled = skills_enabled
+        # Entries embedded per encode call / transaction / FAISS add.
+        self.batch_size = max(1, batch_size or getattr(embedding_client, "batch_size", 64))
 
         self.emb_repo = EmbeddingRepository(session)
         self.exp_repo = ExperienceRepository(session)
@@ -74,20 +78,59 @@ class EmbeddingService:
                     continue
                 raise
 
-    def generate_for_experience(self, experience_id: str) -> bool:
+    @staticmethod
+    def _content_for(entity_type: str, entity) -> str:
+        """Text that is encoded (and hashed) for an experience or skill."""
+        if entity_type == "experience":
+            return f"{entity.title}\n\n{entity.playbook}"
+        return f"{entity.name}\n\n{entity.description}\n\n{entity.content}"
+
+    def _load_entities(self, entries: List[Tuple[str, str]]) -> List[Tuple[str, str, object]]:
+        exp_ids = [entity_id for entity_type, entity_id in entries if entity_type == "experience"]
+        skill_ids = [entity_id for entity_type, entity_id in entries if entity_type == "skill"]
+        loaded = {}
+        if exp_ids:
+            for exp in self.session.query(Experience).filter(Experience.id.in_(exp_ids)):
+                loaded[("experience", exp.id)] = exp
+        if skill_ids and self.skills_enabled:
+            for skill in self.session.query(CategorySkill).filter(CategorySkill.id.in_(skill_ids)):
+                loaded[("skill", skill.id)] = skill
+        elif skill_ids:
+            logger.info("Skipping skill embedding; skills are disabled.")
+
+        entities = []
+        for entity_type, entity_id in entries:
+            entity = loaded.get((entity_type, entity_id))
+            if entity is None:
+                if entity_type == "experience" or self.skills_enabled:
+                    logger.error("%s not found: %s", entity_type.capitalize(), entity_id)
+                continue
+            entities.append((entity_type, entity_id, entity))
+        return entities
+
+    def generate_batch(self, entries: List[Tuple[str, str]]) -> Dict[str, int]:
+        """Embed ``(entity_type, entity_id)`` entries as one batch.
+
+        The batch is marked processing in one commit, texts without a stored
+        vector (see ``EmbeddingRepository.content_hash``) go through a single
+        ``EmbeddingClient.encode`` call, every embedding row and status is
+        written in one transaction, and the FAISS index gets one add.
+        """
+        stats = {"processed": len(entries), "succeeded": 0, "failed": len(entries)}
+        if not entries:
+            return stats
+
+        entities: List[Tuple[str, str, object]] = []
         try:
-            exp = self.exp_repo.get_by_id(experience_id)
-            if not exp:
-                logger.error("Experience not found: %s", experience_id)
-                return False
+            entities = self._load_entities(entries)
+            if not entities:
+                return stats
 
+            for _, _, entity in entities:
+                entity.embedding_status = "processing"
             try:
-                exp.embedding_status = "processing"
-                self._with_lock_retry(
-                    lambda: self.session.flush(), desc="flush experience -> processing"
-                )
                 self._with_lock_retry(
-                    lambda: self.session.commit(), desc="commit experience -> processing"
+                    lambda: self.session.commit(), desc="commit batch -> processing"
                 )
             except Exception:
                 try:
@@ -95,153 +138,103 @@ class EmbeddingService:
                 except Exception:
                     pass
 
-            content = f"{exp.title}\n\n{exp.playbook}"
-            try:
-                embedding = self.embedding_client.encode_single(content)
-            except EmbeddingClientError as exc:
-                logger.error("Failed to generate embedding for %s: %s", experience_id, exc)
-                exp.embedding_status = "failed"
-                self.session.flush()
-                return False
-
-            def _upsert():
-                self.emb_repo.create(
-                    entity_id=experience_id,
-                    entity_type="experience",
-                    category_code=exp.category_code,
-                    vector=embedding,
-                    model_version=self.embedding_client.get_model_version(),
-                )
-
-            self._with_lock_retry(_upsert, desc="embedding upsert (experience)")
-
-            exp.embedding_status = "embedded"
-            self._with_lock_retry(
-                lambda: self.session.flush(), desc="flush experience status"
-            )
+            model_version = self.embedding_client.get_model_version()
+            contents = [self._content_for(entity_type, entity) for entity_type, _, entity in entities]
+            vector_space = self.embedding_client.vector_space
+            hashes = [self.emb_repo.content_hash(content, vector_space) for content in contents]
+            known = self.emb_repo.get_vectors_by_hash(hashes, model_version)
+
+            # Identical texts within the batch are encoded once.
+            to_encode: Dict[str, str] = {}
+            for content, content_hash in zip(contents, hashes):
+                if content_hash not in known:
+                    to_encode.setdefault(content_hash, content)
+            misses = sum(1 for content_hash in hashes if content_hash not in known)
+            metrics.increment("embedding_cache.hit", len(hashes) - misses)
+            metrics.increment("embedding_cache.miss", misses)
+            if to_encode:
+                try:
+                    encoded = self.embedding_client.encode(list(to_encode.values()))
+                except EmbeddingClientError as exc:
+                    logger.error(
+                        "Failed to generate embeddings for %s entries: %s", misses, exc
+                    )
+                else:
+                    known.update(zip(to_encode.keys(), encoded))
+
+            ready = [pos for pos, content_hash in enumerate(hashes) if content_hash in known]
+            category_codes = [entity.category_code for _, _, entity in entities]
+
+            def _write():
+                for pos, (entity_type, entity_id, entity) in enumerate(entities):
+                    content_hash = hashes[pos]
+                    if content_hash not in known:
+                        entity.embedding_status = "failed"
+                        continue
+                    self.emb_repo.upsert(
+                        entity_id=entity_id,
+                        entity_type=entity_type,
+                        category_code=category_codes[pos],
+                        vector=known[content_hash],
+                        model_version=model_version,
+                        content_hash=content_hash,
+                    )
+                    entity.embedding_status = "embedded"
+                self.session.commit()
 
             try:
-                self._with_lock_retry(
-                    lambda: self.session.commit(), desc="commit experience embedding"
-                )
+                self._with_lock_retry(_write, desc="commit embedding batch")
             except Exception as exc:
-                logger.error("Failed to commit embedding for %s: %s", experience_id, exc)
+                logger.error("Failed to commit embedding batch: %s", exc)
                 try:
                     self.session.rollback()
                 except Exception:
                     pass
-                return False
+                return stats
 
-            if self.faiss_index_manager:
+            if self.faiss_index_manager and ready:
                 try:
                     self.faiss_index_manager.add(
-                        entity_ids=[experience_id],
-                        entity_types=["experience"],
-                        embeddings=embedding.reshape(1, -1),
+                        entity_ids=[entities[pos][1] for pos in ready],
+                        entity_types=[entities[pos][0] for pos in ready],
+                        embeddings=np.vstack([known[hashes[pos]] for pos in ready]).astype(
+                            np.float32
+                        ),
+                        category_codes=[category_codes[pos] for pos in ready],
                     )
                 except Exception as exc:
                     logger.warning(
-                        "Failed to update FAISS index (embedding saved): %s", exc
+                        "Failed to update FAISS index (embeddings saved): %s", exc
                     )
 
-            logger.info("Generated embedding for experience: %s", experience_id)
-            return True
+            stats["succeeded"] = len(ready)
+            stats["failed"] = len(entries) - len(ready)
+            logger.info(
+                "Generated embeddings for %s entries (%s encoded, %s reused)",
+                len(ready),
+                len(to_encode),
+                len(hashes) - misses,
+            )
+            return stats
         except Exception as exc:
-            logger.error("Failed to generate embedding for experience %s: %s", experience_id, exc)
+            logger.error("Failed to generate embedding batch: %s", exc)
             try:
-                exp = self.exp_repo.get_by_id(experience_id)
-                if exp:
-                    exp.embedding_status = "failed"
-                    self.session.flush()
+                self.session.rollback()
+                for _, _, entity in entities:
+                    entity.embedding_status = "failed"
+                self.session.flush()
             except Exception:
                 pass
-            return False
+            return stats
+
+    def generate_for_experience(self, experience_id: str) -> bool:
+        return self.generate_batch([("experience", experience_id)])["succeeded"] == 1
 
     def generate_for_skill(self, skill_id: str) -> bool:
         if not self.skills_enabled:
             logger.info("Skipping skill embedding; skills are disabled.")
             return False
-        try:
-            skill = self.skill_repo.get_by_id(skill_id)
-            if not skill:
-                logger.error("Skill not found: %s", skill_id)
-                return False
-
-            try:
-                skill.embedding_status = "processing"
-                self._with_lock_retry(
-                    lambda: self.session.flush(), desc="flush skill -> processing"
-                )
-                self._with_lock_retry(
-                    lambda: self.session.commit(), desc="commit skill -> processing"
-                )
-            except Exception:
-                try:
-                    self.session.rollback()
-                except Exception:
-                    pass
-
-            content = f"{skill.name}\n\n{skill.description}\n\n{skill.content}"
-            try:
-                embedding = self.embedding_client.encode_single(content)
-            except EmbeddingClientError as exc:
-                logger.error("Failed to generate embedding for %s: %s", skill_id, exc)
-                skill.embedding_status = "failed"
-                self.session.flush()
-                return False
-
-            def _upsert():
-                self.emb_repo.create(
-                    entity_id=skill_id,
-                    entity_type="skill",
-                    category_code=skill.category_code,
-                    vector=embedding,
-                    model_version=self.embedding_client.get_model_version(),
-                )
-
-            self._with_lock_retry(_upsert, desc="embedding upsert (skill)")
-
-            skill.embedding_status = "embedded"
-            self._with_lock_retry(
-                lambda: self.session.flush(), desc="flush skill status"
-            )
-
-            try:
-                self._with_lock_retry(
-                    lambda: self.session.commit(), desc="commit skill embedding"
-                )
-            except Exception as exc:
-                logger.error("Failed to commit embedding for %s: %s", skill_id, exc)
-                try:
-                    self.session.rollback()
-                except Exception:
-                    pass
-                return False
-
-            if self.faiss_index_manager:
-                try:
-                    self.faiss_index_manager.add(
-                        entity_ids=[skill_id],
-                        entity_types=["skill"],
-                        embeddings=embedding.reshape(1, -1),
-                    )
-                except Exception as exc:
-                    logger.warning(
-                        "Failed to update FAISS index (embedding saved): %s", exc
-                    )
-
-            logger.info("Generated embedding for skill: %s", skill_id)
-            return True
-        except Exception as exc:
-            logger.error("Failed to generate embedding for skill %s: %s", skill_id, exc)
-            try:
-                skill = self.skill_repo.get_by_id(skill_id)
-                if skill:
-                    skill.embedding_status = "failed"
-                    self.session.flush()
-            except Exception:
-                pass
-            return False
+        return self.generate_batch([("skill", skill_id)])["succeeded"] == 1
 
     def get_pending_experiences(self) -> List[Experience]:
         return (
@@ -281,30 +274,41 @@ class EmbeddingService:
             .all()
         )
 
+    def _claim_entries(self, status_filter, max_count: Optional[int]) -> List[Tuple[str, str]]:
+        """``(entity_type, entity_id)`` keys matching ``status_filter``, experiences first.
+
+        Only ids are selected, and no more than ``max_count`` of them.
+        """
+        entries: List[Tuple[str, str]] = []
+        sources = [("experience", Experience)]
+        if self.skills_enabled:
+            sources.append(("skill", CategorySkill))
+        for entity_type, model in sources:
+            query = self.session.query(model.id).filter(status_filter(model))
+            if max_count:
+                remaining = max_count - len(entries)
+                if remaining <= 0:
+                    break
+                query = query.limit(remaining)
+            entries.extend((entity_type, entity_id) for (entity_id,) in query)
+        return entries
+
+    def _run_batches(self, entries: List[Tuple[str, str]]) -> Iterator[Dict[str, int]]:
+        for start in range(0, len(entries), self.batch_size):
+            yield self.generate_batch(entries[start : start + self.batch_size])
+
     def process_pending(self, max_count: Optional[int] = None) -> Dict[str, int]:
         stats = {"processed": 0, "succeeded": 0, "failed": 0}
 
-        pending_exp = self.get_pending_experiences()
-        pending_skills = self.get_pending_skills()
-
-        all_pending = [("experience", exp.id) for exp in pending_exp] + [
-            ("skill", skill.id) for skill in pending_skills
-        ]
-
-        if max_count:
-            all_pending = all_pending[:max_count]
-
-        for entity_type, entity_id in all_pending:
-            if entity_type == "experience":
-                success = self.generate_for_experience(entity_id)
-            else:
-                success = self.generate_for_skill(entity_id)
+        all_pending = self._claim_entries(
+            lambda model: (model.embedding_status == "pending")
+            | (model.embedding_status.is_(None)),
+            max_count,
+        )
 
-            stats["processed"] += 1
-            if success:
-                stats["succeeded"] += 1
-            else:
-                stats["failed"] += 1
+        for batch_stats in self._run_batches(all_pending):
+            for key in stats:
+                stats[key] += batch_stats[key]
 
         logger.info(
             "Processed %s pending embeddings: %s succeeded, %s failed",
@@ -317,27 +321,14 @@ class EmbeddingService:
     def retry_failed(self, max_count: Optional[int] = None) -> Dict[str, int]:
         stats = {"retried": 0, "succeeded": 0, "failed": 0}
 
-        failed_exp = self.get_failed_experiences()
-        failed_skills = self.get_failed_skills()
-
-        all_failed = [("experience", exp.id) for exp in failed_exp] + [
-            ("skill", skill.id) for skill in failed_skills
-        ]
-
-        if max_count:
-            all_failed = all_failed[:max_count]
-
-        for entity_type, entity_id in all_failed:
-            if entity_type == "experience":
-                success = self.generate_for_experience(entity_id)
-            else:
-                success = self.generate_for_skill(entity_id)
+        all_failed = self._claim_entries(
+            lambda model: model.embedding_status == "failed", max_count
+        )
 
-            stats["retried"] += 1
-            if success:
-                stats["succeeded"] += 1
-            else:
-                stats["failed"] += 1
+        for batch_stats in self._run_batches(all_failed):
+            stats["retried"] += batch_stats["processed"]
+            stats["succeeded"] += batch_stats["succeeded"]
+            stats["failed"] += batch_stats["failed"]
 
         logger.info(
             "Retried %s failed embeddings: %s succeeded, %s failed",
@@ -10,12 +10,18 @@ import hashlib
 import json
 import logging
 import os
+import threading
+import time
 from contextlib import contextmanager
+from dataclasses import dataclass, replace
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import numpy as np
 
+from src.api.gpu.faiss_wal import FAISSWriteAheadLog
+from src.api.metrics import metrics
+
 logger = logging.getLogger(__name__)
 
 try:
@@ -28,6 +34,381 @@ class FAISSIndexError(RuntimeError):
     """Raised when FAISS index operations fail."""
 
 
+INDEX_TYPES = ("flat", "hnsw", "ivf")
+STORAGE_TYPES = ("float32", "sq8", "pq")
+
+# Reserved meta-file key describing the index itself rather than an internal id.
+INDEX_META_KEY = "__index__"
+
+# Score FAISS reports for padded (id -1) inner-product hits.
+_NO_SCORE = np.float32(-np.finfo(np.float32).max)
+
+# Embedding rows read per query when a rebuild streams the embeddings table.
+REBUILD_CHUNK_ROWS = 2000
+
+# A migration rejected for low recall is retried once the live vector count
+# has grown by this factor (or the index settings change).
+MIGRATION_RETRY_GROWTH = 1.25
+
+
+@dataclass
+class FAISSIndexSettings:
+    """Index factory settings; see the CHL_FAISS_* variables in config.
+
+    ``index_type`` names the target index. ``flat`` always brute-forces;
+    ``hnsw`` and ``ivf`` start flat and migrate in the background once the
+    index holds ``ann_threshold`` vectors and the ANN candidate reaches
+    ``min_recall`` against the flat index.
+
+    ``storage`` picks how vectors are coded: ``float32`` keeps them exact,
+    ``sq8`` (4x smaller) and ``pq`` (~16x smaller) quantize them once enough
+    vectors exist to train the codebooks. Compressed indexes fetch
+    ``rescore_factor * top_k`` candidates and re-score them exactly against
+    the float32 vectors in the ``embeddings`` table (0 disables re-scoring).
+
+    ``mmap`` maps the index file read-only instead of copying it into memory;
+    appends then go to a small in-memory overlay until the next save.
+
+    ``wal`` logs each add/remove to an append-only file instead of rewriting
+    the index; the index and meta file are written at checkpoints (a save)
+    and the log is replayed on startup.
+    """
+
+    index_type: str = "flat"
+    ann_threshold: int = 50000
+    hnsw_m: int = 32
+    hnsw_ef_construction: int = 80
+    hnsw_ef_search: int = 64
+    ivf_nlist: int = 0
+    ivf_nprobe: int = 16
+    min_recall: float = 0.90
+    rebuild_threshold: float = 0.10
+    storage: str = "float32"
+    pq_m: int = 0
+    rescore_factor: int = 4
+    mmap: bool = False
+    wal: bool = False
+    wal_checkpoint_bytes: int = 64 * 1024 * 1024
+
+    @classmethod
+    def from_config(cls, config) -> "FAISSIndexSettings":
+        return cls(
+            index_type=getattr(config, "faiss_index_type", "flat"),
+            ann_threshold=getattr(config, "faiss_ann_threshold", 50000),
+            hnsw_m=getattr(config, "faiss_hnsw_m", 32),
+            hnsw_ef_construction=getattr(config, "faiss_hnsw_ef_construction", 80),
+            hnsw_ef_search=getattr(config, "faiss_hnsw_ef_search", 64),
+            ivf_nlist=getattr(config, "faiss_ivf_nlist", 0),
+            ivf_nprobe=getattr(config, "faiss_ivf_nprobe", 16),
+            min_recall=getattr(config, "faiss_ann_min_recall", 0.90),
+            rebuild_threshold=getattr(config, "faiss_rebuild_threshold", 0.10),
+            storage=getattr(config, "faiss_storage", "float32"),
+            pq_m=getattr(config, "faiss_pq_m", 0),
+            rescore_factor=getattr(config, "faiss_rescore_factor", 4),
+            mmap=getattr(config, "faiss_mmap", False),
+            wal=getattr(config, "faiss_wal", False),
+            wal_checkpoint_bytes=getattr(config, "faiss_wal_checkpoint_mb", 64) * 1024 * 1024,
+        )
+
+
+def evaluate_ann_recall(
+    faiss_module,
+    vectors: np.ndarray,
+    ann_index,
+    k: int = 10,
+    sample_size: int = 200,
+    seed: int = 0,
+    ids: Optional[np.ndarray] = None,
+    rescore_factor: int = 1,
+) -> Dict[str, float]:
+    """Measure recall@k and latency of ``ann_index`` against exact search.
+
+    Queries are sampled from the indexed vectors themselves; ground truth
+    comes from an exact inner-product scan over the same ``vectors`` (what
+    ``IndexFlatIP`` does), without copying them into a second index.
+    ``ids`` are the ids ``ann_index`` stores for each row of ``vectors``.
+    With ``rescore_factor > 1`` the ANN shortlist is ``k * rescore_factor``
+    deep; exact re-scoring then keeps every true neighbour found in it.
+    """
+    n = int(vectors.shape[0])
+    if n == 0:
+        return {"recall_at_k": 1.0, "k": k, "queries": 0, "flat_ms": 0.0, "ann_ms": 0.0}
+    k = min(k, n)
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(n, size=min(sample_size, n), replace=False)
+    queries = np.ascontiguousarray(vectors[picks], dtype=np.float32)
+
+    started = time.perf_counter()
+    _, truth = faiss_module.knn(
+        queries, vectors, k, metric=faiss_module.METRIC_INNER_PRODUCT
+    )
+    flat_ms = (time.perf_counter() - started) * 1000.0
+    if ids is not None:
+        truth = np.asarray(ids, dtype=np.int64)[truth]
+
+    started = time.perf_counter()
+    _, found = ann_index.search(queries, k * max(1, rescore_factor))
+    ann_ms = (time.perf_counter() - started) * 1000.0
+
+    hits = sum(
+        len(set(t.tolist()) & set(f.tolist())) for t, f in zip(truth, found)
+    )
+    return {
+        "recall_at_k": hits / float(k * len(queries)),
+        "k": k,
+        "queries": int(len(queries)),
+        "flat_ms": flat_ms / len(queries),
+        "ann_ms": ann_ms / len(queries),
+    }
+
+
+class EntityIdMap:
+    """Resident internal_id -> (entity_id, entity_type, category_code) map.
+
+    Entity ids, entity types and category codes are interned into small
+    vocabularies; the per-vector numpy arrays only hold integer codes so a
+    whole FAISS hit list can be resolved with one vectorized gather, and
+    filter masks can be computed without touching the database.
+    """
+
+    _MISSING = -1
+
+    def __init__(self) -> None:
+        self.clear()
+
+    def clear(self) -> None:
+        self._entity_vocab: List[str] = []
+        self._entity_codes: Dict[str, int] = {}
+        self._type_vocab: List[str] = []
+        self._type_codes: Dict[str, int] = {}
+        self._category_vocab: List[str] = []
+        self._category_codes: Dict[str, int] = {}
+        self._entity_idx = np.full(0, self._MISSING, dtype=np.int64)
+        self._type_idx = np.full(0, self._MISSING, dtype=np.int16)
+        self._category_idx = np.full(0, self._MISSING, dtype=np.int32)
+        self._size = 0
+        # Bumped on every mutation so callers can cache derived masks.
+        self.version = getattr(self, "version", 0) + 1
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._entity_idx[: self._size] != self._MISSING))
+
+    @property
+    def size(self) -> int:
+        """One past the largest internal id that has ever been mapped."""
+        return self._size
+
+    @staticmethod
+    def _intern(value: str, vocab: List[str], codes: Dict[str, int]) -> int:
+        code = codes.get(value)
+        if code is None:
+            code = len(vocab)
+            vocab.append(value)
+            codes[value] = code
+        return code
+
+    def _reserve(self, size: int) -> None:
+        capacity = self._entity_idx.shape[0]
+        if size <= capacity:
+            return
+        new_capacity = max(size, capacity * 2, 1024)
+        entity_idx = np.full(new_capacity, self._MISSING, dtype=np.int64)
+        type_idx = np.full(new_capacity, self._MISSING, dtype=np.int16)
+        category_idx = np.full(new_capacity, self._MISSING, dtype=np.int32)
+        entity_idx[:capacity] = self._entity_idx
+        type_idx[:capacity] = self._type_idx
+        category_idx[:capacity] = self._category_idx
+        self._entity_idx = entity_idx
+        self._type_idx = type_idx
+        self._category_idx = category_idx
+
+    def set(
+        self,
+        internal_ids: List[int],
+        entity_ids: List[str],
+        entity_types: List[str],
+        category_codes: Optional[List[Optional[str]]] = None,
+    ) -> None:
+        if len(internal_ids) == 0:
+            return
+        ids = np.asarray(internal_ids, dtype=np.int64)
+        self._reserve(int(ids.max()) + 1)
+        self._entity_idx[ids] = [
+            self._intern(str(e), self._entity_vocab, self._entity_codes) for e in entity_ids
+        ]
+        self._type_idx[ids] = [
+            self._intern(str(t), self._type_vocab, self._type_codes) for t in entity_types
+        ]
+        if category_codes is None:
+            self._category_idx[ids] = self._MISSING
+        else:
+            self._category_idx[ids] = [
+                self._intern(str(c), self._category_vocab, self._category_codes)
+                if c
+                else self._MISSING
+                for c in category_codes
+            ]
+        self._size = max(self._size, int(ids.max()) + 1)
+        self.version += 1
+
+    def ids_for_entities(self, entity_ids: List[str]) -> np.ndarray:
+        """Live internal ids currently mapped to any of ``entity_ids``."""
+        codes = [self._entity_codes[e] for e in entity_ids if e in self._entity_codes]
+        if not codes:
+            return np.zeros(0, dtype=np.int64)
+        hits = np.isin(self._entity_idx[: self._size], np.asarray(codes, dtype=np.int64))
+        return np.flatnonzero(hits).astype(np.int64)
+
+    def remove(self, internal_ids) -> None:
+        ids = np.asarray(internal_ids, dtype=np.int64).reshape(-1)
+        ids = ids[(ids >= 0) & (ids < self._size)]
+        if ids.size == 0:
+            return
+        self._entity_idx[ids] = self._MISSING
+        self._type_idx[ids] = self._MISSING
+        self._category_idx[ids] = self._MISSING
+        self.version += 1
+
+    def entities_missing_category(self) -> List[str]:
+        live = self._entity_idx[: self._size] != self._MISSING
+        missing = live & (self._category_idx[: self._size] == self._MISSING)
+        codes = np.unique(self._entity_idx[: self._size][missing])
+        return [self._entity_vocab[code] for code in codes.tolist()]
+
+    def set_categories(self, categories: Dict[str, Optional[str]]) -> None:
+        """Fill category codes by entity id (used to backfill older meta files)."""
+        if not categories:
+            return
+        by_entity = np.full(len(self._entity_vocab), self._MISSING, dtype=np.int32)
+        for entity_id, category_code in categories.items():
+            entity_code = self._entity_codes.get(entity_id)
+            if entity_code is None or not category_code:
+                continue
+            by_entity[entity_code] = self._intern(
+                str(category_code), self._category_vocab, self._category_codes
+            )
+        rows = np.flatnonzero(
+            (self._entity_idx[: self._size] != self._MISSING)
+            & (self._category_idx[: self._size] == self._MISSING)
+        )
+        filled = by_entity[self._entity_idx[rows]]
+        known = filled != self._MISSING
+        self._category_idx[rows[known]] = filled[known]
+        self.version += 1
+
+    def _valid(self, ids: np.ndarray) -> np.ndarray:
+        valid = (ids >= 0) & (ids < self._size)
+        valid[valid] = self._entity_idx[ids[valid]] != self._MISSING
+        return valid
+
+    def type_mask(self, internal_ids: np.ndarray, entity_type: str) -> np.ndarray:
+        """Boolean mask of ``internal_ids`` that map to ``entity_type``."""
+        ids = np.asarray(internal_ids, dtype=np.int64)
+        mask = np.zeros(ids.shape, dtype=bool)
+        code = self._type_codes.get(entity_type)
+        if code is None:
+            return mask
+        valid = self._valid(ids)
+        mask[valid] = self._type_idx[ids[valid]] == code
+        return mask
+
+    def selection_mask(
+        self,
+        entity_type: Optional[str] = None,
+        category_code: Optional[str] = None,
+    ) -> np.ndarray:
+        """Boolean mask over ``[0, size)`` of ids matching every given filter."""
+        mask = self._entity_idx[: self._size] != self._MISSING
+        if entity_type:
+            code = self._type_codes.get(entity_type)
+            if code is None:
+                return np.zeros(self._size, dtype=bool)
+            mask &= self._type_idx[: self._size] == code
+        if category_code:
+            code = self._category_codes.get(category_code)
+            if code is None:
+                return np.zeros(self._size, dtype=bool)
+            mask &= self._category_idx[: self._size] == code
+        return mask
+
+    def gather(self, internal_ids) -> List[Optional[Dict[str, str]]]:
+        """Resolve a batch of internal ids; unknown or negative ids map to None."""
+        ids = np.asarray(internal_ids, dtype=np.int64).reshape(-1)
+        valid = self._valid(ids)
+        entity_codes = np.full(ids.shape, self._MISSING, dtype=np.int64)
+        type_codes = np.full(ids.shape, self._MISSING, dtype=np.int64)
+        category_codes = np.full(ids.shape, self._MISSING, dtype=np.int64)
+        entity_codes[valid] = self._entity_idx[ids[valid]]
+        type_codes[valid] = self._type_idx[ids[valid]]
+        category_codes[valid] = self._category_idx[ids[valid]]
+
+        results: List[Optional[Dict[str, str]]] = []
+        for ok, entity_code, type_code, category_code in zip(
+            valid.tolist(),
+            entity_codes.tolist(),
+            type_codes.tolist(),
+            category_codes.tolist(),
+        ):
+            if not ok:
+                results.append(None)
+                continue
+            mapping = {
+                "entity_id": self._entity_vocab[entity_code],
+                "entity_type": self._type_vocab[type_code],
+            }
+            if category_code != self._MISSING:
+                mapping["category_code"] = self._category_vocab[category_code]
+            results.append(mapping)
+        return results
+
+    @classmethod
+    def from_metadata(cls, metadata: Dict[str, Dict[str, str]]) -> "EntityIdMap":
+        id_map = cls()
+        internal_ids: List[int] = []
+        entity_ids: List[str] = []
+        entity_types: List[str] = []
+        category_codes: List[Optional[str]] = []
+        for key, mapping in metadata.items():
+            try:
+                internal_id = int(key)
+            except (TypeError, ValueError):
+                continue
+            if internal_id < 0 or not isinstance(mapping, dict):
+                continue
+            internal_ids.append(internal_id)
+            entity_ids.append(str(mapping.get("entity_id")))
+            entity_types.append(str(mapping.get("entity_type")))
+            category_codes.append(mapping.get("category_code"))
+        id_map.set(internal_ids, entity_ids, entity_types, category_codes)
+        return id_map
+
+    def to_metadata(self) -> Dict[str, Dict[str, str]]:
+        ids = np.flatnonzero(self._entity_idx[: self._size] != self._MISSING)
+        return {
+            str(internal_id): mapping
+            for internal_id, mapping in zip(ids.tolist(), self.gather(ids))
+            if mapping is not None
+        }
+
+
+@dataclass
+class ShadowRebuild:
+    """An index and id map rebuilt beside the live ones.
+
+    ``begin_rebuild`` fills in the plan (reserved ``base_id``, last embeddings
+    row to read, target kind/storage); ``build_shadow`` adds ``index`` and
+    ``id_map``; ``install_shadow`` swaps them in.
+    """
+
+    base_id: int
+    max_row: int
+    rows: int  # distinct entities, i.e. live vectors after duplicates collapse
+    kind: str
+    storage: str
+    index: object = None
+    id_map: Optional[EntityIdMap] = None
+
+
 class FAISSIndexManager:
     """Manages FAISS index lifecycle with incremental updates."""
 
@@ -38,10 +419,28 @@ class FAISSIndexManager:
         dimension: int,
         session=None,
         session_factory=None,
+        index_settings: Optional[FAISSIndexSettings] = None,
     ):
         self.index_dir = Path(index_dir)
         self.model_name = model_name
         self.dimension = dimension
+        self.index_settings = index_settings or FAISSIndexSettings()
+        if self.index_settings.index_type not in INDEX_TYPES:
+            raise ValueError(
+                f"Invalid index_type: {self.index_settings.index_type}. "
+                f"Must be one of: {', '.join(INDEX_TYPES)}"
+            )
+        if self.index_settings.storage not in STORAGE_TYPES:
+            raise ValueError(
+                f"Invalid storage: {self.index_settings.storage}. "
+                f"Must be one of: {', '.join(STORAGE_TYPES)}"
+            )
+        # Storage of the live index; read back from the meta file on load.
+        self.storage = "float32"
+        # Latest recall/latency comparison of an ANN candidate vs the flat index.
+        self.ann_report: Optional[Dict[str, object]] = None
+        # (kind, storage, live vectors, settings) of the last candidate rejected for recall.
+        self._rejected_migration: Optional[Tuple[str, str, int, FAISSIndexSettings]] = None
 
         if not session_factory and not session:
             logger.warning(
@@ -73,9 +472,29 @@ class FAISSIndexManager:
 
         self.index_path = self.index_dir / self.index_filename
         self.meta_path = self.index_dir / self.meta_filename
+        self.wal: Optional[FAISSWriteAheadLog] = None
+        if self.index_settings.wal:
+            self.wal = FAISSWriteAheadLog(
+                self.index_dir / f"unified_{model_slug}.wal", self.index_path, dimension
+            )
+        self._replaying = False
 
         self._index = None
+        # Set when _index is a read-only mapping of index_path; writes go to _overlay.
+        self._mapped = False
+        self._overlay = None
         self._faiss = None
+        self._id_map: Optional[EntityIdMap] = None
+        self._selectors: Dict[Tuple[Optional[str], Optional[str]], tuple] = {}
+        self._selectors_version = -1
+        # Searches run concurrently under the read lock; this guards the selector cache.
+        self._selectors_lock = threading.Lock()
+        self._next_id = 0
+        self._stale_count = 0
+        # FAISSMetadata rows flagged deleted; None until first read from the database.
+        self._tombstone_count: Optional[int] = None
+        # Writes made while a shadow rebuild runs, re-applied to it on install.
+        self._rebuild_journal: Optional[list] = None
         self._lock_path = self.index_dir / "faiss_index.lock"
 
     @property
@@ -97,32 +516,524 @@ class FAISSIndexManager:
                 ) from exc
         return self._faiss
 
+    @property
+    def id_map(self) -> EntityIdMap:
+        """Resident id map, loaded once from the meta file and kept in sync by add()."""
+        if self._id_map is None:
+            id_map = EntityIdMap.from_metadata(self._load_metadata())
+            self._backfill_categories(id_map)
+            self._id_map = id_map
+        return self._id_map
+
+    def _backfill_categories(self, id_map: EntityIdMap) -> None:
+        """Fill category codes missing from meta files written before they were tracked."""
+        missing = id_map.entities_missing_category()
+        if not missing or not (self.session_factory or self.session):
+            return
+        from src.common.storage.schema import CategorySkill, Experience
+
+        try:
+            with self._session_scope(read_only=True) as session:
+                categories = dict(session.query(Experience.id, Experience.category_code).all())
+                categories.update(
+                    session.query(CategorySkill.id, CategorySkill.category_code).all()
+                )
+        except Exception as exc:
+            logger.warning("Failed to backfill FAISS category codes: %s", exc)
+            return
+        id_map.set_categories({entity_id: categories.get(entity_id) for entity_id in missing})
+
     def _load_or_create_index(self) -> None:
+        # Any (re)load from disk must re-read the meta file alongside the index.
+        self._id_map = None
+        self._stale_count = 0
+        self._overlay = None
         if self.index_path.exists():
             try:
                 logger.info("Loading FAISS index from %s", self.index_path)
-                self._index = self.faiss.read_index(str(self.index_path))
-                if self._index.d != self.dimension:
+                index = self._read_index()
+                if index.d != self.dimension:
                     logger.warning(
                         "Index dimension mismatch: expected %s, got %s",
                         self.dimension,
-                        self._index.d,
+                        index.d,
                     )
+                self._index = self._ensure_id_mapped(index)
             except Exception as exc:
                 raise FAISSIndexError(f"Failed to load FAISS index: {exc}") from exc
+            # Indexes written before storage was recorded are float32.
+            self.storage = self._index_meta().get("storage", "float32")
+            self._next_id = max(self.id_map.size, self._max_index_id() + 1)
+            # Vectors FAISS could not physically remove (HNSW) stay until compaction.
+            self._stale_count = max(0, self._index.ntotal - len(self.id_map))
         else:
             logger.info("FAISS index not found; creating new empty index")
-            self._create_new_index(reset_metadata=True)
-
-    def _create_new_index(self, reset_metadata: bool = False) -> None:
+            # Writes logged since the file went missing are replayed onto the
+            # new index, so neither their mappings nor a reset may be dropped
+            # in before them.
+            pending = self.wal is not None and self.wal.has_pending()
+            self._create_new_index(reset_metadata=not pending, log_reset=False)
+
+    def _read_index(self):
+        """Read index_path, mapping it read-only when mmap loading is enabled."""
         faiss = self.faiss
-        # Use a simple inner-product index. We manage ID mapping in SQLite
-        # via FAISSMetadata, so we don't need FAISS' IDMap wrapper. This keeps
-        # compatibility with faiss-cpu builds that require add_with_ids for IDMap.
-        self._index = faiss.IndexFlatIP(self.dimension)
+        self._mapped = False
+        if self.index_settings.mmap:
+            flags = (
+                faiss.IO_FLAG_MMAP
+                | faiss.IO_FLAG_READ_ONLY
+                | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+            )
+            try:
+                index = faiss.read_index(str(self.index_path), flags)
+                self._mapped = True
+                return index
+            except (RuntimeError, AttributeError) as exc:
+                logger.warning("mmap load unavailable (%s); reading index into memory", exc)
+        return faiss.read_index(str(self.index_path))
+
+    def reload(self) -> None:
+        """Drop the live index and load index_path (and its meta file) again.
+
+        Logged writes applied to the dropped index are discarded with it.
+        """
+        self._index = None
+        self._load_or_create_index()
+        if self.wal is not None:
+            self.wal.reset()
+
+    def replay_wal(self) -> int:
+        """Re-apply writes logged since the index file was last written."""
+        if self.wal is None:
+            return 0
+        applied = 0
+        self._replaying = True
+        try:
+            _ = self.index
+            for header, vectors in self.wal.records():
+                op = header.get("op")
+                if op == "reset":
+                    self._create_new_index()
+                elif op == "add":
+                    superseded = np.asarray(header.get("superseded") or [], dtype=np.int64)
+                    self._stale_count += self._remove_ids(superseded)
+                    self.id_map.remove(superseded)
+                    ids = np.asarray(header["ids"], dtype=np.int64)
+                    self._writable().add_with_ids(vectors, ids)
+                    self.id_map.set(
+                        ids.tolist(),
+                        header["entity_ids"],
+                        header["entity_types"],
+                        header.get("category_codes"),
+                    )
+                    self._next_id = max(self._next_id, int(ids.max()) + 1)
+                elif op == "remove":
+                    ids = np.asarray(header["ids"], dtype=np.int64)
+                    self._stale_count += self._remove_ids(ids)
+                    self.id_map.remove(ids)
+                applied += 1
+        finally:
+            self._replaying = False
+        if applied:
+            logger.info("Replayed %s FAISS WAL records from %s", applied, self.wal.path)
+        return applied
+
+    @property
+    def ntotal(self) -> int:
+        """Stored vectors, including the mmap overlay and not-yet-compacted ones."""
+        overlay = self._overlay.ntotal if self._overlay is not None else 0
+        return self.index.ntotal + overlay
+
+    def _writable(self):
+        """Index that accepts appends: the live index, or the overlay of a mapped one."""
+        if not self._mapped:
+            return self.index
+        if self._overlay is None:
+            self._overlay = self.faiss.IndexIDMap2(self.faiss.IndexFlatIP(self.dimension))
+        return self._overlay
+
+    def _remove_ids(self, ids: np.ndarray) -> int:
+        """Remove ``ids`` from the overlay / live index; returns how many stay masked."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if ids.size == 0:
+            return 0
+        if self._overlay is not None and self._overlay.ntotal:
+            in_overlay = np.isin(ids, self._stored_ids(self._overlay))
+            if in_overlay.any():
+                self._overlay.remove_ids(ids[in_overlay])
+            ids = ids[~in_overlay]
+        if self._mapped:
+            # A read-only mapping cannot shrink; mask until the next compaction.
+            return int(ids.size)
+        return self._remove_from(self.index, ids)
+
+    def index_for_save(self):
+        """Index to serialize: the live index merged with any mmap overlay.
+
+        A mapped index cannot grow, and neither can its clone (FAISS clones
+        keep viewing the mapped memory and abort on append), so the merge
+        starts from an owned, in-memory read of index_path.
+        """
+        index = self.index
+        overlay = self._overlay
+        if overlay is None or overlay.ntotal == 0:
+            return index
+        if self._mapped:
+            merged = self.faiss.read_index(str(self.index_path))
+        else:
+            merged = self.faiss.clone_index(index)
+        merged.add_with_ids(
+            self._reconstruct_all(self._base_index(overlay)), self._stored_ids(overlay)
+        )
+        return merged
+
+    def before_save(self) -> None:
+        """Write the meta file ahead of the index so a crash never loses mappings."""
+        if self.wal is not None:
+            self._save_metadata(self.id_map.to_metadata())
+
+    def after_save(self) -> None:
+        """Checkpoint: restart the WAL against the new index file and re-map it."""
+        if self.wal is not None:
+            self.wal.reset()
+        if not self.index_settings.mmap or self._overlay is None:
+            return
+        id_map = self.id_map
+        index = self._ensure_id_mapped(self._read_index())
+        self._index = index
+        self._overlay = None
+        self._stale_count = max(0, index.ntotal - len(id_map))
+
+    def _create_new_index(self, reset_metadata: bool = False, log_reset: bool = True) -> None:
+        """Start an empty index; ``log_reset`` records the reset in the WAL.
+
+        Loading passes ``log_reset=False``: a reset logged there would land
+        after earlier adds in the log and wipe them out on replay.
+        """
+        # IVF needs training data, so it always starts flat and migrates later.
+        settings = self.index_settings
+        if settings.index_type == "hnsw" and settings.ann_threshold <= 0:
+            base = self._new_hnsw_index()
+        else:
+            base = self.faiss.IndexFlatIP(self.dimension)
+        self._index = self.faiss.IndexIDMap2(base)
+        self._mapped = False
+        self._overlay = None
+        if self.wal is not None and log_reset and not self._replaying:
+            self.wal.append_reset()
+        # Quantizers need training data, so compressed storage is adopted later too.
+        self.storage = "float32"
+        # Ids restart at 0, so previous mappings no longer apply.
+        self._id_map = EntityIdMap()
+        self._next_id = 0
+        self._stale_count = 0
         if reset_metadata:
             self._reset_metadata()
 
+    def _ensure_id_mapped(self, index):
+        """Wrap a positional index (written before ids were stable) in IndexIDMap2.
+
+        Positions become ids, so existing meta files keep resolving.
+        """
+        faiss = self.faiss
+        if isinstance(faiss.downcast_index(index), (faiss.IndexIDMap2, faiss.IndexIVF)):
+            self._prepare_index(index)
+            return index
+        logger.info("Converting positional FAISS index to IndexIDMap2 (%s vectors)", index.ntotal)
+        self._mapped = False
+        self._prepare_index(index)
+        vectors = self._reconstruct_all(index)
+        base = faiss.clone_index(index)
+        base.reset()
+        self._prepare_index(base)
+        mapped = faiss.IndexIDMap2(base)
+        if vectors.shape[0]:
+            mapped.add_with_ids(vectors, np.arange(vectors.shape[0], dtype=np.int64))
+        return mapped
+
+    def _base_index(self, index=None):
+        faiss = self.faiss
+        index = faiss.downcast_index(index if index is not None else self.index)
+        if isinstance(index, faiss.IndexIDMap):
+            return faiss.downcast_index(index.index)
+        return index
+
+    def _reconstruct_all(self, base) -> np.ndarray:
+        if base.ntotal == 0:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        return base.reconstruct_n(0, base.ntotal)
+
+    def _stored_ids(self, index) -> Optional[np.ndarray]:
+        """Ids held by an IndexIDMap2 (None for IVF, which stores ids in its lists)."""
+        index = self.faiss.downcast_index(index)
+        if isinstance(index, self.faiss.IndexIDMap):
+            return self.faiss.vector_to_array(index.id_map)
+        return None
+
+    def _max_index_id(self) -> int:
+        ids = self._stored_ids(self.index)
+        return int(ids.max()) if ids is not None and ids.size else -1
+
+    def _new_hnsw_index(self):
+        faiss = self.faiss
+        settings = self.index_settings
+        index = faiss.IndexHNSWFlat(self.dimension, settings.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = settings.hnsw_ef_construction
+        self._prepare_index(index)
+        return index
+
+    def build_index(
+        self,
+        kind: str,
+        ids: np.ndarray,
+        vectors: np.ndarray,
+        storage: Optional[str] = None,
+    ):
+        """Build (train + fill) an id-mapped index of ``kind`` over ``vectors``."""
+        faiss = self.faiss
+        settings = self.index_settings
+        storage = storage or self.storage
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        n = int(vectors.shape[0])
+        nlist = 0
+        if kind == "ivf":
+            nlist = settings.ivf_nlist or int(4 * np.sqrt(max(n, 1)))
+            # FAISS wants roughly 39 training points per centroid.
+            nlist = max(1, min(nlist, n // 39 or 1))
+        if storage != "float32":
+            base = faiss.index_factory(
+                self.dimension,
+                self._factory_string(kind, storage, nlist),
+                faiss.METRIC_INNER_PRODUCT,
+            )
+            if kind == "hnsw":
+                base.hnsw.efConstruction = settings.hnsw_ef_construction
+            base.train(vectors)
+            self._prepare_index(base)
+        elif kind == "hnsw":
+            base = self._new_hnsw_index()
+        elif kind == "ivf":
+            quantizer = faiss.IndexFlatIP(self.dimension)
+            base = faiss.IndexIVFFlat(
+                quantizer, self.dimension, nlist, faiss.METRIC_INNER_PRODUCT
+            )
+            base.train(vectors)
+            self._prepare_index(base)
+        else:
+            base = faiss.IndexFlatIP(self.dimension)
+        if kind == "ivf":
+            # IVF stores external ids natively and removes them in place, which
+            # IndexIDMap2 (built for order-compacting indexes) would break.
+            if n:
+                base.add_with_ids(vectors, np.asarray(ids, dtype=np.int64))
+            return base
+        index = faiss.IndexIDMap2(base)
+        if n:
+            index.add_with_ids(vectors, np.asarray(ids, dtype=np.int64))
+        return index
+
+    def _factory_string(self, kind: str, storage: str, nlist: int) -> str:
+        code = "SQ8" if storage == "sq8" else f"PQ{self._pq_m()}"
+        if kind == "hnsw":
+            return f"HNSW{self.index_settings.hnsw_m},{code}"
+        if kind == "ivf":
+            return f"IVF{nlist},{code}"
+        return code
+
+    def _pq_m(self) -> int:
+        """Sub-quantizer count; auto picks 1 byte per 4 dimensions (16x smaller)."""
+        m = self.index_settings.pq_m or max(1, self.dimension // 4)
+        while self.dimension % m:
+            m -= 1
+        return m
+
+    @staticmethod
+    def _min_train_points(storage: str) -> int:
+        if storage == "pq":
+            # 8-bit codebooks: 256 centroids per sub-quantizer, ~39 points each.
+            return 256 * 39
+        if storage == "sq8":
+            return 1000
+        return 0
+
+    def index_kind(self, index=None) -> str:
+        """Return 'flat', 'hnsw' or 'ivf' for ``index`` (defaults to the live index)."""
+        faiss = self.faiss
+        base = self._base_index(index)
+        if isinstance(base, faiss.IndexHNSW):
+            return "hnsw"
+        if isinstance(base, faiss.IndexIVF):
+            return "ivf"
+        return "flat"
+
+    def _prepare_index(self, index) -> None:
+        faiss = self.faiss
+        settings = self.index_settings
+        base = self._base_index(index)
+        if isinstance(base, faiss.IndexHNSW):
+            base.hnsw.efSearch = settings.hnsw_ef_search
+        elif isinstance(base, faiss.IndexIVF):
+            base.nprobe = settings.ivf_nprobe
+            # A hashtable direct map keeps reconstruct() and remove_ids() usable.
+            base.set_direct_map_type(faiss.DirectMap.Hashtable)
+
+    def migration_target(self) -> Optional[Tuple[str, str]]:
+        """Return the ``(index_type, storage)`` the live index should move to, if any."""
+        settings = self.index_settings
+        kind = self.index_kind()
+        live = len(self.id_map)
+        target_kind = kind
+        if settings.index_type != "flat" and kind == "flat":
+            threshold = settings.ann_threshold
+            if settings.index_type == "ivf":
+                threshold = max(threshold, 39)
+            if live >= threshold:
+                target_kind = settings.index_type
+        target_storage = self.storage
+        if settings.storage != self.storage and live >= self._min_train_points(settings.storage):
+            target_storage = settings.storage
+        if (target_kind, target_storage) == (kind, self.storage):
+            return None
+        rejected = self._rejected_migration
+        if (
+            rejected is not None
+            and rejected[:2] == (target_kind, target_storage)
+            and rejected[3] == settings
+            and live < rejected[2] * MIGRATION_RETRY_GROWTH
+        ):
+            return None
+        return target_kind, target_storage
+
+    def reject_migration(self, kind: str, storage: str, ntotal: int) -> None:
+        """Hold off ``migration_target`` for this target until the corpus grows."""
+        self._rejected_migration = (kind, storage, int(ntotal), replace(self.index_settings))
+
+    def snapshot_live(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(ids, vectors)`` for every live (non-superseded) vector."""
+        index = self.index
+        live = self.id_map.selection_mask()
+        ids = self._stored_ids(index)
+        if ids is None:
+            ids = np.flatnonzero(live).astype(np.int64)
+            return ids, self.exact_vectors(ids)
+        parts = [index]
+        if self._overlay is not None and self._overlay.ntotal:
+            parts.append(self._overlay)
+            ids = np.concatenate([ids, self._stored_ids(self._overlay)])
+        keep = np.zeros(ids.shape, dtype=bool)
+        in_range = ids < live.shape[0]
+        keep[in_range] = live[ids[in_range]]
+        if self.storage != "float32":
+            # Decoded codes are lossy; retrain from the float32 originals.
+            return ids[keep], self.exact_vectors(ids[keep])
+        vectors = np.vstack([self._reconstruct_all(self._base_index(p)) for p in parts])
+        return ids[keep], vectors[keep]
+
+    def reconstruct_ids(self, ids: np.ndarray) -> np.ndarray:
+        """Copy the vectors stored under ``ids`` out of the live index."""
+        if len(ids) == 0:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        index = self.index
+        overlay = self._overlay
+        rows = []
+        for internal_id in ids:
+            if overlay is not None and overlay.ntotal:
+                try:
+                    rows.append(overlay.reconstruct(int(internal_id)))
+                    continue
+                except RuntimeError:
+                    pass
+            rows.append(index.reconstruct(int(internal_id)))
+        return np.vstack(rows).astype(np.float32)
+
+    def exact_vectors(self, internal_ids) -> np.ndarray:
+        """float32 vectors for ``internal_ids`` from the ``embeddings`` table.
+
+        Falls back to decoding the index for ids without a stored embedding.
+        """
+        ids = np.asarray(internal_ids, dtype=np.int64).reshape(-1)
+        if ids.size == 0:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        if self.storage == "float32" or not (self.session_factory or self.session):
+            return self.reconstruct_ids(ids)
+
+        from src.common.storage.repository import EmbeddingRepository
+        from src.common.storage.schema import Embedding
+
+        mappings = self.id_map.gather(ids)
+        wanted = sorted({m["entity_id"] for m in mappings if m})
+        stored: Dict[str, tuple] = {}
+        with self._session_scope(read_only=True) as session:
+            for start in range(0, len(wanted), 500):
+                rows = (
+                    session.query(
+                        Embedding.entity_id,
+                        Embedding.vector_blob,
+                        Embedding.vector,
+                        Embedding.vector_dim,
+                    )
+                    .filter(
+                        Embedding.model_version == self.model_name,
+                        Embedding.entity_id.in_(wanted[start : start + 500]),
+                    )
+                    .order_by(Embedding.id)
+                    .all()
+                )
+                # Latest row wins when an entity was embedded more than once.
+                stored.update((row[0], row[1:]) for row in rows)
+
+        vectors = np.empty((ids.size, self.dimension), dtype=np.float32)
+        for row, (internal_id, mapping) in enumerate(zip(ids.tolist(), mappings)):
+            raw = stored.get(mapping["entity_id"]) if mapping else None
+            if raw is not None:
+                vectors[row] = EmbeddingRepository.decode_stored(*raw)
+            else:
+                vectors[row] = self.reconstruct_ids([internal_id])[0]
+        return vectors
+
+    def swap_index(
+        self,
+        candidate,
+        candidate_ids: np.ndarray,
+        storage: Optional[str] = None,
+    ) -> None:
+        """Replace the live index with ``candidate`` built from ``candidate_ids``.
+
+        Ids are never reused, so writes made while the candidate was built are
+        replayed by diffing ids: new live ids are copied over and ids that
+        were removed meanwhile are dropped from the candidate.
+        """
+        live = np.flatnonzero(self.id_map.selection_mask())
+        added = np.setdiff1d(live, candidate_ids, assume_unique=True)
+        removed = np.setdiff1d(candidate_ids, live, assume_unique=True)
+        if added.size:
+            candidate.add_with_ids(self.exact_vectors(added), added.astype(np.int64))
+        stale = 0
+        if removed.size:
+            stale = self._remove_from(candidate, removed)
+        self._prepare_index(candidate)
+        self._index = candidate
+        self._mapped = False
+        self._overlay = None
+        self._stale_count = stale
+        self._selectors = {}
+        self._selectors_version = -1
+        if storage and storage != self.storage:
+            self.storage = storage
+            self._save_metadata(self.id_map.to_metadata())
+
+    def _remove_from(self, index, ids: np.ndarray) -> int:
+        """Physically remove ``ids``; returns how many had to stay as stale vectors."""
+        if len(ids) == 0:
+            return 0
+        try:
+            index.remove_ids(np.asarray(ids, dtype=np.int64))
+            return 0
+        except RuntimeError as exc:
+            # HNSW cannot delete; superseded ids are masked out until compaction.
+            logger.debug("FAISS remove_ids unsupported (%s); masking %s ids", exc, len(ids))
+            return len(ids)
+
     def _reset_metadata(self) -> None:
         if not (self.session_factory or self.session):
             return
@@ -189,27 +1100,78 @@ class FAISSIndexManager:
         entity_ids: List[str],
         entity_types: List[str],
         embeddings: np.ndarray,
+        category_codes: Optional[List[Optional[str]]] = None,
     ) -> List[int]:
+        """Upsert one vector per entity.
+
+        Each vector gets a fresh id (ids are never reused); any vector already
+        indexed for the same entity is removed and tombstoned in FAISSMetadata.
+        When an entity appears more than once in a batch the last row wins.
+        """
         if (
             len(entity_ids) != len(entity_types)
             or len(entity_ids) != embeddings.shape[0]
         ):
             raise ValueError("Mismatched lengths for entity_ids/entity_types/embeddings")
+        if category_codes is not None and len(category_codes) != len(entity_ids):
+            raise ValueError("Mismatched lengths for entity_ids/category_codes")
         if embeddings.shape[1] != self.dimension:
             raise ValueError(
                 f"Embedding dimension mismatch: expected {self.dimension}, got {embeddings.shape[1]}"
             )
 
+        last_row = {entity_id: row for row, entity_id in enumerate(entity_ids)}
+        if len(last_row) != len(entity_ids):
+            rows = sorted(last_row.values())
+            entity_ids = [entity_ids[i] for i in rows]
+            entity_types = [entity_types[i] for i in rows]
+            if category_codes is not None:
+                category_codes = [category_codes[i] for i in rows]
+            embeddings = embeddings[rows]
+
         try:
             with self._exclusive_lock():
-                start_id = self.index.ntotal
-                self.index.add(embeddings)
-                internal_ids = list(range(start_id, start_id + len(entity_ids)))
-                self._save_metadata_mappings(entity_ids, entity_types, internal_ids)
+                superseded = self.id_map.ids_for_entities(entity_ids)
+                self._stale_count += self._remove_ids(superseded)
+                self.id_map.remove(superseded)
+
+                start_id = self._next_id
+                new_ids = np.arange(start_id, start_id + len(entity_ids), dtype=np.int64)
+                self._writable().add_with_ids(
+                    np.ascontiguousarray(embeddings, dtype=np.float32), new_ids
+                )
+                self._next_id = start_id + len(entity_ids)
+                internal_ids = new_ids.tolist()
+                self._save_metadata_mappings(
+                    entity_ids,
+                    entity_types,
+                    internal_ids,
+                    category_codes,
+                    superseded_ids=superseded.tolist(),
+                )
+                if self.wal is not None:
+                    self.wal.append_add(
+                        internal_ids,
+                        entity_ids,
+                        entity_types,
+                        category_codes,
+                        embeddings,
+                        superseded.tolist(),
+                    )
+                if self._rebuild_journal is not None:
+                    self._rebuild_journal.append(
+                        (
+                            list(entity_ids),
+                            list(entity_types),
+                            list(category_codes) if category_codes is not None else None,
+                            np.array(embeddings, dtype=np.float32),
+                        )
+                    )
                 logger.info(
-                    "Added %s vectors to FAISS index (total: %s)",
+                    "Upserted %s vectors in FAISS index (replaced: %s, total: %s)",
                     len(entity_ids),
-                    self.index.ntotal,
+                    len(superseded),
+                    self.ntotal,
                 )
                 return internal_ids
         except Exception as exc:
@@ -220,37 +1182,416 @@ class FAISSIndexManager:
                     pass
             raise FAISSIndexError(f"Failed to add vectors to index: {exc}") from exc
 
+    def remove(self, entity_ids: List[str]) -> int:
+        """Remove every vector indexed for ``entity_ids``; returns the number removed."""
+        try:
+            with self._exclusive_lock():
+                ids = self.id_map.ids_for_entities(entity_ids)
+                if ids.size == 0:
+                    return 0
+                self._stale_count += self._remove_ids(ids)
+                self.id_map.remove(ids)
+                self._mark_tombstones(ids.tolist())
+                if self._rebuild_journal is not None:
+                    self._rebuild_journal.append((list(entity_ids), None, None, None))
+                if self.wal is not None:
+                    self.wal.append_remove(ids.tolist())
+                else:
+                    self._save_metadata(self.id_map.to_metadata())
+                logger.info("Removed %s vectors from FAISS index", ids.size)
+                return int(ids.size)
+        except Exception as exc:
+            raise FAISSIndexError(f"Failed to remove vectors from index: {exc}") from exc
+
+    def compact(self) -> int:
+        """Rebuild the index from live vectors only and purge tombstone rows.
+
+        Returns the number of vectors in the compacted index.
+        """
+        try:
+            with self._exclusive_lock():
+                ids, vectors = self.snapshot_live()
+                candidate = self.build_index(self.index_kind(), ids, vectors)
+                self.swap_index(candidate, ids, self.storage)
+                self._purge_tombstones()
+                logger.info("FAISS index compacted: %s live vectors", candidate.ntotal)
+                return int(candidate.ntotal)
+        except Exception as exc:
+            raise FAISSIndexError(f"Failed to compact FAISS index: {exc}") from exc
+
+    def rebuild(self, chunk_size: int = REBUILD_CHUNK_ROWS) -> int:
+        """Rebuild from the ``embeddings`` table beside the live index, then swap and save.
+
+        Returns the number of vectors in the rebuilt index.
+        """
+        shadow = self.begin_rebuild()
+        try:
+            shadow = self.build_shadow(shadow, chunk_size)
+        except Exception as exc:
+            self.abort_rebuild()
+            raise FAISSIndexError(f"Failed to rebuild FAISS index: {exc}") from exc
+        total = self.install_shadow(shadow)
+        self.save()
+        return total
+
+    def begin_rebuild(self) -> ShadowRebuild:
+        """Start journaling writes and reserve ids for a shadow rebuild.
+
+        The shadow gets fresh ids above every live one, so an id returned by
+        a search just before the swap can never resolve to another entity.
+        """
+        if self._rebuild_journal is not None:
+            raise FAISSIndexError("A FAISS index rebuild is already in progress")
+        from sqlalchemy import func
+        from src.common.storage.schema import Embedding
+
+        # Journal first: rows written after the count below reach the shadow through it.
+        self._rebuild_journal = []
+        try:
+            with self._session_scope(read_only=True) as session:
+                # Distinct entities: one live vector each once duplicates collapse.
+                max_row, rows = (
+                    session.query(
+                        func.max(Embedding.id), func.count(func.distinct(Embedding.entity_id))
+                    )
+                    .filter(Embedding.model_version == self.model_name)
+                    .one()
+                )
+            plan = ShadowRebuild(
+                base_id=self._next_id,
+                max_row=int(max_row or 0),
+                rows=int(rows or 0),
+                kind=self.index_kind(),
+                storage=self.storage,
+            )
+        except Exception as exc:
+            self._rebuild_journal = None
+            raise FAISSIndexError(f"Failed to start FAISS index rebuild: {exc}") from exc
+        self._next_id += int(rows or 0)
+        return plan
+
+    def abort_rebuild(self) -> None:
+        self._rebuild_journal = None
+
+    def iter_embedding_chunks(
+        self,
+        max_row: Optional[int] = None,
+        chunk_size: int = REBUILD_CHUNK_ROWS,
+    ) -> Iterator:
+        """Stream this model's embeddings (up to ``max_row``) in chunks.
+
+        See ``EmbeddingRepository.iter_by_model``; one read-only session
+        serves the whole scan.
+        """
+        from src.common.storage.repository import EmbeddingRepository
+
+        with self._session_scope(read_only=True) as session:
+            yield from EmbeddingRepository(session).iter_by_model(
+                self.model_name, chunk_size=chunk_size, max_row=max_row
+            )
+
+    def build_shadow(
+        self,
+        plan: ShadowRebuild,
+        chunk_size: int = REBUILD_CHUNK_ROWS,
+    ) -> ShadowRebuild:
+        """Build the index and id map for ``plan`` without touching live state.
+
+        ``plan.rows`` counts distinct entities, so the matrix is sized to the
+        live vectors up front. Each entity owns one slot and a later embedding
+        overwrites it in place (the latest wins, as it does in add()), so no
+        filtered copy of the matrix is ever made.
+        """
+        slots: Dict[str, int] = {}
+        entity_types: List[str] = []
+        category_codes: List[Optional[str]] = []
+        entity_ids: List[str] = []
+        matrix = np.empty((plan.rows, self.dimension), dtype=np.float32)
+        for chunk in self.iter_embedding_chunks(plan.max_row, chunk_size):
+            dest = np.empty(len(chunk.entity_ids), dtype=np.int64)
+            for row, entity_id in enumerate(chunk.entity_ids):
+                slot = slots.get(entity_id)
+                if slot is None:
+                    slot = len(entity_ids)
+                    slots[entity_id] = slot
+                    entity_ids.append(entity_id)
+                    entity_types.append(chunk.entity_types[row])
+                    category_codes.append(chunk.category_codes[row])
+                else:
+                    entity_types[slot] = chunk.entity_types[row]
+                    category_codes[slot] = chunk.category_codes[row]
+                dest[row] = slot
+            if len(entity_ids) > matrix.shape[0]:
+                grown = np.empty((len(entity_ids), self.dimension), dtype=np.float32)
+                grown[: matrix.shape[0]] = matrix
+                matrix = grown
+            if np.unique(dest).size == dest.size:
+                matrix[dest] = chunk.matrix
+            else:
+                # Repeated slots in one chunk: copy in row order so the latest wins.
+                for row, slot in enumerate(dest.tolist()):
+                    matrix[slot] = chunk.matrix[row]
+
+        n = len(entity_ids)
+        vectors = matrix if n == matrix.shape[0] else matrix[:n]
+        ids = np.arange(plan.base_id, plan.base_id + n, dtype=np.int64)
+
+        # Too few vectors to train the live layout: start simple and let migration upgrade.
+        kind, storage = plan.kind, plan.storage
+        if n < self._min_train_points(storage):
+            storage = "float32"
+        if kind == "ivf" and n < 39:
+            kind = "flat"
+        index = self.build_index(kind, ids, vectors, storage)
+
+        id_map = EntityIdMap()
+        id_map.set(ids.tolist(), entity_ids, entity_types, category_codes)
+        logger.info("Built shadow %s/%s FAISS index: %s vectors", kind, storage, n)
+        return replace(plan, kind=kind, storage=storage, index=index, id_map=id_map)
+
+    def install_shadow(self, shadow: ShadowRebuild) -> int:
+        """Swap ``shadow`` in for the live index and id map; save right after.
+
+        Adds and removals journaled since ``begin_rebuild`` are re-applied to
+        the shadow first. Returns the number of live vectors.
+        """
+        journal = self._rebuild_journal or []
+        self._rebuild_journal = None
+        index, id_map = shadow.index, shadow.id_map
+        stale = 0
+        for entity_ids, entity_types, category_codes, vectors in journal:
+            superseded = id_map.ids_for_entities(entity_ids)
+            stale += self._remove_from(index, superseded)
+            id_map.remove(superseded)
+            if vectors is None:
+                continue
+            new_ids = np.arange(self._next_id, self._next_id + len(entity_ids), dtype=np.int64)
+            index.add_with_ids(vectors, new_ids)
+            self._next_id += len(entity_ids)
+            id_map.set(new_ids.tolist(), entity_ids, entity_types, category_codes)
+
+        self._prepare_index(index)
+        self._index = index
+        self._id_map = id_map
+        self._mapped = False
+        self._overlay = None
+        self._stale_count = stale
+        self._selectors = {}
+        self._selectors_version = -1
+        self.storage = shadow.storage
+        self._next_id = max(self._next_id, id_map.size)
+        self._replace_metadata_rows(id_map)
+        if self.wal is None:
+            self._save_metadata(id_map.to_metadata())
+        logger.info(
+            "Installed shadow FAISS index: %s vectors (%s journaled writes)",
+            len(id_map),
+            len(journal),
+        )
+        return len(id_map)
+
+    def _replace_metadata_rows(self, id_map: EntityIdMap) -> None:
+        """Rewrite FAISSMetadata to match ``id_map`` (drops every tombstone)."""
+        if not (self.session_factory or self.session):
+            return
+        from src.common.storage.schema import FAISSMetadata, utc_now
+
+        now = utc_now()
+        metadata = id_map.to_metadata()
+        with self._session_scope() as session:
+            session.query(FAISSMetadata).delete(synchronize_session=False)
+            rows = [
+                {
+                    "entity_id": mapping["entity_id"],
+                    "entity_type": mapping["entity_type"],
+                    "internal_id": int(internal_id),
+                    "created_at": now,
+                    "deleted": False,
+                }
+                for internal_id, mapping in metadata.items()
+            ]
+            for start in range(0, len(rows), 500):
+                session.bulk_insert_mappings(FAISSMetadata, rows[start : start + 500])
+        self._tombstone_count = 0
+
     def search(
         self,
         query_embedding: np.ndarray,
         top_k: int = 10,
         entity_type: Optional[str] = None,
+        category_code: Optional[str] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Search the index, restricting candidates to the given filters.
+
+        Filters are applied inside FAISS through an ID selector so every
+        returned hit is eligible; ``top_k`` is not spent on filtered-out rows.
+        Superseded vectors that the index could not delete are masked the same way.
+        Quantized indexes over-fetch a shortlist and re-score it exactly.
+        """
+        scores, internal_ids = self.search_batch(
+            query_embedding.reshape(1, -1), top_k, entity_type, category_code
+        )
+        keep = internal_ids[0] >= 0
+        return scores[0][keep], internal_ids[0][keep]
+
+    def search_batch(
+        self,
+        query_matrix: np.ndarray,
+        top_k: int = 10,
+        entity_type: Optional[str] = None,
+        category_code: Optional[str] = None,
     ) -> Tuple[np.ndarray, np.ndarray]:
-        if query_embedding.shape[-1] != self.dimension:
+        """Search an ``(n, d)`` block of queries in one FAISS call.
+
+        Returns ``(scores, internal_ids)`` of shape ``(n, top_k)``; rows with
+        fewer eligible hits are padded with id -1, as FAISS does.
+        """
+        if query_matrix.shape[-1] != self.dimension:
             raise FAISSIndexError(
-                f"Query dimension mismatch: expected {self.dimension}, got {query_embedding.shape[-1]}"
+                f"Query dimension mismatch: expected {self.dimension}, got {query_matrix.shape[-1]}"
             )
+        queries = np.ascontiguousarray(query_matrix.reshape(-1, self.dimension), dtype=np.float32)
 
-        if query_embedding.ndim == 1:
-            query_embedding = query_embedding.reshape(1, -1)
+        rescore = self.storage != "float32" and self.index_settings.rescore_factor > 0
+        shortlist = top_k * self.index_settings.rescore_factor if rescore else top_k
+        scores, internal_ids = self._search_candidates(
+            queries, shortlist, entity_type, category_code
+        )
+        if rescore:
+            return self._rescore(queries, internal_ids, top_k)
+        return scores, internal_ids
 
-        scores, internal_ids = self.index.search(query_embedding, top_k)
-        scores = scores[0]
-        internal_ids = internal_ids[0]
+    def _rescore(
+        self, queries: np.ndarray, internal_ids: np.ndarray, top_k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Re-rank quantized shortlists by exact inner product."""
+        valid = internal_ids >= 0
+        unique = np.unique(internal_ids[valid])
+        # One embeddings-table lookup for every shortlist in the batch.
+        vectors = self.exact_vectors(unique)
+        positions = np.searchsorted(unique, internal_ids)
+        scores = np.full(internal_ids.shape, _NO_SCORE, dtype=np.float32)
+        for row in range(internal_ids.shape[0]):
+            if valid[row].any():
+                exact = vectors[positions[row][valid[row]]] @ queries[row]
+                scores[row, valid[row]] = exact
+        order = np.argsort(-scores, axis=1, kind="stable")[:, :top_k]
+        return (
+            np.take_along_axis(scores, order, axis=1),
+            np.take_along_axis(internal_ids, order, axis=1),
+        )
 
-        if entity_type:
-            mask = []
-            for internal_id in internal_ids:
-                mapping = self.get_entity_id(int(internal_id))
-                mask.append(bool(mapping and mapping["entity_type"] == entity_type))
-            mask_arr = np.array(mask)
-            scores = scores[mask_arr]
-            internal_ids = internal_ids[mask_arr]
-        return scores, internal_ids
+    def _search_candidates(
+        self,
+        queries: np.ndarray,
+        top_k: int,
+        entity_type: Optional[str],
+        category_code: Optional[str],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        results = [
+            self._search_one(index, queries, top_k, entity_type, category_code)
+            for index in self._searchable()
+        ]
+        if len(results) == 1:
+            return results[0]
+        scores = np.concatenate([r[0] for r in results], axis=1)
+        internal_ids = np.concatenate([r[1] for r in results], axis=1)
+        order = np.argsort(-scores, axis=1, kind="stable")[:, :top_k]
+        return (
+            np.take_along_axis(scores, order, axis=1),
+            np.take_along_axis(internal_ids, order, axis=1),
+        )
+
+    def _searchable(self) -> list:
+        if self._overlay is not None and self._overlay.ntotal:
+            return [self.index, self._overlay]
+        return [self.index]
+
+    def _search_one(
+        self,
+        index,
+        queries: np.ndarray,
+        top_k: int,
+        entity_type: Optional[str],
+        category_code: Optional[str],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        if not (entity_type or category_code or self._stale_count):
+            return index.search(queries, top_k)
+
+        selector = self._selector_for(entity_type, category_code)
+        if selector is None:
+            return (
+                np.full((queries.shape[0], top_k), _NO_SCORE, dtype=np.float32),
+                np.full((queries.shape[0], top_k), -1, dtype=np.int64),
+            )
+
+        try:
+            params = self._search_params(selector, index)
+            return index.search(queries, top_k, params=params)
+        except (TypeError, AttributeError, RuntimeError) as exc:
+            # Older faiss builds lack selector support; over-fetch and post-filter.
+            logger.debug("FAISS selector search unavailable, post-filtering: %s", exc)
+            scores, internal_ids = index.search(
+                queries, min(index.ntotal, top_k * 4) or top_k
+            )
+            mask = np.zeros(internal_ids.shape, dtype=bool)
+            in_range = (internal_ids >= 0) & (internal_ids < selector[1].shape[0])
+            mask[in_range] = selector[1][internal_ids[in_range]]
+            # Stable sort keeps eligible hits first, in FAISS order.
+            order = np.argsort(~mask, axis=1, kind="stable")[:, :top_k]
+            scores = np.take_along_axis(scores, order, axis=1)
+            internal_ids = np.take_along_axis(internal_ids, order, axis=1)
+            eligible = np.take_along_axis(mask, order, axis=1)
+            scores[~eligible] = _NO_SCORE
+            internal_ids[~eligible] = -1
+            if internal_ids.shape[1] < top_k:
+                pad = top_k - internal_ids.shape[1]
+                scores = np.pad(scores, ((0, 0), (0, pad)), constant_values=_NO_SCORE)
+                internal_ids = np.pad(internal_ids, ((0, 0), (0, pad)), constant_values=-1)
+            return scores, internal_ids
+
+    def _selector_for(
+        self,
+        entity_type: Optional[str],
+        category_code: Optional[str],
+    ):
+        """Return a cached (faiss selector, bool mask, bitmap) for the filter, or None if empty."""
+        id_map = self.id_map
+        key = (entity_type or None, category_code or None)
+        with self._selectors_lock:
+            if self._selectors_version != id_map.version:
+                self._selectors = {}
+                self._selectors_version = id_map.version
+            selectors = self._selectors
+            if key not in selectors:
+                mask = id_map.selection_mask(entity_type, category_code)
+                if not mask.any():
+                    selectors[key] = None
+                else:
+                    # Keep the packed bitmap referenced: FAISS holds a raw pointer to it.
+                    bitmap = np.packbits(mask, bitorder="little")
+                    selector = self.faiss.IDSelectorBitmap(
+                        bitmap.size, self.faiss.swig_ptr(bitmap)
+                    )
+                    selectors[key] = (selector, mask, bitmap)
+            return selectors[key]
+
+    def _search_params(self, selector, index=None):
+        faiss = self.faiss
+        settings = self.index_settings
+        kind = self.index_kind(index)
+        if kind == "hnsw":
+            return faiss.SearchParametersHNSW(sel=selector[0], efSearch=settings.hnsw_ef_search)
+        if kind == "ivf":
+            return faiss.SearchParametersIVF(sel=selector[0], nprobe=settings.ivf_nprobe)
+        return faiss.SearchParameters(sel=selector[0])
 
     def get_entity_id(self, internal_id: int):
-        metadata = self._load_metadata()
-        return metadata.get(str(internal_id))
+        return self.id_map.gather([internal_id])[0]
+
+    def get_entity_ids(self, internal_ids) -> List[Optional[Dict[str, str]]]:
+        """Resolve a whole hit list of internal ids in one gather."""
+        return self.id_map.gather(internal_ids)
 
     def _load_metadata(self) -> Dict[str, Dict[str, str]]:
         if not self.meta_path.exists():
@@ -270,11 +1611,15 @@ class FAISSIndexManager:
         entity_ids: List[str],
         entity_types: List[str],
         internal_ids: List[int],
+        category_codes: Optional[List[Optional[str]]] = None,
+        superseded_ids: Optional[List[int]] = None,
     ) -> None:
         from src.common.storage.schema import FAISSMetadata, utc_now
 
         now = utc_now()
         with self._session_scope() as session:
+            if superseded_ids:
+                self._mark_tombstones(superseded_ids, session=session)
             for entity_id, entity_type, internal_id in zip(
                 entity_ids, entity_types, internal_ids
             ):
@@ -287,17 +1632,53 @@ class FAISSIndexManager:
                 )
                 session.add(row)
 
-        metadata = self._load_metadata()
-        for entity_id, entity_type, internal_id in zip(
-            entity_ids, entity_types, internal_ids
-        ):
-            metadata[str(internal_id)] = {
-                "entity_id": entity_id,
-                "entity_type": entity_type,
-            }
-        self._save_metadata(metadata)
+        self.id_map.set(internal_ids, entity_ids, entity_types, category_codes)
+        if self.wal is None:
+            # With a WAL the meta file is written at checkpoints instead.
+            self._save_metadata(self.id_map.to_metadata())
+
+    def _mark_tombstones(self, internal_ids: List[int], session=None) -> None:
+        if not internal_ids:
+            return
+        if session is None:
+            with self._session_scope() as owned:
+                self._mark_tombstones(internal_ids, session=owned)
+            return
+        from src.common.storage.schema import FAISSMetadata
+
+        if self._tombstone_count is not None:
+            self._tombstone_count += len(internal_ids)
+        for start in range(0, len(internal_ids), 500):
+            chunk = [int(i) for i in internal_ids[start : start + 500]]
+            (
+                session.query(FAISSMetadata)
+                .filter(
+                    FAISSMetadata.internal_id.in_(chunk),
+                    FAISSMetadata.deleted == False,  # noqa: E712
+                )
+                .update({FAISSMetadata.deleted: True}, synchronize_session=False)
+            )
+
+    def _purge_tombstones(self) -> None:
+        if not (self.session_factory or self.session):
+            return
+        from src.common.storage.schema import FAISSMetadata
+
+        with self._session_scope() as session:
+            session.query(FAISSMetadata).filter(
+                FAISSMetadata.deleted == True  # noqa: E712
+            ).delete(synchronize_session=False)
+        self._tombstone_count = 0
+
+    def _index_meta(self) -> Dict[str, object]:
+        header = self._load_metadata().get(INDEX_META_KEY)
+        return header if isinstance(header, dict) else {}
 
     def _save_metadata(self, metadata: Dict[str, Dict[str, str]]) -> None:
+        metadata[INDEX_META_KEY] = {
+            "storage": self.storage,
+            "dimension": self.dimension,
+        }
         try:
             tmp = self.meta_path.with_suffix(".tmp")
             tmp.write_text(json.dumps(metadata, ensure_ascii=False), encoding="utf-8")
@@ -307,7 +1688,12 @@ class FAISSIndexManager:
 
     def save(self) -> None:
         try:
-            self.faiss.write_index(self.index, str(self.index_path))
+            # Write beside and rename: index_path may be mapped by this or other processes.
+            tmp_path = self.index_path.with_suffix(".index.tmp")
+            self.before_save()
+            self.faiss.write_index(self.index_for_save(), str(tmp_path))
+            tmp_path.replace(self.index_path)
+            self.after_save()
         except Exception as exc:
             raise FAISSIndexError(f"Failed to save FAISS index: {exc}") from exc
 
@@ -333,10 +1719,23 @@ class FAISSIndexManager:
                 .filter(FAISSMetadata.deleted == True)  # noqa: E712
                 .count()
             )
+            self._tombstone_count = int(deleted)
             return deleted / float(total)
 
+    def estimated_tombstone_ratio(self) -> Optional[float]:
+        """Tombstone ratio from in-memory counters, or None before the first DB read.
+
+        Every live id_map entry has one metadata row and every tombstone
+        counted since the last read or purge adds one, so no query is needed.
+        """
+        tombstones = self._tombstone_count
+        if tombstones is None:
+            return None
+        total = tombstones + len(self.id_map)
+        return tombstones / float(total) if total else 0.0
+
     def needs_rebuild(self) -> bool:
-        return self.get_tombstone_ratio() > 0.10
+        return self.get_tombstone_ratio() > self.index_settings.rebuild_threshold
 
     @property
     def is_available(self) -> bool:
@@ -355,12 +1754,12 @@ class PeriodicSaver:
         self.interval = interval
         self.dirty = False
         self.stop_event = None
+        self.wake_event = None
         self.thread = None
 
     def start(self) -> None:
-        import threading
-
         self.stop_event = threading.Event()
+        self.wake_event = threading.Event()
         self.thread = threading.Thread(
             target=self._run, daemon=True, name="FAISS-PeriodicSaver"
         )
@@ -371,6 +1770,8 @@ class PeriodicSaver:
         if not self.stop_event or not self.thread:
             return
         self.stop_event.set()
+        if self.wake_event:
+            self.wake_event.set()
         self.thread.join(timeout=10)
         if self.thread.is_alive():
             logger.warning("Periodic saver thread did not stop cleanly")
@@ -378,20 +1779,128 @@ class PeriodicSaver:
     def mark_dirty(self) -> None:
         self.dirty = True
 
+    def request_save(self) -> None:
+        """Save now instead of at the end of the interval (e.g. a large WAL)."""
+        self.dirty = True
+        if self.wake_event:
+            self.wake_event.set()
+
     def _run(self) -> None:
-        assert self.stop_event is not None
-        while not self.stop_event.wait(self.interval):
+        assert self.stop_event is not None and self.wake_event is not None
+        while not self.stop_event.is_set():
+            self.wake_event.wait(self.interval)
+            self.wake_event.clear()
+            if self.stop_event.is_set():
+                break
             if self.dirty:
                 try:
-                    self.faiss_manager._save_safely()
+                    # Under the manager lock so no write lands between save and WAL reset.
+                    self.faiss_manager.save()
                     self.dirty = False
                     logger.debug("Periodic FAISS save completed")
                 except Exception as exc:
                     logger.error("Periodic FAISS save failed: %s", exc)
 
 
+class _LockSide:
+    """Context manager for one side of a ReadWriteLock; records wait time."""
+
+    def __init__(self, acquire, release, metric: str):
+        self._acquire = acquire
+        self._release = release
+        self._metric = metric
+
+    def __enter__(self):
+        metrics.observe(self._metric, self._acquire())
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._release()
+        return False
+
+
+class ReadWriteLock:
+    """Writer-preferring reader-writer lock.
+
+    ``read`` and ``write`` are context managers. Any number of readers share
+    the lock; a writer waits for them to drain and blocks new readers while
+    it waits. Both sides are reentrant per thread, and the writing thread may
+    also read, but a reader cannot upgrade to a writer. Seconds spent waiting
+    are observed as ``faiss_lock_wait_seconds.read`` / ``.write``.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer: Optional[int] = None
+        self._write_depth = 0
+        self._writers_waiting = 0
+        self._local = threading.local()
+        self.read = _LockSide(self._acquire_read, self._release_read, "faiss_lock_wait_seconds.read")
+        self.write = _LockSide(
+            self._acquire_write, self._release_write, "faiss_lock_wait_seconds.write"
+        )
+
+    def _read_depth(self) -> int:
+        return getattr(self._local, "depth", 0)
+
+    def _acquire_read(self) -> float:
+        started = time.perf_counter()
+        with self._cond:
+            # Nested reads must not queue behind a waiting writer (it waits on us).
+            if self._writer != threading.get_ident() and not self._read_depth():
+                while self._writer is not None or self._writers_waiting:
+                    self._cond.wait()
+            self._readers += 1
+        self._local.depth = self._read_depth() + 1
+        return time.perf_counter() - started
+
+    def _release_read(self) -> None:
+        self._local.depth = self._read_depth() - 1
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def _acquire_write(self) -> float:
+        me = threading.get_ident()
+        started = time.perf_counter()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return 0.0
+            if self._read_depth():
+                raise RuntimeError("Cannot acquire FAISS write lock while holding a read lock")
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = me
+            self._write_depth = 1
+        return time.perf_counter() - started
+
+    def _release_write(self) -> None:
+        with self._cond:
+            self._write_depth -= 1
+            if self._write_depth == 0:
+                self._writer = None
+                self._cond.notify_all()
+
+
 class ThreadSafeFAISSManager:
-    """Thread-safe wrapper around FAISSIndexManager."""
+    """Thread-safe wrapper around FAISSIndexManager.
+
+    Searches and lookups share a read lock so they run concurrently; adds,
+    removals, saves and index swaps take the write lock. ``_lock`` is the
+    write side, for callers that need exclusive access.
+    """
+
+    # Manager methods the attribute proxy may run under the shared read lock.
+    _READ_METHODS = frozenset(
+        {"index_kind", "get_entity_id", "get_entity_ids", "exact_vectors", "snapshot_live"}
+    )
 
     def __init__(
         self,
@@ -400,20 +1909,25 @@ class ThreadSafeFAISSManager:
         save_interval: int = 300,
         rebuild_threshold: float = 0.10,
     ):
-        import threading
-
         self._manager = faiss_manager
-        self._lock = threading.RLock()
+        self._rwlock = ReadWriteLock()
+        self._lock = self._rwlock.write
         self._save_policy = save_policy
         self._rebuild_threshold = rebuild_threshold
         self._periodic_saver: Optional[PeriodicSaver] = None
+        self._migration_thread: Optional[threading.Thread] = None
+        self._compaction_thread: Optional[threading.Thread] = None
 
         if save_policy not in ("immediate", "periodic", "manual"):
             raise ValueError(
                 f"Invalid save_policy: {save_policy}. Must be 'immediate', 'periodic', or 'manual'"
             )
 
-        if save_policy == "periodic":
+        # With a WAL, "immediate" adds are durable once logged; the index file
+        # itself is checkpointed in the background.
+        if save_policy == "periodic" or (
+            save_policy == "immediate" and faiss_manager.wal is not None
+        ):
             self._periodic_saver = PeriodicSaver(self, save_interval)
             self._periodic_saver.start()
 
@@ -423,34 +1937,209 @@ class ThreadSafeFAISSManager:
             save_interval,
             rebuild_threshold,
         )
+        self._maybe_start_migration()
 
     def search(
         self,
         query_embedding: np.ndarray,
         top_k: int = 10,
         entity_type: Optional[str] = None,
+        category_code: Optional[str] = None,
     ) -> Tuple[np.ndarray, np.ndarray]:
-        with self._lock:
-            return self._manager.search(query_embedding, top_k, entity_type)
+        with self._rwlock.read:
+            return self._manager.search(query_embedding, top_k, entity_type, category_code)
+
+    def search_batch(
+        self,
+        query_matrix: np.ndarray,
+        top_k: int = 10,
+        entity_type: Optional[str] = None,
+        category_code: Optional[str] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        with self._rwlock.read:
+            return self._manager.search_batch(query_matrix, top_k, entity_type, category_code)
 
     def add(
         self,
         entity_ids: List[str],
         entity_types: List[str],
         embeddings: np.ndarray,
+        category_codes: Optional[List[Optional[str]]] = None,
     ) -> List[int]:
         with self._lock:
-            result = self._manager.add(entity_ids, entity_types, embeddings)
-            if self._save_policy == "immediate":
+            result = self._manager.add(entity_ids, entity_types, embeddings, category_codes)
+            self._after_write()
+        self._maybe_start_migration()
+        self._maybe_start_compaction()
+        return result
+
+    def remove(self, entity_ids: List[str]) -> int:
+        with self._lock:
+            removed = self._manager.remove(entity_ids)
+            if removed:
+                self._after_write()
+        self._maybe_start_compaction()
+        return removed
+
+    def _after_write(self) -> None:
+        wal = self._manager.wal
+        if self._save_policy == "immediate" and wal is None:
+            self._save_safely()
+        elif self._periodic_saver:
+            self._periodic_saver.mark_dirty()
+            if wal is not None and (
+                wal.size_bytes >= self._manager.index_settings.wal_checkpoint_bytes
+            ):
+                self._periodic_saver.request_save()
+
+    def compact(self) -> int:
+        with self._lock:
+            total = self._manager.compact()
+            if self._save_policy != "manual":
                 self._save_safely()
-            elif self._save_policy == "periodic" and self._periodic_saver:
-                self._periodic_saver.mark_dirty()
-            return result
+            return total
 
     def save(self) -> None:
         with self._lock:
             self._save_safely()
 
+    def rebuild(self, chunk_size: int = REBUILD_CHUNK_ROWS) -> int:
+        """Shadow rebuild from the embeddings table.
+
+        Searches keep reading the live index while the shadow is built; the
+        swap takes the write lock, so it waits for in-flight searches to finish.
+        """
+        manager = self._manager
+        with self._lock:
+            shadow = manager.begin_rebuild()
+        try:
+            shadow = manager.build_shadow(shadow, chunk_size)
+        except Exception as exc:
+            with self._lock:
+                manager.abort_rebuild()
+            raise FAISSIndexError(f"Failed to rebuild FAISS index: {exc}") from exc
+        with self._lock:
+            total = manager.install_shadow(shadow)
+            self._save_safely()
+        logger.info("FAISS index rebuilt and swapped in: %s vectors", total)
+        return total
+
+    def _maybe_start_migration(self) -> None:
+        if self._migration_thread is not None and self._migration_thread.is_alive():
+            return
+        try:
+            with self._rwlock.read:
+                if self._manager.migration_target() is None:
+                    return
+        except FAISSIndexError:
+            return
+        self._migration_thread = threading.Thread(
+            target=self._migrate_index, daemon=True, name="FAISS-IndexMigration"
+        )
+        self._migration_thread.start()
+
+    def _migrate_index(self) -> None:
+        """Train the target ANN / compressed index off-lock, check recall, then swap it in."""
+        manager = self._manager
+        try:
+            with self._rwlock.read:
+                source = manager.index
+                target = manager.migration_target()
+                if target is None:
+                    return
+                kind, storage = target
+                ids, vectors = manager.snapshot_live()
+            logger.info(
+                "Building %s/%s index in background over %s vectors", kind, storage, len(ids)
+            )
+            ann_index = manager.build_index(kind, ids, vectors, storage)
+            rescore_factor = 1
+            if storage != "float32":
+                rescore_factor = max(1, manager.index_settings.rescore_factor)
+            report = evaluate_ann_recall(
+                manager.faiss, vectors, ann_index, ids=ids, rescore_factor=rescore_factor
+            )
+            report["index_type"] = kind
+            report["storage"] = storage
+            report["ntotal"] = int(len(ids))
+            report["evaluated_at"] = time.time()
+            manager.ann_report = report
+            logger.info(
+                "ANN candidate %s: recall@%s=%.3f, %.2fms/query vs flat %.2fms/query",
+                report["index_type"],
+                report["k"],
+                report["recall_at_k"],
+                report["ann_ms"],
+                report["flat_ms"],
+            )
+            if report["recall_at_k"] < manager.index_settings.min_recall:
+                report["switched"] = False
+                manager.reject_migration(kind, storage, len(ids))
+                logger.warning(
+                    "Keeping current index: recall %.3f below CHL_FAISS_ANN_MIN_RECALL=%.2f; "
+                    "retrying at %s vectors",
+                    report["recall_at_k"],
+                    manager.index_settings.min_recall,
+                    int(np.ceil(len(ids) * MIGRATION_RETRY_GROWTH)),
+                )
+                return
+
+            with self._lock:
+                if manager._index is not source:
+                    report["switched"] = False
+                    logger.info("Index replaced during ANN build; discarding candidate")
+                    return
+                manager.swap_index(ann_index, ids, storage)
+                manager._rejected_migration = None
+                report["switched"] = True
+                self._save_safely()
+            logger.info(
+                "Switched FAISS index to %s/%s (%s vectors)",
+                report["index_type"],
+                report["storage"],
+                ann_index.ntotal,
+            )
+        except Exception as exc:
+            logger.error("Background ANN migration failed: %s", exc, exc_info=True)
+
+    def _maybe_start_compaction(self) -> None:
+        if self._compaction_thread is not None and self._compaction_thread.is_alive():
+            return
+        try:
+            with self._rwlock.read:
+                # Counters first: the database is only asked once they cross the threshold.
+                estimate = self._manager.estimated_tombstone_ratio()
+                if estimate is not None and estimate <= self._rebuild_threshold:
+                    return
+                if self._manager.get_tombstone_ratio() <= self._rebuild_threshold:
+                    return
+        except Exception:
+            return
+        self._compaction_thread = threading.Thread(
+            target=self._compact_in_background, daemon=True, name="FAISS-Compaction"
+        )
+        self._compaction_thread.start()
+
+    def _compact_in_background(self) -> None:
+        """Rebuild from live vectors off-lock, then swap and purge tombstones."""
+        manager = self._manager
+        try:
+            with self._rwlock.read:
+                source = manager.index
+                kind = manager.index_kind()
+                ids, vectors = manager.snapshot_live()
+            candidate = manager.build_index(kind, ids, vectors)
+            with self._lock:
+                if manager._index is not source:
+                    logger.info("Index replaced during compaction; discarding candidate")
+                    return
+                manager.swap_index(candidate, ids, manager.storage)
+                manager._purge_tombstones()
+                self._save_safely()
+            logger.info("FAISS index compacted in background: %s live vectors", candidate.ntotal)
+        except Exception as exc:
+            logger.error("Background FAISS compaction failed: %s", exc, exc_info=True)
+
     def shutdown(self) -> None:
         if self._periodic_saver:
             logger.info("Stopping periodic saver")
@@ -460,7 +2149,8 @@ class ThreadSafeFAISSManager:
         tmp_path = self._manager.index_path.with_suffix(".index.tmp")
         backup_path = self._manager.index_path.with_suffix(".index.backup")
 
-        self._manager.faiss.write_index(self._manager.index, str(tmp_path))
+        self._manager.before_save()
+        self._manager.faiss.write_index(self._manager.index_for_save(), str(tmp_path))
 
         if self._manager.index_path.exists():
             if backup_path.exists():
@@ -468,30 +2158,37 @@ class ThreadSafeFAISSManager:
             self._manager.index_path.rename(backup_path)
 
         tmp_path.rename(self._manager.index_path)
+        self._manager.after_save()
         logger.info("FAISS index saved atomically to %s", self._manager.index_path)
 
     def get_entity_id(self, internal_id: int):
-        with self._lock:
+        with self._rwlock.read:
             return self._manager.get_entity_id(internal_id)
 
+    def get_entity_ids(self, internal_ids) -> List[Optional[Dict[str, str]]]:
+        with self._rwlock.read:
+            return self._manager.get_entity_ids(internal_ids)
+
     def get_tombstone_ratio(self) -> float:
-        with self._lock:
+        with self._rwlock.read:
             return self._manager.get_tombstone_ratio()
 
     def needs_rebuild(self) -> bool:
-        with self._lock:
+        with self._rwlock.read:
             return self._manager.needs_rebuild()
 
     @property
     def is_available(self) -> bool:
-        with self._lock:
+        with self._rwlock.read:
             return self._manager.is_available
 
     def __getattr__(self, name):
         attr = getattr(self._manager, name)
         if callable(attr):
+            lock = self._rwlock.read if name in self._READ_METHODS else self._lock
+
             def locked_method(*args, **kwargs):
-                with self._lock:
+                with lock:
                     return attr(*args, **kwargs)
 
             return locked_method
@@ -503,20 +2200,26 @@ def initialize_faiss_with_recovery(
     session,
     embedding_client=None,
     session_factory=None,
+    storage: Optional[str] = None,
 ) -> Optional[FAISSIndexManager]:
-    """Initialize FAISS index with automatic recovery."""
-    from src.common.storage.schema import Embedding, FAISSMetadata, utc_now
+    """Initialize FAISS index with automatic recovery.
 
+    ``storage`` overrides CHL_FAISS_STORAGE (float32, sq8, pq) for this index.
+    """
     dimension = getattr(embedding_client, "dimension", 768) if embedding_client else 768
 
     try:
         model_name = config.embedding_model
+        index_settings = FAISSIndexSettings.from_config(config)
+        if storage:
+            index_settings = replace(index_settings, storage=storage)
         faiss_manager = FAISSIndexManager(
             index_dir=str(config.faiss_index_path),
             model_name=model_name,
             dimension=dimension,
             session=session,
             session_factory=session_factory,
+            index_settings=index_settings,
         )
     except Exception as exc:
         logger.error("Failed to create FAISSIndexManager: %s", exc)
@@ -526,54 +2229,13 @@ def initialize_faiss_with_recovery(
         _ = faiss_manager.index
         logger.info("FAISS index loaded successfully: %s vectors", faiss_manager.index.ntotal)
 
-        if faiss_manager.needs_rebuild():
-            logger.warning("Index inconsistency detected, triggering automatic rebuild")
-            metadata_list = (
-                session.query(FAISSMetadata)
-                .filter(FAISSMetadata.deleted == False)
-                .all()
-            )
-            if not metadata_list:
-                logger.warning("No non-deleted entries found for rebuild, creating empty index")
-                faiss_manager._create_new_index(reset_metadata=True)
-                faiss_manager.save()
-                session.flush()
-            else:
-                from src.common.storage.repository import EmbeddingRepository
+        if faiss_manager.replay_wal():
+            # Checkpoint right away so the next start does not replay again.
+            faiss_manager.save()
 
-                emb_repo = EmbeddingRepository(session)
-                metadata_map = {
-                    meta.entity_id: meta.entity_type for meta in metadata_list
-                }
-                embeddings = (
-                    session.query(Embedding)
-                    .filter(
-                        Embedding.model_version == model_name,
-                        Embedding.entity_id.in_(list(metadata_map.keys())),
-                    )
-                    .all()
-                )
-                if not embeddings:
-                    logger.warning("No embeddings found for non-deleted entries")
-                    faiss_manager._create_new_index(reset_metadata=True)
-                    faiss_manager.save()
-                    session.flush()
-                else:
-                    entity_ids: List[str] = []
-                    entity_types: List[str] = []
-                    vectors: List[np.ndarray] = []
-                    for emb in embeddings:
-                        if emb.entity_id in metadata_map:
-                            entity_ids.append(emb.entity_id)
-                            entity_types.append(metadata_map[emb.entity_id])
-                            vectors.append(emb_repo.to_numpy(emb))
-                    if entity_ids:
-                        faiss_manager._create_new_index(reset_metadata=True)
-                        vectors_array = np.vstack(vectors).astype(np.float32)
-                        faiss_manager.add(entity_ids, entity_types, vectors_array)
-                        faiss_manager.save()
-                        session.flush()
-            return faiss_manager
+        if faiss_manager.needs_rebuild():
+            logger.warning("Tombstone ratio above threshold, rebuilding FAISS index")
+            faiss_manager.rebuild()
 
         return faiss_manager
     except FAISSIndexError as exc:
@@ -586,8 +2248,7 @@ def initialize_faiss_with_recovery(
                 import shutil
 
                 shutil.copy2(backup_path, faiss_manager.index_path)
-                faiss_manager._index = None
-                _ = faiss_manager.index
+                faiss_manager.reload()
                 logger.info(
                     "FAISS index restored from backup: %s vectors",
                     faiss_manager.index.ntotal,
@@ -598,48 +2259,12 @@ def initialize_faiss_with_recovery(
 
         try:
             logger.info("Attempting to rebuild FAISS index from database")
-            from src.common.storage.repository import EmbeddingRepository
-
-            emb_repo = EmbeddingRepository(session)
             faiss_manager._create_new_index(reset_metadata=True)
-            embeddings = (
-                session.query(Embedding)
-                .filter(Embedding.model_version == model_name)
-                .all()
-            )
-            if not embeddings:
-                logger.warning("No embeddings found in database, starting with empty index")
-                faiss_manager.save()
-                return faiss_manager
-
-            entity_type_map: Dict[str, str] = {}
-            for emb in embeddings:
-                if emb.entity_id.startswith("EXP-"):
-                    entity_type_map[emb.entity_id] = "experience"
-                elif emb.entity_id.startswith("MNL-"):
-                    entity_type_map[emb.entity_id] = "skill"
-
-            entity_ids: List[str] = []
-            entity_types: List[str] = []
-            vectors: List[np.ndarray] = []
-            for emb in embeddings:
-                if emb.entity_id in entity_type_map:
-                    entity_ids.append(emb.entity_id)
-                    entity_types.append(entity_type_map[emb.entity_id])
-                    vectors.append(emb_repo.to_numpy(emb))
-
-            if entity_ids:
-                vectors_array = np.vstack(vectors).astype(np.float32)
-                faiss_manager.add(entity_ids, entity_types, vectors_array)
-                faiss_manager.save()
-                session.flush()
-                logger.info(
-                    "FAISS index rebuilt successfully: %s vectors", len(entity_ids)
-                )
+            total = faiss_manager.rebuild()
+            if total:
+                logger.info("FAISS index rebuilt successfully: %s vectors", total)
             else:
-                logger.warning("No valid entities found for rebuild")
-                faiss_manager.save()
-
+                logger.warning("No embeddings found in database, starting with empty index")
             return faiss_manager
         except Exception as exc3:
             logger.error("Index rebuild failed: %s", exc3)
@@ -648,8 +2273,12 @@ def initialize_faiss_with_recovery(
 
 
 __all__ = [
+    "EntityIdMap",
     "FAISSIndexManager",
     "FAISSIndexError",
+    "FAISSIndexSettings",
+    "STORAGE_TYPES",
+    "ShadowRebuild",
     "ThreadSafeFAISSManager",
     "initialize_faiss_with_recovery",
 ]
@@ -0,0 +1,185 @@
+"""Append-only write-ahead log for FAISS index mutations.
+
+The log holds every add/remove applied since the index file was last
+written, so a save only has to happen at checkpoints instead of after every
+add. Each record is a small frame::
+
+    b"CHLW" | header_len (u32) | payload_len (u32) | JSON header | float32 payload
+
+The first record names the index file the log applies to (size and mtime).
+If the index file changes underneath the log (checkpoint, snapshot upload,
+backup restore) the log no longer applies and is discarded on replay.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import struct
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class FAISSWriteAheadLog:
+    """Append-only log of index mutations since the last index checkpoint."""
+
+    _MAGIC = b"CHLW"
+    _FRAME = struct.Struct("<4sII")
+
+    def __init__(self, path: Path, index_path: Path, dimension: int):
+        self.path = Path(path)
+        self.index_path = Path(index_path)
+        self.dimension = dimension
+        self._fh = None
+
+    @property
+    def size_bytes(self) -> int:
+        try:
+            return self.path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def _index_stamp(self) -> Dict[str, Optional[int]]:
+        try:
+            stat = self.index_path.stat()
+        except FileNotFoundError:
+            return {"index_size": None, "index_mtime_ns": None}
+        return {"index_size": stat.st_size, "index_mtime_ns": stat.st_mtime_ns}
+
+    def _matches_index(self, header: Dict[str, object]) -> bool:
+        """True when a ``base`` header names the index file as it is on disk now."""
+        return header.get("op") == "base" and all(
+            header.get(key) == value for key, value in self._index_stamp().items()
+        )
+
+    def has_pending(self) -> bool:
+        """True when the log holds mutations that apply to the current index file."""
+        if self.size_bytes <= self._FRAME.size:
+            return False
+        with open(self.path, "rb") as fh:
+            magic, header_len, payload_len = self._FRAME.unpack(fh.read(self._FRAME.size))
+            if magic != self._MAGIC:
+                return False
+            try:
+                header = json.loads(fh.read(header_len).decode("utf-8"))
+            except ValueError:
+                return False
+        if self._FRAME.size + header_len + payload_len >= self.size_bytes:
+            return False
+        return self._matches_index(header)
+
+    def _frame(self, header: Dict[str, object], payload: bytes = b"") -> bytes:
+        raw = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        return self._FRAME.pack(self._MAGIC, len(raw), len(payload)) + raw + payload
+
+    def _append(self, header: Dict[str, object], payload: bytes = b"") -> None:
+        if self._fh is None:
+            if self.size_bytes == 0:
+                self.reset()
+            self._fh = open(self.path, "ab")
+        self._fh.write(self._frame(header, payload))
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+
+    def append_add(
+        self,
+        internal_ids: List[int],
+        entity_ids: List[str],
+        entity_types: List[str],
+        category_codes: Optional[List[Optional[str]]],
+        vectors: np.ndarray,
+        superseded_ids: List[int],
+    ) -> None:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self._append(
+            {
+                "op": "add",
+                "ids": [int(i) for i in internal_ids],
+                "entity_ids": list(entity_ids),
+                "entity_types": list(entity_types),
+                "category_codes": list(category_codes) if category_codes is not None else None,
+                "superseded": [int(i) for i in superseded_ids],
+            },
+            vectors.tobytes(),
+        )
+
+    def append_remove(self, internal_ids: List[int]) -> None:
+        self._append({"op": "remove", "ids": [int(i) for i in internal_ids]})
+
+    def append_reset(self) -> None:
+        self._append({"op": "reset"})
+
+    def reset(self) -> None:
+        """Start an empty log bound to the index file as it is on disk now."""
+        self.close()
+        tmp = self.path.with_suffix(".wal.tmp")
+        with open(tmp, "wb") as fh:
+            fh.write(self._frame({"op": "base", **self._index_stamp()}))
+            fh.flush()
+            os.fsync(fh.fileno())
+        tmp.replace(self.path)
+
+    def close(self) -> None:
+        if self._fh is not None:
+            try:
+                self._fh.close()
+            finally:
+                self._fh = None
+
+    def records(self) -> Iterator[Tuple[Dict[str, object], Optional[np.ndarray]]]:
+        """Yield ``(header, vectors)`` for each logged mutation, oldest first.
+
+        A torn record at the tail (crash mid-append) ends the replay and is
+        truncated away. A log written against a different index file yields
+        nothing.
+        """
+        if self.size_bytes == 0:
+            return
+        self.close()
+        good_offset = 0
+        stale = False
+        with open(self.path, "rb") as fh:
+            first = True
+            while True:
+                frame = fh.read(self._FRAME.size)
+                if not frame:
+                    break
+                if len(frame) < self._FRAME.size:
+                    logger.warning("Truncated FAISS WAL frame at offset %s", good_offset)
+                    break
+                magic, header_len, payload_len = self._FRAME.unpack(frame)
+                raw = fh.read(header_len)
+                payload = fh.read(payload_len)
+                if magic != self._MAGIC or len(raw) < header_len or len(payload) < payload_len:
+                    logger.warning("Torn FAISS WAL record at offset %s", good_offset)
+                    break
+                header = json.loads(raw.decode("utf-8"))
+                good_offset = fh.tell()
+                if first:
+                    first = False
+                    if not self._matches_index(header):
+                        stale = True
+                        break
+                    continue
+                vectors = None
+                if payload_len:
+                    vectors = np.frombuffer(payload, dtype=np.float32).reshape(
+                        -1, self.dimension
+                    )
+                yield header, vectors
+        if stale:
+            logger.warning(
+                "FAISS WAL %s does not match %s; discarding it", self.path, self.index_path
+            )
+            self.reset()
+        elif good_offset < self.size_bytes:
+            with open(self.path, "r+b") as fh:
+                fh.truncate(good_offset)
+
+
+__all__ = ["FAISSWriteAheadLog"]
@@ -0,0 +1,209 @@
+"""Micro-batching executor shared by concurrent search requests.
+
+Each search request used to run its own tiny forward pass on the shared
+embedding and reranker models. ``MicroBatchExecutor`` parks callers for at
+most ``max_wait_ms``, merges whatever arrived in that window (up to
+``max_batch`` units) into one call of a batch function and hands each caller
+its slice of the result.
+
+``BatchedEmbeddingClient`` and ``BatchedRerankerClient`` put an executor in
+front of the model clients while keeping their ``encode`` / ``rerank``
+interface; every other attribute is delegated to the wrapped client.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Generic, List, Sequence, Tuple, TypeVar
+
+import numpy as np
+
+from src.api.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def plan_length_batches(lengths: List[int], max_tokens: int, max_rows: int) -> List[List[int]]:
+    """Group positions by token length under a padded-token budget.
+
+    Positions are visited shortest first, so each batch pads to a length
+    close to all of its members. A batch closes when adding the next item
+    would push ``rows x longest`` over ``max_tokens`` or when it reaches
+    ``max_rows`` rows; an item longer than the budget runs on its own.
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    for pos in sorted(range(len(lengths)), key=lengths.__getitem__):
+        # Sorted ascending, so the newcomer is the longest in the batch.
+        if current and (
+            len(current) >= max_rows or (len(current) + 1) * lengths[pos] > max_tokens
+        ):
+            batches.append(current)
+            current = []
+        current.append(pos)
+    if current:
+        batches.append(current)
+    return batches
+
+
+class MicroBatchExecutor(Generic[T, R]):
+    """Coalesce concurrent ``submit`` calls into batched ``batch_fn`` calls.
+
+    ``batch_fn`` receives the queued items in arrival order and must return
+    one result per item. ``weight_fn`` measures an item against
+    ``max_batch`` (e.g. number of texts); an item is never split, so a
+    single heavy item runs as its own batch. ``max_wait_ms=0`` turns the
+    executor into a pass-through.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        batch_fn: Callable[[List[T]], Sequence[R]],
+        max_batch: int = 32,
+        max_wait_ms: float = 5.0,
+        weight_fn: Callable[[T], int] = lambda item: 1,
+    ):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.weight_fn = weight_fn
+        self._queue: "queue.Queue[Tuple[T, Future]]" = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, item: T) -> R:
+        """Run ``item`` in the next batch and block until its result is ready."""
+        if self.max_wait <= 0:
+            return self.batch_fn([item])[0]
+        self._ensure_thread()
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future.result()
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name=f"MicroBatch-{self.name}", daemon=True
+                )
+                self._thread.start()
+
+    def _collect(self, first: Tuple[T, Future]):
+        """Gather a batch starting at ``first``; returns ``(batch, carried_entry)``."""
+        batch = [first]
+        weight = self.weight_fn(first[0])
+        deadline = time.perf_counter() + self.max_wait
+        while weight < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            entry_weight = self.weight_fn(entry[0])
+            if weight + entry_weight > self.max_batch:
+                # Open the next batch with it rather than overshoot this one.
+                return batch, entry
+            batch.append(entry)
+            weight += entry_weight
+        return batch, None
+
+    def _run(self) -> None:
+        carried = None
+        while True:
+            batch, carried = self._collect(carried if carried is not None else self._queue.get())
+            futures = [future for _, future in batch]
+            started = time.perf_counter()
+            try:
+                results = self.batch_fn([item for item, _ in batch])
+            except BaseException as exc:  # hand every caller the failure
+                for future in futures:
+                    future.set_exception(exc)
+                continue
+            metrics.observe(f"inference.{self.name}.batch_requests", len(batch))
+            metrics.observe(
+                f"inference.{self.name}.batch_ms", (time.perf_counter() - started) * 1000.0
+            )
+            for future, result in zip(futures, results):
+                future.set_result(result)
+
+
+class BatchedEmbeddingClient:
+    """``EmbeddingClient`` front end that merges concurrent ``encode`` calls."""
+
+    def __init__(self, client, max_batch: int = 32, max_wait_ms: float = 5.0):
+        self._client = client
+        self._executor: MicroBatchExecutor[List[str], np.ndarray] = MicroBatchExecutor(
+            "embedding",
+            self._encode_many,
+            max_batch=max_batch,
+            max_wait_ms=max_wait_ms,
+            weight_fn=len,
+        )
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def _encode_many(self, requests: List[List[str]]) -> List[np.ndarray]:
+        texts = [text for request in requests for text in request]
+        encoded = self._client.encode(texts)
+        results, start = [], 0
+        for request in requests:
+            results.append(encoded[start : start + len(request)])
+            start += len(request)
+        return results
+
+    def encode(self, texts: List[str], batch_size=None, show_progress: bool = False) -> np.ndarray:
+        if not texts:
+            return np.array([])
+        return self._executor.submit(list(texts))
+
+    def encode_single(self, text: str) -> np.ndarray:
+        return self.encode([text])[0]
+
+
+class BatchedRerankerClient:
+    """``RerankerClient`` front end that scores concurrent ``rerank`` calls together."""
+
+    def __init__(self, client, max_batch: int = 32, max_wait_ms: float = 5.0):
+        self._client = client
+        self._executor: MicroBatchExecutor[Tuple[Dict[str, str], List[str]], List[float]] = (
+            MicroBatchExecutor(
+                "reranker",
+                self._rerank_many,
+                max_batch=max_batch,
+                max_wait_ms=max_wait_ms,
+                weight_fn=lambda job: len(job[1]),
+            )
+        )
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def _rerank_many(self, jobs: List[Tuple[Dict[str, str], List[str]]]) -> List[List[float]]:
+        return self._client.rerank_many(jobs)
+
+    def rerank(self, query: Dict[str, str], documents: List[str], batch_size=None) -> List[float]:
+        if not documents:
+            return []
+        return self._executor.submit((query, list(documents)))
+
+
+__all__ = [
+    "MicroBatchExecutor",
+    "BatchedEmbeddingClient",
+    "BatchedRerankerClient",
+    "plan_length_batches",
+]
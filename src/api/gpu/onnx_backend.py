@@ -0,0 +1,160 @@
+"""Optional int8 ONNX Runtime backend for the embedding and reranker models.
+
+Used on machines without a CUDA or MPS device, where the HF models would
+otherwise run as PyTorch fp32 on CPU. Requires ``optimum[onnxruntime]``.
+
+The first load exports the configured HF checkpoint to ONNX, applies dynamic
+int8 quantization and keeps the result under ``cache_dir``; later loads reuse
+the quantized file. The returned ``optimum`` models accept and return torch
+tensors like their ``transformers`` counterparts, so ``EmbeddingClient`` and
+``RerankerClient`` keep a single ``encode`` / ``rerank`` code path.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import platform
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+RUNTIMES = ("auto", "torch", "onnx")
+QUANTIZED_FILE = "model_quantized.onnx"
+
+
+class ONNXBackendError(Exception):
+    """Raised when the ONNX Runtime backend cannot be used."""
+
+
+def onnx_runtime_available() -> bool:
+    try:
+        import onnxruntime  # noqa: F401
+        import optimum.onnxruntime  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _has_accelerator() -> bool:
+    import torch
+
+    return torch.cuda.is_available() or torch.backends.mps.is_available()
+
+
+def resolve_runtime(requested: str) -> str:
+    """Map ``auto`` / ``torch`` / ``onnx`` to the runtime that will actually load.
+
+    ``auto`` picks ONNX Runtime only on CPU-only hosts that have it installed.
+    The default is ``torch``: int8 vectors do not match stored fp32 ones, so
+    ONNX must be opted into.
+    """
+    requested = (requested or "torch").lower()
+    if requested not in RUNTIMES:
+        raise ONNXBackendError(f"Unknown inference runtime '{requested}'")
+    if requested == "auto":
+        return "onnx" if not _has_accelerator() and onnx_runtime_available() else "torch"
+    if requested == "onnx" and not onnx_runtime_available():
+        raise ONNXBackendError(
+            "ONNX runtime requested but not installed. "
+            "Install it with: pip install \"optimum[onnxruntime]\""
+        )
+    return requested
+
+
+def _session_options(threads: int):
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    # One request runs at a time per session; give it the cores.
+    options.intra_op_num_threads = threads if threads > 0 else (os.cpu_count() or 1)
+    options.inter_op_num_threads = 1
+    return options
+
+
+def _quantization_config():
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return AutoQuantizationConfig.arm64(is_static=False, per_channel=False)
+    return AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+
+
+def load_quantized_model(
+    model_repo: str,
+    task: str,
+    cache_dir: Path,
+    threads: int = 0,
+    trust_remote_code: bool = False,
+):
+    """Load (exporting and quantizing on first use) an int8 ONNX model.
+
+    Args:
+        model_repo: HF repo id available in the local HF cache.
+        task: ``"feature-extraction"`` (embeddings) or ``"text-generation"``
+            (reranker logits).
+        cache_dir: Root directory for exported models.
+        threads: Intra-op threads; 0 uses every core.
+    """
+    try:
+        from optimum.onnxruntime import (
+            ORTModelForCausalLM,
+            ORTModelForFeatureExtraction,
+            ORTQuantizer,
+        )
+    except ImportError as exc:
+        raise ONNXBackendError(
+            "optimum[onnxruntime] not installed. Install it with: pip install \"optimum[onnxruntime]\""
+        ) from exc
+
+    if task == "feature-extraction":
+        model_cls, extra = ORTModelForFeatureExtraction, {}
+    elif task == "text-generation":
+        # Rerank scores one forward pass; no past key values are needed.
+        model_cls, extra = ORTModelForCausalLM, {"use_cache": False, "use_io_binding": False}
+    else:
+        raise ONNXBackendError(f"Unsupported ONNX task '{task}'")
+
+    target = Path(cache_dir) / model_repo.replace("/", "--") / task
+    if not (target / QUANTIZED_FILE).exists():
+        logger.info("Exporting %s to int8 ONNX under %s (first run only)", model_repo, target)
+        try:
+            exported = model_cls.from_pretrained(
+                model_repo,
+                export=True,
+                local_files_only=True,
+                trust_remote_code=trust_remote_code,
+                **extra,
+            )
+            target.mkdir(parents=True, exist_ok=True)
+            exported.save_pretrained(target)
+            ORTQuantizer.from_pretrained(exported).quantize(
+                save_dir=target, quantization_config=_quantization_config()
+            )
+        except Exception as exc:
+            raise ONNXBackendError(f"Failed to export '{model_repo}' to ONNX: {exc}") from exc
+
+    try:
+        model = model_cls.from_pretrained(
+            target,
+            file_name=QUANTIZED_FILE,
+            provider="CPUExecutionProvider",
+            session_options=_session_options(threads),
+            **extra,
+        )
+    except Exception as exc:
+        raise ONNXBackendError(f"Failed to load ONNX model from {target}: {exc}") from exc
+    logger.info("Loaded int8 ONNX model %s (%s)", model_repo, task)
+    return model
+
+
+__all__ = [
+    "ONNXBackendError",
+    "RUNTIMES",
+    "load_quantized_model",
+    "onnx_runtime_available",
+    "resolve_runtime",
+]
@@ -0,0 +1,83 @@
+"""Bounded LRU cache of query embeddings for the vector search path."""
+
+from __future__ import annotations
+
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from src.api.metrics import metrics
+
+
+class QueryEmbeddingCache:
+    """Thread-safe LRU of encoded query vectors keyed by ``(model, text)``.
+
+    Texts are normalized (Unicode NFC, collapsed whitespace) before lookup and
+    callers encode the normalized text, so a hit returns exactly the vector a
+    fresh encode would. Cached vectors are read-only.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max(0, int(max_entries))
+        self._entries: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(unicodedata.normalize("NFC", text).split())
+
+    def get(self, model: str, text: str) -> Optional[np.ndarray]:
+        """Return the cached vector for already-normalized ``text``, if any."""
+        if not self.max_entries:
+            return None
+        with self._lock:
+            vector = self._entries.get((model, text))
+            if vector is None:
+                self._misses += 1
+            else:
+                self._entries.move_to_end((model, text))
+                self._hits += 1
+            hit_rate = self._hits / (self._hits + self._misses)
+        metrics.increment(
+            "query_embedding_cache.hit" if vector is not None else "query_embedding_cache.miss"
+        )
+        metrics.set_gauge("query_embedding_cache.hit_rate", round(hit_rate, 4))
+        return vector
+
+    def put(self, model: str, text: str, vector: np.ndarray) -> np.ndarray:
+        if not self.max_entries:
+            return vector
+        vector = np.array(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        with self._lock:
+            self._entries[(model, text)] = vector
+            self._entries.move_to_end((model, text))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            size = len(self._entries)
+        metrics.set_gauge("query_embedding_cache.size", size)
+        return vector
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        metrics.set_gauge("query_embedding_cache.size", 0)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+__all__ = ["QueryEmbeddingCache"]
@@ -0,0 +1,232 @@
+"""Reranker score cache: in-memory LRU backed by an optional SQLite file.
+
+Scores are keyed by ``(model, query_key, doc_hash)``. ``query_key`` hashes
+the normalized search/task text together with the rerank instruction, and
+``doc_hash`` hashes the exact document text sent to the reranker. When an
+entity is edited its text, and therefore its hash, changes, so stale scores
+are never returned; they simply stop being looked up and age out of both
+tiers.
+
+The SQLite tier lives in its own file rather than the main database so
+search-path writes never contend with the embedding worker's transactions.
+Any SQLite error disables the tier for the rest of the process; the cache
+must never fail a search.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.api.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, str]  # (query_key, doc_hash)
+
+_SQLITE_CHUNK = 500
+
+
+def _normalize(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+class RerankScoreCache:
+    """Thread-safe two-tier cache of reranker scores.
+
+    ``max_entries`` bounds the in-memory LRU (0 keeps nothing in memory);
+    ``db_path`` enables the persistent tier, trimmed to the ``max_rows``
+    most recently written scores.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 4096,
+        db_path: Optional[str] = None,
+        max_rows: int = 200_000,
+    ):
+        self.max_entries = max(0, int(max_entries))
+        self.max_rows = max(1, int(max_rows))
+        self._entries: "OrderedDict[Tuple[str, str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._writes_since_trim = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self.db_path = db_path
+        if db_path:
+            self._open(Path(db_path))
+
+    @staticmethod
+    def query_key(query: Dict[str, str], instruction: str = "") -> str:
+        parts = (
+            _normalize(query.get("search") or ""),
+            _normalize(query.get("task") or ""),
+            _normalize(instruction),
+        )
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def document_hash(document: str) -> str:
+        return hashlib.sha256((document or "").encode("utf-8")).hexdigest()
+
+    def _open(self, path: Path) -> None:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rerank_scores ("
+                " model TEXT NOT NULL,"
+                " query_key TEXT NOT NULL,"
+                " doc_hash TEXT NOT NULL,"
+                " score REAL NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " PRIMARY KEY (model, query_key, doc_hash))"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_rerank_scores_created_at"
+                " ON rerank_scores (created_at)"
+            )
+            conn.commit()
+            self._conn = conn
+            logger.info("Rerank score cache persisted at %s", path)
+        except sqlite3.Error as exc:
+            logger.warning("Rerank score cache: SQLite tier disabled (%s): %s", path, exc)
+            self._conn = None
+
+    def _disable_sqlite(self, exc: Exception) -> None:
+        logger.warning("Rerank score cache: SQLite tier disabled after error: %s", exc)
+        try:
+            if self._conn is not None:
+                self._conn.close()
+        except sqlite3.Error:
+            pass
+        self._conn = None
+
+    def _sqlite_get(self, model: str, keys: List[CacheKey]) -> Dict[CacheKey, float]:
+        found: Dict[CacheKey, float] = {}
+        by_query: Dict[str, List[str]] = {}
+        for query_key, doc_hash in keys:
+            by_query.setdefault(query_key, []).append(doc_hash)
+        for query_key, doc_hashes in by_query.items():
+            for start in range(0, len(doc_hashes), _SQLITE_CHUNK):
+                chunk = doc_hashes[start : start + _SQLITE_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    "SELECT doc_hash, score FROM rerank_scores"
+                    f" WHERE model = ? AND query_key = ? AND doc_hash IN ({placeholders})",
+                    [model, query_key, *chunk],
+                ).fetchall()
+                for doc_hash, score in rows:
+                    found[(query_key, doc_hash)] = float(score)
+        return found
+
+    def _sqlite_put(self, model: str, scores: Dict[CacheKey, float]) -> None:
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO rerank_scores"
+            " (model, query_key, doc_hash, score, created_at) VALUES (?, ?, ?, ?, ?)",
+            [(model, q, d, float(s), now) for (q, d), s in scores.items()],
+        )
+        self._writes_since_trim += len(scores)
+        # Trimming scans the table; do it once every ~1% of capacity.
+        if self._writes_since_trim >= max(1, self.max_rows // 100):
+            self._writes_since_trim = 0
+            self._conn.execute(
+                "DELETE FROM rerank_scores WHERE rowid IN ("
+                " SELECT rowid FROM rerank_scores ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_rows,),
+            )
+        self._conn.commit()
+
+    def _remember(self, model: str, key: CacheKey, score: float) -> None:
+        if not self.max_entries:
+            return
+        entry = (model, key[0], key[1])
+        self._entries[entry] = score
+        self._entries.move_to_end(entry)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_many(self, model: str, keys: Iterable[CacheKey]) -> Dict[CacheKey, float]:
+        """Return cached scores for the keys that have one."""
+        keys = list(dict.fromkeys(keys))
+        found: Dict[CacheKey, float] = {}
+        with self._lock:
+            missing: List[CacheKey] = []
+            for key in keys:
+                score = self._entries.get((model, key[0], key[1]))
+                if score is None:
+                    missing.append(key)
+                else:
+                    self._entries.move_to_end((model, key[0], key[1]))
+                    found[key] = score
+            if missing and self._conn is not None:
+                try:
+                    stored = self._sqlite_get(model, missing)
+                except sqlite3.Error as exc:
+                    self._disable_sqlite(exc)
+                    stored = {}
+                for key, score in stored.items():
+                    self._remember(model, key, score)
+                found.update(stored)
+            self._hits += len(found)
+            self._misses += len(keys) - len(found)
+            lookups = self._hits + self._misses
+            hit_rate = self._hits / lookups if lookups else 0.0
+        if found:
+            metrics.increment("rerank_cache.hit", len(found))
+        if len(keys) > len(found):
+            metrics.increment("rerank_cache.miss", len(keys) - len(found))
+        metrics.set_gauge("rerank_cache.hit_rate", round(hit_rate, 4))
+        return found
+
+    def put_many(self, model: str, scores: Dict[CacheKey, float]) -> None:
+        if not scores:
+            return
+        with self._lock:
+            for key, score in scores.items():
+                self._remember(model, key, float(score))
+            if self._conn is not None:
+                try:
+                    self._sqlite_put(model, scores)
+                except sqlite3.Error as exc:
+                    self._disable_sqlite(exc)
+            size = len(self._entries)
+        metrics.set_gauge("rerank_cache.size", size)
+
+    def clear(self) -> None:
+        """Drop every cached score, including the persisted ones."""
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                try:
+                    self._conn.execute("DELETE FROM rerank_scores")
+                    self._conn.commit()
+                except sqlite3.Error as exc:
+                    self._disable_sqlite(exc)
+        metrics.set_gauge("rerank_cache.size", 0)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "persistent": self._conn is not None,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+__all__ = ["RerankScoreCache"]
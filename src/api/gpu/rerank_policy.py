@@ -0,0 +1,91 @@
+"""Adaptive rerank depth for the vector search path.
+
+Reranking every one of ``topk_rerank`` FAISS candidates costs one LM pass
+each, although most searches only return a handful of results.
+``AdaptiveRerankPolicy`` decides how deep to go per query:
+
+1. Skip: when the best vector score beats the runner-up by at least
+   ``dominance_margin``, only the first ``top_k`` candidates are reranked
+   and nothing deeper is considered. The head is still scored so results
+   always carry reranker scores, never a mix with raw FAISS similarities.
+2. Tiers: otherwise the first ``max(top_k, tier_size)`` candidates are
+   reranked, then further tiers of ``tier_size`` until a tier leaves the
+   best ``top_k`` entries unchanged.
+3. Cap: never more than ``depth_factor * top_k`` (and never more than the
+   candidates handed in, i.e. ``topk_rerank``).
+
+``scripts/ops/eval_rerank_depth.py`` measures NDCG and latency of the
+policy against full-depth reranking on a labelled query set.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, List, Sequence
+
+
+@dataclass
+class RerankPlan:
+    """Outcome of one adaptive rerank.
+
+    ``scores`` holds reranker scores for the first ``depth`` candidates.
+    ``skipped`` marks a dominant top hit, where only the ``top_k`` head
+    was reranked.
+    """
+
+    depth: int
+    skipped: bool
+    scores: List[float]
+
+
+@dataclass
+class AdaptiveRerankPolicy:
+    dominance_margin: float = 0.2
+    tier_size: int = 8
+    depth_factor: int = 3
+
+    def max_depth(self, candidates: int, top_k: int) -> int:
+        return min(candidates, max(top_k, self.depth_factor * top_k))
+
+    def dominates(self, vector_scores: Sequence[float]) -> bool:
+        if self.dominance_margin <= 0 or len(vector_scores) < 2:
+            return False
+        return float(vector_scores[0]) - float(vector_scores[1]) >= self.dominance_margin
+
+    def run(
+        self,
+        vector_scores: Sequence[float],
+        top_k: int,
+        score_range: Callable[[int, int], List[float]],
+    ) -> RerankPlan:
+        """Rerank candidates (sorted by vector score) as deep as needed.
+
+        ``score_range(start, end)`` reranks candidates ``start:end`` and
+        returns their scores in order.
+        """
+        top_k = max(1, top_k)
+        if self.dominates(vector_scores):
+            depth = min(len(vector_scores), top_k)
+            return RerankPlan(depth=depth, skipped=True, scores=list(score_range(0, depth)))
+
+        cap = self.max_depth(len(vector_scores), top_k)
+        depth = min(cap, max(top_k, self.tier_size))
+        scores = list(score_range(0, depth))
+        best = self._best(scores, top_k)
+        while depth < cap:
+            end = min(cap, depth + max(1, self.tier_size))
+            scores.extend(score_range(depth, end))
+            depth = end
+            current = self._best(scores, top_k)
+            if current == best:
+                break
+            best = current
+        return RerankPlan(depth=depth, skipped=False, scores=scores)
+
+    @staticmethod
+    def _best(scores: List[float], top_k: int) -> frozenset:
+        ranked = sorted(range(len(scores)), key=lambda pos: scores[pos], reverse=True)
+        return frozenset(ranked[:top_k])
+
+
+__all__ = ["AdaptiveRerankPolicy", "RerankPlan"]
@@ -1,14 +1,37 @@
 """Reranker client using HF Transformers (yes/no logits at last position)."""
 
+import copy
 import logging
-from typing import Dict, List, Optional
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
 import torch
 import torch.nn.functional as F
 from transformers import AutoModelForCausalLM, AutoTokenizer
 
+from src.api.metrics import metrics
+from .inference_executor import plan_length_batches
+from .onnx_backend import load_quantized_model
+from .rerank_cache import RerankScoreCache
+
 logger = logging.getLogger(__name__)
 
+_SYSTEM_PROMPT = (
+    "<|im_start|>system\n"
+    'Judge whether the Document helps complete the Task given the Search concepts. '
+    'Respond with a single token: "yes" or "no". Do not include <think>, punctuation, or explanations.<|im_end|>\n'
+    "<|im_start|>user\n"
+)
+_ASSISTANT_SUFFIX = "<|im_end|>\n<|im_start|>assistant\n<think>\n\n</think>\n\n"
+
+# Long documents keep their first 3/4 and last 1/4 of the token budget.
+_HEAD_FRACTION = 0.75
+_TRUNCATION_MARKER = "\n...\n"
+# Room for the marker and re-tokenization drift at the head/tail seams.
+_TRUNCATION_SLACK = 8
+_MIN_DOCUMENT_TOKENS = 64
+
 
 class RerankerClient:
     """Client for reranking documents using HF reranker models (yes/no classifier)."""
@@ -23,6 +46,14 @@ class RerankerClient:
             "Judge relevance for the task and concepts; respond yes if the document helps."
         ),
         debug_logprobs: bool = False,
+        runtime: str = "torch",
+        onnx_cache_dir: Optional[str] = None,
+        onnx_threads: int = 0,
+        max_batch_tokens: int = 8192,
+        batch_size: int = 64,
+        prefix_cache: bool = True,
+        score_cache: Optional[RerankScoreCache] = None,
+        max_seq_len: int = 1024,
     ):
         del quantization, n_ctx, n_gpu_layers  # Not used in HF backend
         # Map GGUF-style ids to HF ids if needed
@@ -32,6 +63,22 @@ class RerankerClient:
             self.model_repo = model_repo
         self.rerank_instruction = rerank_instruction
         self.debug_logprobs = debug_logprobs
+        # "torch" (transformers) or "onnx" (int8 ONNX Runtime on CPU)
+        self.runtime = runtime
+        # Padded tokens (rows x longest prompt) and rows per forward pass.
+        self.max_batch_tokens = max_batch_tokens
+        self.batch_size = batch_size
+        # Reuse the KV cache of the shared prompt prefix (torch runtime only).
+        self.prefix_cache = prefix_cache
+        self._system_kv: Optional[Tuple[str, List[int], object]] = None
+        self._system_kv_lock = threading.Lock()
+        # Optional (query, document) score cache; hits skip the model.
+        self.score_cache = score_cache
+        # Prompt length budget in tokens; longer documents are cut head + tail.
+        self.max_seq_len = max_seq_len
+        self._documents_seen = 0
+        self._documents_truncated = 0
+        self._truncation_lock = threading.Lock()
 
         try:
             logger.info("Loading HF reranker model: %s", self.model_repo)
@@ -40,16 +87,27 @@ class RerankerClient:
                 padding_side="left",
                 local_files_only=True,
             )
-            self.model = AutoModelForCausalLM.from_pretrained(self.model_repo, local_files_only=True)
-
-            if torch.backends.mps.is_available():
-                self.device = torch.device("mps")
-            elif torch.cuda.is_available():
-                self.device = torch.device("cuda")
-            else:
+            if self.runtime == "onnx":
                 self.device = torch.device("cpu")
-            self.model.to(self.device)
-            self.model.eval()
+                self.model = load_quantized_model(
+                    self.model_repo,
+                    "text-generation",
+                    Path(onnx_cache_dir or "onnx"),
+                    threads=onnx_threads,
+                )
+            else:
+                self.model = AutoModelForCausalLM.from_pretrained(
+                    self.model_repo, local_files_only=True
+                )
+
+                if torch.backends.mps.is_available():
+                    self.device = torch.device("mps")
+                elif torch.cuda.is_available():
+                    self.device = torch.device("cuda")
+                else:
+                    self.device = torch.device("cpu")
+                self.model.to(self.device)
+                self.model.eval()
 
             # Include leading-space variants since the model is tokenized with spaces.
             self.yes_token_ids = [
@@ -64,9 +122,10 @@ class RerankerClient:
             ]
 
             logger.info(
-                "HF reranker loaded: %s on %s (yes ids=%s, no ids=%s)",
+                "HF reranker loaded: %s on %s (%s, yes ids=%s, no ids=%s)",
                 self.model_repo,
                 self.device,
+                self.runtime,
                 self.yes_token_ids,
                 self.no_token_ids,
             )
@@ -84,74 +143,341 @@ class RerankerClient:
         """
         Point-wise rerank using chat template and logits at the last position.
 
+        All prompts are tokenized together and scored in left-padded batches
+        under ``max_batch_tokens`` (at most ``batch_size`` rows each).
+
         Returns scores in [0,1] representing P(yes | instruction, query, document).
         """
-        del batch_size  # Not used
-
         if not documents:
             return []
+        return self.rerank_many([(query, documents)], batch_size=batch_size)[0]
+
+    def rerank_many(
+        self,
+        jobs: List[Tuple[Dict[str, str], List[str]]],
+        batch_size: Optional[int] = None,
+    ) -> List[List[float]]:
+        """Score several ``(query, documents)`` jobs together.
+
+        With a ``score_cache``, pairs already scored by this model are
+        answered from the cache and only the rest reach the model.
+
+        With ``prefix_cache`` on the torch runtime, a single job runs its
+        shared prompt prefix once and only the document suffixes are scored
+        per candidate (see ``_score_shared_prefix``). Several jobs, e.g. a
+        micro-batch merged by ``BatchedRerankerClient``, share only the
+        system block, so their query + document rows are scored together
+        in one set of padded passes after it.
+
+        Scores come back grouped per job, in document order.
+        """
+        if not any(documents for _, documents in jobs):
+            return [[] for _ in jobs]
+        max_rows = batch_size or self.batch_size
+        if self.score_cache is None:
+            return self._score_jobs(jobs, max_rows)
 
+        # Truncation changes scores, so the budget is part of the key.
+        cache_model = f"{self.model_repo}@{self.runtime}/{self.max_seq_len}"
+        keys = [
+            [
+                (RerankScoreCache.query_key(query, self.rerank_instruction),
+                 RerankScoreCache.document_hash(doc))
+                for doc in documents
+            ]
+            for query, documents in jobs
+        ]
+        cached = self.score_cache.get_many(cache_model, [key for job in keys for key in job])
+
+        # Score each uncached pair once, even if it repeats across jobs.
+        pending: Dict[Tuple[str, str], Tuple[Dict[str, str], str]] = {}
+        for (query, documents), job_keys in zip(jobs, keys):
+            for doc, key in zip(documents, job_keys):
+                if key not in cached:
+                    pending.setdefault(key, (query, doc))
+        if pending:
+            by_query: Dict[str, Tuple[Dict[str, str], List[Tuple[str, str]], List[str]]] = {}
+            for key, (query, doc) in pending.items():
+                group = by_query.setdefault(key[0], (query, [], []))
+                group[1].append(key)
+                group[2].append(doc)
+            groups = list(by_query.values())
+            scored = self._score_jobs([(query, docs) for query, _, docs in groups], max_rows)
+            fresh = {
+                key: score
+                for (_, group_keys, _), group_scores in zip(groups, scored)
+                for key, score in zip(group_keys, group_scores)
+            }
+            self.score_cache.put_many(cache_model, fresh)
+            cached.update(fresh)
+        return [[cached[key] for key in job_keys] for job_keys in keys]
+
+    def _score_jobs(
+        self, jobs: List[Tuple[Dict[str, str], List[str]]], max_rows: int
+    ) -> List[List[float]]:
         try:
-            logger.debug("Reranking %s documents with HF reranker", len(documents))
-            scores: List[float] = []
-            for doc in documents:
-                prompt = self._build_prompt(query=query, document=doc)
-                score = self._score_pair(prompt)
-                scores.append(score)
-
-            logger.debug("Reranked %s documents", len(documents))
-            return scores
+            logger.debug(
+                "Reranking %s documents with HF reranker",
+                sum(len(documents) for _, documents in jobs),
+            )
+            jobs = [(query, self._fit_documents(query, documents)) for query, documents in jobs]
+            if self.prefix_cache and self.runtime == "torch":
+                return self._score_jobs_cached(jobs, max_rows)
+            prompts = [
+                self._build_prompt(query=query, document=doc)
+                for query, documents in jobs
+                for doc in documents
+            ]
+            flat = self._score_prompts(prompts, max_rows=max_rows)
         except Exception as exc:
             raise RerankerClientError(f"Reranking failed: {exc}") from exc
 
-    def _build_prompt(self, query: Dict[str, str], document: str) -> str:
-        """Build chat prompt with explicit search/task components."""
+        results: List[List[float]] = []
+        start = 0
+        for _, documents in jobs:
+            results.append(flat[start : start + len(documents)])
+            start += len(documents)
+        return results
+
+    def _score_jobs_cached(
+        self, jobs: List[Tuple[Dict[str, str], List[str]]], max_rows: int
+    ) -> List[List[float]]:
+        """Prefix-cached scoring: reuse the query KV for one job, the system KV across jobs."""
+        parts = [
+            [self._prompt_parts(query=query, document=doc) for doc in documents]
+            for query, documents in jobs
+        ]
+        busy = [job_parts for job_parts in parts if job_parts]
+        if len(busy) == 1:
+            system, query_part = busy[0][0][0], busy[0][0][1]
+            scores = self._score_shared_prefix(
+                system, query_part, [part[2] for part in busy[0]], max_rows
+            )
+            return [scores if job_parts else [] for job_parts in parts]
+
+        flat = self._score_shared_prefix(
+            busy[0][0][0],
+            "",
+            [query_part + suffix for job_parts in parts for _, query_part, suffix in job_parts],
+            max_rows,
+        )
+        results: List[List[float]] = []
+        start = 0
+        for job_parts in parts:
+            results.append(flat[start : start + len(job_parts)])
+            start += len(job_parts)
+        return results
+
+    def _prompt_parts(self, query: Dict[str, str], document: str) -> Tuple[str, str, str]:
+        """Split the chat prompt into ``(system, query_part, document_suffix)``.
+
+        ``system`` is identical for every prompt of this client and
+        ``query_part`` for every document of one query. The split sits right
+        after ``<Document>:`` so the suffix starts with a space-prefixed word,
+        a token boundary for the BPE pre-tokenizer.
+        """
         instruction = (self.rerank_instruction or "").strip()
         search_text = (query.get("search") or "").strip()
         task_text = (query.get("task") or "").strip()
         doc_text = (document or "").strip()
-        max_chars = 4000
-        if len(doc_text) > max_chars:
-            doc_text = doc_text[:max_chars] + " ..."
-
-        prefix = (
-            "<|im_start|>system\n"
-            'Judge whether the Document helps complete the Task given the Search concepts. '
-            'Respond with a single token: "yes" or "no". Do not include <think>, punctuation, or explanations.<|im_end|>\n'
-            "<|im_start|>user\n"
-        )
-        suffix = "<|im_end|>\n<|im_start|>assistant\n<think>\n\n</think>\n\n"
 
-        user_payload = (
-            f"<Instruct>: {instruction}\n"
-            f"<Search>: {search_text}\n"
-            f"<Task>: {task_text}\n"
-            f"<Document>: {doc_text}"
-        )
+        system = _SYSTEM_PROMPT + f"<Instruct>: {instruction}\n"
+        query_part = f"<Search>: {search_text}\n<Task>: {task_text}\n<Document>:"
+        return system, query_part, f" {doc_text}" + _ASSISTANT_SUFFIX
 
-        return prefix + user_payload + suffix
+    def _fit_documents(self, query: Dict[str, str], documents: List[str]) -> List[str]:
+        """Cut documents so each prompt stays within ``max_seq_len`` tokens.
 
-    def _score_pair(self, prompt: str) -> float:
-        """Return P(yes) from logits at the last prompt position (no generation)."""
-        inputs = self.tokenizer(
-            prompt,
-            return_tensors="pt",
-            padding=False,
-            truncation=True,
-        )
-        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        The budget is what the query's prompt leaves for the document (at
+        least ``_MIN_DOCUMENT_TOKENS``). A longer document keeps its head
+        and tail tokens around a ``...`` marker, since titles and summaries
+        sit at the start and outcomes at the end of most playbooks.
+        """
+        texts = [(doc or "").strip() for doc in documents]
+        if not texts:
+            return texts
+        overhead = len(self.tokenizer(self._build_prompt(query=query, document=""))["input_ids"])
+        budget = max(_MIN_DOCUMENT_TOKENS, self.max_seq_len - overhead)
+        encoded = self.tokenizer(texts, add_special_tokens=False)["input_ids"]
+
+        truncated = 0
+        for pos, ids in enumerate(encoded):
+            if len(ids) <= budget:
+                continue
+            keep = max(2, budget - _TRUNCATION_SLACK)
+            head = int(keep * _HEAD_FRACTION)
+            texts[pos] = (
+                self.tokenizer.decode(ids[:head], clean_up_tokenization_spaces=False).rstrip()
+                + _TRUNCATION_MARKER
+                + self.tokenizer.decode(
+                    ids[len(ids) - (keep - head) :], clean_up_tokenization_spaces=False
+                ).lstrip()
+            )
+            truncated += 1
+
+        with self._truncation_lock:
+            self._documents_seen += len(texts)
+            self._documents_truncated += truncated
+            rate = self._documents_truncated / self._documents_seen
+        metrics.increment("reranker.documents", len(texts))
+        if truncated:
+            metrics.increment("reranker.documents_truncated", truncated)
+        metrics.set_gauge("reranker.truncation_rate", round(rate, 4))
+        return texts
+
+    def truncation_stats(self) -> Dict[str, float]:
+        """Cumulative share of documents cut to fit ``max_seq_len``."""
+        with self._truncation_lock:
+            seen = self._documents_seen
+            return {
+                "max_seq_len": self.max_seq_len,
+                "documents": seen,
+                "truncated": self._documents_truncated,
+                "truncation_rate": round(self._documents_truncated / seen, 4) if seen else 0.0,
+            }
+
+    def _build_prompt(self, query: Dict[str, str], document: str) -> str:
+        """Build chat prompt with explicit search/task components."""
+        return "".join(self._prompt_parts(query=query, document=document))
+
+    def _score_prompts(self, prompts: List[str], max_rows: int) -> List[float]:
+        """Return P(yes) per prompt from the logits at each prompt's last token.
+
+        Prompts are grouped by token length so padding stays small. Left
+        padding keeps every row's last token in the final position, and
+        position ids restart at the first real token, so a padded row scores
+        the same as the prompt on its own.
+        """
+        encoded = self.tokenizer(prompts, padding=False, truncation=True)
+        lengths = [len(ids) for ids in encoded["input_ids"]]
+        scores: List[float] = [0.0] * len(prompts)
+        for batch in plan_length_batches(lengths, self.max_batch_tokens, max_rows):
+            features = {key: [encoded[key][pos] for pos in batch] for key in encoded.keys()}
+            inputs = self.tokenizer.pad(features, padding=True, return_tensors="pt")
+            inputs = {k: v.to(self.device) for k, v in inputs.items()}
+            extra = {}
+            if self.runtime == "torch":
+                inputs["position_ids"] = (
+                    inputs["attention_mask"].long().cumsum(-1) - 1
+                ).clamp(min=0)
+                # Only the last position's logits are needed; skip the rest of the vocab projection.
+                extra["logits_to_keep"] = 1
+
+            with torch.no_grad():
+                outputs = self.model(**inputs, **extra)
+                logits = outputs.logits[:, -1, :]  # (B, vocab)
 
+            for pos, score in zip(batch, self._yes_probabilities(logits)):
+                scores[pos] = score
+        return scores
+
+    def _prefix_kv(self, ids: List[int], past=None, past_len: int = 0):
+        """Run ``ids[past_len:]`` after ``past`` (left untouched) and return the KV cache."""
+        input_ids = torch.tensor([ids[past_len:]], dtype=torch.long, device=self.device)
+        attention_mask = torch.ones((1, len(ids)), dtype=torch.long, device=self.device)
         with torch.no_grad():
-            outputs = self.model(**inputs)
-            logits = outputs.logits[:, -1, :]  # (1, vocab)
+            outputs = self.model(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                past_key_values=copy.deepcopy(past) if past is not None else None,
+                use_cache=True,
+                logits_to_keep=1,
+            )
+        return outputs.past_key_values
+
+    def _system_prefix_kv(self, system: str) -> Tuple[List[int], object]:
+        """Token ids and KV cache of the system block, computed once per process."""
+        with self._system_kv_lock:
+            if self._system_kv is None or self._system_kv[0] != system:
+                ids = self.tokenizer(system)["input_ids"]
+                self._system_kv = (system, ids, self._prefix_kv(ids))
+            return self._system_kv[1], self._system_kv[2]
+
+    def _score_shared_prefix(
+        self, system: str, query_part: str, suffixes: List[str], max_rows: int
+    ) -> List[float]:
+        """Score ``system + query_part + suffix`` prompts reusing the prefix KV cache.
+
+        The query KV cache extends the cached system block once (an empty
+        ``query_part`` uses the system block as is); each batch of left-padded
+        suffixes then attends to a copy of it expanded to the batch size,
+        with position ids continuing after the prefix.
+        Full prompts are still tokenized to slice off the suffix ids, so any
+        prompt whose tokens do not start with the prefix tokens falls back
+        to ``_score_prompts`` and scores stay identical to the uncached path.
+        """
+        prefix = system + query_part
+        prefix_ids = self.tokenizer(prefix)["input_ids"]
+        prefix_len = len(prefix_ids)
+        full_ids = self.tokenizer(
+            [prefix + suffix for suffix in suffixes], padding=False, truncation=True
+        )["input_ids"]
+
+        scores: List[float] = [0.0] * len(suffixes)
+        shared: List[int] = []
+        fallback: List[int] = []
+        for pos, ids in enumerate(full_ids):
+            if len(ids) > prefix_len and ids[:prefix_len] == prefix_ids:
+                shared.append(pos)
+            else:
+                fallback.append(pos)
+        if fallback:
+            fallback_scores = self._score_prompts(
+                [prefix + suffixes[pos] for pos in fallback], max_rows=max_rows
+            )
+            for pos, score in zip(fallback, fallback_scores):
+                scores[pos] = score
+        if not shared:
+            return scores
+
+        system_ids, system_kv = self._system_prefix_kv(system)
+        if prefix_ids == system_ids:
+            query_kv = system_kv
+        elif prefix_ids[: len(system_ids)] == system_ids:
+            query_kv = self._prefix_kv(prefix_ids, system_kv, len(system_ids))
+        else:
+            query_kv = self._prefix_kv(prefix_ids)
+
+        suffix_ids = [full_ids[pos][prefix_len:] for pos in shared]
+        lengths = [len(ids) for ids in suffix_ids]
+        pad_id = self.tokenizer.pad_token_id or 0
+        for batch in plan_length_batches(lengths, self.max_batch_tokens, max_rows):
+            rows, width = len(batch), max(lengths[i] for i in batch)
+            input_ids = torch.full((rows, width), pad_id, dtype=torch.long)
+            suffix_mask = torch.zeros((rows, width), dtype=torch.long)
+            for row, i in enumerate(batch):
+                input_ids[row, width - lengths[i] :] = torch.tensor(suffix_ids[i], dtype=torch.long)
+                suffix_mask[row, width - lengths[i] :] = 1
+            attention_mask = torch.cat(
+                [torch.ones((rows, prefix_len), dtype=torch.long), suffix_mask], dim=1
+            )
+            position_ids = prefix_len + (suffix_mask.cumsum(-1) - 1).clamp(min=0)
+            past = copy.deepcopy(query_kv)
+            past.batch_repeat_interleave(rows)
+
+            with torch.no_grad():
+                outputs = self.model(
+                    input_ids=input_ids.to(self.device),
+                    attention_mask=attention_mask.to(self.device),
+                    position_ids=position_ids.to(self.device),
+                    past_key_values=past,
+                    use_cache=True,
+                    logits_to_keep=1,
+                )
+                logits = outputs.logits[:, -1, :]
+
+            for i, score in zip(batch, self._yes_probabilities(logits)):
+                scores[shared[i]] = score
+        return scores
 
+    def _yes_probabilities(self, logits: "torch.Tensor") -> List[float]:
         # Take max over yes/no variants
         yes_logit = torch.max(logits[:, self.yes_token_ids], dim=1).values
         no_logit = torch.max(logits[:, self.no_token_ids], dim=1).values
 
-        pair_logits = torch.stack([no_logit, yes_logit], dim=1)  # [1,2]
-        probs = F.softmax(pair_logits, dim=1)
-        return float(probs[:, 1].item())
+        pair_logits = torch.stack([no_logit, yes_logit], dim=1)  # [B,2]
+        probs = F.softmax(pair_logits.float(), dim=1)
+        return [float(p) for p in probs[:, 1].tolist()]
 
     def get_model_version(self) -> str:
         return self.model_repo
@@ -10,6 +10,8 @@ from __future__ import annotations
 
 import logging
 import os
+import threading
+import time
 from pathlib import Path
 from typing import Any, Optional
 
@@ -17,6 +19,7 @@ from sqlalchemy import func
 
 from src.common.config.config import Config
 from src.common.storage.database import Database
+from src.common.storage.repository import EmbeddingRepository
 from src.common.storage.schema import FAISSMetadata, utc_now
 from src.common.interfaces.runtime import (
     ModeRuntime,
@@ -28,8 +31,13 @@ from src.api.gpu.faiss_manager import (
     ThreadSafeFAISSManager,
     initialize_faiss_with_recovery,
 )
+from src.api.gpu.query_cache import QueryEmbeddingCache
+from src.api.gpu.rerank_cache import RerankScoreCache
+from src.api.gpu.rerank_policy import AdaptiveRerankPolicy
 from src.api.gpu.search_provider import VectorFAISSProvider
 from src.api.gpu.embedding_client import EmbeddingClient
+from src.api.gpu.inference_executor import BatchedEmbeddingClient, BatchedRerankerClient
+from src.api.gpu.onnx_backend import resolve_runtime
 from src.api.gpu.reranker_client import RerankerClient
 from src.api.services.background_worker import BackgroundEmbeddingWorker, WorkerPool
 from src.api.services.worker_control import WorkerControlService
@@ -56,6 +64,12 @@ class GpuOperationsModeAdapter(OperationsModeAdapter):
         self._model_name = model_name
         self._skills_enabled = skills_enabled
 
+    def attach(self, embedding_client=None, thread_safe_faiss=None, vector_provider=None) -> None:
+        """Wire in components that finished loading after startup."""
+        self._embedding_client = embedding_client
+        self._thread_safe_faiss = thread_safe_faiss
+        self._vector_provider = vector_provider
+
     def can_run_vector_jobs(self) -> bool:
         return (
             self._embedding_client is not None
@@ -149,6 +163,16 @@ class GpuDiagnosticsAdapter(DiagnosticsModeAdapter):
         }
 
 
+def _rerank_policy(config: Any) -> Optional[AdaptiveRerankPolicy]:
+    if not getattr(config, "rerank_adaptive", False):
+        return None
+    return AdaptiveRerankPolicy(
+        dominance_margin=getattr(config, "rerank_dominance_margin", 0.2),
+        tier_size=getattr(config, "rerank_tier_size", 8),
+        depth_factor=getattr(config, "rerank_depth_factor", 3),
+    )
+
+
 def _build_embedding_stack(
     config: Any, db: Any
 ) -> tuple[
@@ -166,6 +190,15 @@ def _build_embedding_stack(
     try:
         logger.info("Starting search service initialization...")
 
+        # Model runtime (transformers, or int8 ONNX Runtime on CPU-only hosts)
+        runtime = resolve_runtime(getattr(config, "inference_runtime", "torch"))
+        onnx_options = {
+            "runtime": runtime,
+            "onnx_cache_dir": getattr(config, "onnx_cache_dir", None),
+            "onnx_threads": getattr(config, "onnx_threads", 0),
+        }
+        logger.info("Model runtime: %s", runtime)
+
         # Embedding client
         try:
             logger.info("Loading embedding client: %s", config.embedding_model)
@@ -173,6 +206,8 @@ def _build_embedding_stack(
                 model_repo=config.embedding_repo,
                 quantization=config.embedding_quant,
                 n_gpu_layers=getattr(config, "embedding_n_gpu_layers", 0),
+                max_batch_tokens=getattr(config, "embedding_batch_tokens", 16384),
+                **onnx_options,
             )
             logger.info(
                 "✓ Embedding client loaded successfully: %s", config.embedding_model
@@ -231,10 +266,21 @@ def _build_embedding_stack(
         if embedding_client and thread_safe_faiss:
             try:
                 logger.info("Loading reranker: %s", config.reranker_model)
+                score_cache = None
+                if getattr(config, "rerank_cache_size", 0) or getattr(config, "rerank_cache_path", None):
+                    score_cache = RerankScoreCache(
+                        max_entries=getattr(config, "rerank_cache_size", 0),
+                        db_path=getattr(config, "rerank_cache_path", None),
+                    )
                 reranker_client = RerankerClient(
                     model_repo=config.reranker_repo,
                     quantization=config.reranker_quant,
                     n_gpu_layers=getattr(config, "reranker_n_gpu_layers", 0),
+                    max_batch_tokens=getattr(config, "reranker_batch_tokens", 8192),
+                    prefix_cache=getattr(config, "reranker_prefix_cache", True),
+                    max_seq_len=getattr(config, "reranker_max_seq_len", 1024),
+                    score_cache=score_cache,
+                    **onnx_options,
                 )
                 logger.info("✓ Reranker loaded: %s", config.reranker_model)
             except Exception as exc:
@@ -248,13 +294,29 @@ def _build_embedding_stack(
         if embedding_client and thread_safe_faiss:
             try:
                 logger.info("Creating vector provider...")
+                # Concurrent searches share forward passes; the background
+                # worker keeps the raw client for its own large batches.
+                batch_wait_ms = getattr(config, "inference_batch_wait_ms", 0)
+                max_batch = getattr(config, "inference_max_batch", 32)
+                search_embedder = embedding_client
+                search_reranker = reranker_client
+                if batch_wait_ms > 0:
+                    search_embedder = BatchedEmbeddingClient(
+                        embedding_client, max_batch=max_batch, max_wait_ms=batch_wait_ms
+                    )
+                    if reranker_client is not None:
+                        search_reranker = BatchedRerankerClient(
+                            reranker_client, max_batch=max_batch, max_wait_ms=batch_wait_ms
+                        )
                 vector_provider = VectorFAISSProvider(
                     index_manager=thread_safe_faiss,
-                    embedding_client=embedding_client,
+                    embedding_client=search_embedder,
                     model_name=config.embedding_model,
-                    reranker_client=reranker_client,
+                    reranker_client=search_reranker,
                     topk_retrieve=getattr(config, "topk_retrieve", 100),
                     topk_rerank=getattr(config, "topk_rerank", 40),
+                    query_cache=QueryEmbeddingCache(getattr(config, "query_cache_size", 1024)),
+                    rerank_policy=_rerank_policy(config),
                 )
                 logger.info(
                     "✓ Vector provider initialized, is_available=%s",
@@ -326,36 +388,104 @@ def _build_worker_stack(
         return None, None
 
 
+def _start_vector_migration(db: Any, batch_size: int = 500) -> threading.Thread:
+    """Convert legacy text embeddings to binary float32 rows in the background.
+
+    Each batch commits on its own so the embedding worker is never blocked
+    for long; readers decode either format meanwhile.
+    """
+
+    def _run() -> None:
+        converted = 0
+        try:
+            while True:
+                with db.session_scope() as session:
+                    done = EmbeddingRepository(session).migrate_text_vectors(batch_size)
+                if not done:
+                    break
+                converted += done
+                time.sleep(0.05)
+        except Exception as exc:
+            logger.warning(
+                "Embedding vector migration stopped after %s rows: %s", converted, exc
+            )
+            return
+        if converted:
+            logger.info("Converted %s embeddings to binary float32 storage", converted)
+
+    thread = threading.Thread(target=_run, daemon=True, name="EmbeddingVectorMigration")
+    thread.start()
+    return thread
+
+
+def _warm_up_runtime(
+    runtime: ModeRuntime, config: Config, db: Database, worker_control: WorkerControlService
+) -> None:
+    """Load models, the FAISS index and the worker, then report the outcome on ``runtime``.
+
+    ``ready`` only when vector search came up; ``degraded`` when loading
+    finished without it and ``failed`` (with the error) when it raised.
+    """
+    started = time.perf_counter()
+    try:
+        (
+            embedding_client,
+            thread_safe_faiss,
+            _reranker_client,
+            vector_provider,
+        ) = _build_embedding_stack(config, db)
+        _start_vector_migration(db)
+
+        runtime.thread_safe_faiss = thread_safe_faiss
+        runtime.operations_mode_adapter.attach(
+            embedding_client=embedding_client,
+            thread_safe_faiss=thread_safe_faiss,
+            vector_provider=vector_provider,
+        )
+        if runtime.search_service is not None:
+            runtime.search_service.attach_vector_provider(vector_provider)
+
+        runtime.background_worker, runtime.worker_pool = _build_worker_stack(
+            config, db, worker_control, embedding_client, thread_safe_faiss
+        )
+    except Exception as exc:
+        logger.error("✗ GPU runtime warm-up failed: %s", exc, exc_info=True)
+        runtime.mark_failed(f"Warm-up failed: {exc}")
+        return
+
+    if vector_provider is None:
+        logger.warning(
+            "GPU runtime started without vector search after %.1fs; using text search",
+            time.perf_counter() - started,
+        )
+        runtime.mark_failed(
+            "Vector search unavailable after warm-up; using text search", status="degraded"
+        )
+        return
+    runtime.mark_ready()
+    logger.info("GPU runtime ready after %.1fs", time.perf_counter() - started)
+
+
 def build_gpu_runtime(
     config: Config, db: Database, worker_control: WorkerControlService
 ) -> ModeRuntime:
-    """Build GPU-capable ModeRuntime using FAISS and background worker."""
-    (
-        embedding_client,
-        thread_safe_faiss,
-        reranker_client,
-        vector_provider,
-    ) = _build_embedding_stack(config, db)
-
-    # Decide primary provider based on vector availability
-    primary_provider = (
-        "vector_faiss"
-        if vector_provider is not None and vector_provider.is_available
-        else "sqlite_text"
-    )
-    logger.info("Determined primary provider: %s", primary_provider)
-
+    """Build GPU-capable ModeRuntime without waiting for the models to load.
+
+    The runtime starts out ``warming`` with SQLite text search as the primary
+    provider, so the API accepts requests right away. Models, the FAISS index
+    and the background worker load on a daemon thread; the vector provider is
+    attached to the search service when they are up and the runtime turns
+    ``ready``.
+    """
     search_service: Optional[SearchService]
     try:
         search_service = SearchService(
-            primary_provider=primary_provider,
+            primary_provider="sqlite_text",
             fallback_enabled=True,
             max_retries=getattr(config, "search_fallback_retries", 1),
-            vector_provider=vector_provider,
-        )
-        logger.info(
-            "✓ Search service initialized with primary provider: %s", primary_provider
+            vector_provider=None,
         )
+        logger.info("✓ Search service initialized; vector search loads in the background")
     except Exception as exc:
         logger.error(
             "✗ Search service initialization completely failed: %s", exc, exc_info=True
@@ -363,22 +493,21 @@ def build_gpu_runtime(
         logger.warning("Search service initialization failed: %s", exc)
         search_service = None
 
-    background_worker, worker_pool = _build_worker_stack(
-        config, db, worker_control, embedding_client, thread_safe_faiss
-    )
-
-    return ModeRuntime(
+    runtime = ModeRuntime(
         search_service=search_service,
-        thread_safe_faiss=thread_safe_faiss,
+        thread_safe_faiss=None,
         operations_mode_adapter=GpuOperationsModeAdapter(
-            embedding_client=embedding_client,
-            thread_safe_faiss=thread_safe_faiss,
-            vector_provider=vector_provider,
             session_factory=db.get_session,
             model_name=getattr(config, "embedding_model", None),
             skills_enabled=bool(getattr(config, "skills_enabled", True)),
         ),
         diagnostics_adapter=GpuDiagnosticsAdapter(),
-        background_worker=background_worker,
-        worker_pool=worker_pool,
+        status="warming",
     )
+    threading.Thread(
+        target=_warm_up_runtime,
+        args=(runtime, config, db, worker_control),
+        daemon=True,
+        name="GpuRuntimeWarmup",
+    ).start()
+    return runtime
@@ -14,6 +14,9 @@ from src.api.gpu.embedding_client import EmbeddingClient, EmbeddingClientError
 from src.common.interfaces.search import SearchProvider, SearchProviderError
 from src.common.interfaces.search_models import SearchResult, DuplicateCandidate, SearchReason
 from src.api.gpu.faiss_manager import FAISSIndexManager, FAISSIndexError
+from src.api.gpu.query_cache import QueryEmbeddingCache
+from src.api.gpu.rerank_policy import AdaptiveRerankPolicy
+from src.api.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -64,6 +67,8 @@ class VectorFAISSProvider(SearchProvider):
         reranker_client: Optional["RerankerClient"] = None,
         topk_retrieve: int = 100,
         topk_rerank: int = 40,
+        query_cache: Optional[QueryEmbeddingCache] = None,
+        rerank_policy: Optional[AdaptiveRerankPolicy] = None,
     ):
         self.index_manager = index_manager
         self.embedding_client = embedding_client
@@ -71,6 +76,29 @@ class VectorFAISSProvider(SearchProvider):
         self.reranker_client = reranker_client
         self.topk_retrieve = topk_retrieve
         self.topk_rerank = min(topk_rerank, topk_retrieve)
+        self.query_cache = query_cache if query_cache is not None else QueryEmbeddingCache()
+        # None reranks all ``topk_rerank`` candidates for every search.
+        self.rerank_policy = rerank_policy
+
+    def _encode_queries(self, search_phrases: List[str]) -> np.ndarray:
+        """Encode search phrases as a float32 matrix, reusing cached vectors.
+
+        Phrases missing from the cache are encoded together in one call.
+        """
+        model = self.embedding_client.vector_space
+        texts = [QueryEmbeddingCache.normalize(phrase) for phrase in search_phrases]
+        vectors: Dict[str, np.ndarray] = {}
+        for text in texts:
+            if text not in vectors:
+                cached = self.query_cache.get(model, text)
+                if cached is not None:
+                    vectors[text] = cached
+        missing = [text for text in dict.fromkeys(texts) if text not in vectors]
+        if missing:
+            encoded = self.embedding_client.encode(missing)
+            for text, vector in zip(missing, encoded):
+                vectors[text] = self.query_cache.put(model, text, vector)
+        return np.vstack([vectors[text] for text in texts]).astype(np.float32, copy=False)
 
     def search(
         self,
@@ -87,7 +115,7 @@ class VectorFAISSProvider(SearchProvider):
 
             # Step 1: FAISS with search phrase only
             try:
-                query_embedding = self.embedding_client.encode_single(search_phrase)
+                query_embedding = self._encode_queries([search_phrase])[0]
             except EmbeddingClientError as exc:
                 raise SearchProviderError(f"Failed to generate query embedding: {exc}") from exc
 
@@ -96,77 +124,164 @@ class VectorFAISSProvider(SearchProvider):
                     query_embedding=query_embedding,
                     top_k=self.topk_retrieve,
                     entity_type=entity_type,
+                    category_code=category_code,
                 )
             except FAISSIndexError as exc:
                 raise SearchProviderError(f"FAISS search failed: {exc}") from exc
 
-            if len(internal_ids) == 0:
-                return []
-
-            entity_mappings: List[Dict[str, object]] = []
-            for internal_id, score in zip(internal_ids, scores):
-                mapping = self.index_manager.get_entity_id(int(internal_id))
-                if mapping:
-                    entity_type = str(mapping.get("entity_type"))
-                    if entity_type == "manual":
-                        entity_type = "skill"
-                    if entity_type not in ("experience", "skill"):
-                        continue
-                    entity_mappings.append(
-                        {
-                            "entity_id": mapping["entity_id"],
-                            "entity_type": entity_type,
-                            "score": float(score),
-                        }
-                    )
+            return self._search_results(
+                session,
+                query,
+                search_phrase,
+                task_text,
+                scores,
+                internal_ids,
+                entity_type,
+                category_code,
+                top_k,
+            )
+        except SearchProviderError:
+            raise
+        except Exception as exc:
+            raise SearchProviderError(f"Vector search failed: {exc}") from exc
 
-            # Deduplicate by entity (FAISS can return multiple vectors per entry).
-            entity_mappings = self._dedup_by_entity(entity_mappings)
+    def search_batch(
+        self,
+        session: Session,
+        queries: List[str],
+        entity_type: Optional[str] = None,
+        category_code: Optional[str] = None,
+        top_k: int = 10,
+    ) -> List[List[SearchResult]]:
+        """Search several queries with at most one encode call and one FAISS search.
+
+        Results are returned in query order and match what :meth:`search`
+        returns for each query on its own.
+        """
+        if not queries:
+            return []
+        try:
+            parsed = [parse_two_step_query(query) for query in queries]
 
-            # Step 2: Reranking with full context
-            if self.reranker_client and len(entity_mappings) > 1:
-                entity_mappings = self._rerank_candidates(
-                    session,
-                    {"search": search_phrase, "task": task_text},
-                    entity_mappings[: self.topk_rerank],
+            try:
+                query_embeddings = self._encode_queries(
+                    [search_phrase for search_phrase, _ in parsed]
                 )
+            except EmbeddingClientError as exc:
+                raise SearchProviderError(f"Failed to generate query embeddings: {exc}") from exc
 
-            if category_code:
-                entity_mappings = self._filter_by_category(session, entity_mappings, category_code)
-
-            # Final dedup in case downstream steps reintroduced ties
-            entity_mappings = self._dedup_by_entity(entity_mappings)
-
-            entity_mappings = entity_mappings[:top_k]
+            try:
+                scores, internal_ids = self.index_manager.search_batch(
+                    query_embeddings,
+                    top_k=self.topk_retrieve,
+                    entity_type=entity_type,
+                    category_code=category_code,
+                )
+            except FAISSIndexError as exc:
+                raise SearchProviderError(f"FAISS search failed: {exc}") from exc
 
-            results: List[SearchResult] = []
-            for rank, mapping in enumerate(entity_mappings):
+            results: List[List[SearchResult]] = []
+            for row, (query, (search_phrase, task_text)) in enumerate(zip(queries, parsed)):
+                hits = internal_ids[row] >= 0
                 results.append(
-                    SearchResult(
-                        entity_id=str(mapping["entity_id"]),
-                        entity_type=str(mapping["entity_type"]),
-                        score=float(mapping["score"]),
-                        reason=SearchReason.SEMANTIC_MATCH,
-                        provider="vector_faiss",
-                        rank=rank,
+                    self._search_results(
+                        session,
+                        query,
+                        search_phrase,
+                        task_text,
+                        scores[row][hits],
+                        internal_ids[row][hits],
+                        entity_type,
+                        category_code,
+                        top_k,
                     )
                 )
-
-            logger.info(
-                "Vector search completed: original_query=%r, search_phrase=%r, entity_type=%s, category=%s, results=%s",
-                query,
-                search_phrase,
-                entity_type,
-                category_code,
-                len(results),
-            )
-
             return results
         except SearchProviderError:
             raise
         except Exception as exc:
             raise SearchProviderError(f"Vector search failed: {exc}") from exc
 
+    def _search_results(
+        self,
+        session: Session,
+        query: str,
+        search_phrase: str,
+        task_text: str,
+        scores: np.ndarray,
+        internal_ids: np.ndarray,
+        entity_type: Optional[str],
+        category_code: Optional[str],
+        top_k: int,
+    ) -> List[SearchResult]:
+        """Map FAISS hits to entities, filter, rerank and rank them."""
+        if len(internal_ids) == 0:
+            return []
+
+        entity_mappings: List[Dict[str, object]] = []
+        mappings = self.index_manager.get_entity_ids(internal_ids)
+        for mapping, score in zip(mappings, scores):
+            if mapping:
+                hit_type = str(mapping.get("entity_type"))
+                if hit_type == "manual":
+                    hit_type = "skill"
+                if hit_type not in ("experience", "skill"):
+                    continue
+                entity_mappings.append(
+                    {
+                        "entity_id": mapping["entity_id"],
+                        "entity_type": hit_type,
+                        "score": float(score),
+                    }
+                )
+
+        # Deduplicate by entity (FAISS can return multiple vectors per entry).
+        entity_mappings = self._dedup_by_entity(entity_mappings)
+
+        # FAISS already restricted hits to the category; confirm against the
+        # live rows (one query) before spending rerank compute on them.
+        if category_code:
+            entity_mappings = self._filter_by_category(session, entity_mappings, category_code)
+
+        # Step 2: Reranking with full context. A lone hit is reranked too so
+        # scores merged across entity types share the reranker scale.
+        if self.reranker_client and entity_mappings:
+            entity_mappings = self._rerank_candidates(
+                session,
+                {"search": search_phrase, "task": task_text},
+                entity_mappings[: self.topk_rerank],
+                top_k=top_k,
+            )
+
+        # Final dedup in case downstream steps reintroduced ties
+        entity_mappings = self._dedup_by_entity(entity_mappings)
+
+        entity_mappings = entity_mappings[:top_k]
+
+        results: List[SearchResult] = []
+        for rank, mapping in enumerate(entity_mappings):
+            results.append(
+                SearchResult(
+                    entity_id=str(mapping["entity_id"]),
+                    entity_type=str(mapping["entity_type"]),
+                    score=float(mapping["score"]),
+                    reason=SearchReason.SEMANTIC_MATCH,
+                    provider="vector_faiss",
+                    rank=rank,
+                )
+            )
+
+        logger.info(
+            "Vector search completed: original_query=%r, search_phrase=%r, entity_type=%s, category=%s, results=%s",
+            query,
+            search_phrase,
+            entity_type,
+            category_code,
+            len(results),
+        )
+
+        return results
+
     def find_duplicates(
         self,
         session: Session,
@@ -191,15 +306,16 @@ class VectorFAISSProvider(SearchProvider):
                     query_embedding=query_embedding,
                     top_k=self.topk_retrieve,
                     entity_type=entity_type,
+                    category_code=category_code,
                 )
             except FAISSIndexError as exc:
                 raise SearchProviderError(f"FAISS search failed: {exc}") from exc
 
             candidates: List[Dict[str, object]] = []
-            for internal_id, score in zip(internal_ids, scores):
+            mappings = self.index_manager.get_entity_ids(internal_ids)
+            for mapping, score in zip(mappings, scores):
                 if score < threshold:
                     continue
-                mapping = self.index_manager.get_entity_id(int(internal_id))
                 if not mapping:
                     continue
                 entity_type = str(mapping.get("entity_type"))
@@ -275,71 +391,70 @@ class VectorFAISSProvider(SearchProvider):
             raise SearchProviderError(f"Duplicate detection failed: {exc}") from exc
 
     def rebuild_index(self, session: Session) -> None:
-        """Rebuild FAISS index from embeddings table."""
-        try:
-            from src.common.storage.repository import EmbeddingRepository
-            from src.common.storage.schema import FAISSMetadata
+        """Rebuild FAISS index from embeddings table.
 
+        The index is rebuilt beside the live one and swapped in at the end,
+        so searches keep answering from the old index meanwhile.
+        """
+        try:
             logger.info("Starting FAISS index rebuild")
-
-            emb_repo = EmbeddingRepository(session)
-
-            session.query(FAISSMetadata).delete()
-            session.flush()
-
-            self.index_manager._create_new_index()
-
-            embeddings = emb_repo.get_all_by_model(self.model_name, entity_type=None)
-            if not embeddings:
-                logger.info("No embeddings found, index is empty")
-                self.index_manager.save()
-                return
-
-            entity_ids: List[str] = []
-            entity_types: List[str] = []
-            embedding_vectors: List[np.ndarray] = []
-
-            for emb in embeddings:
-                entity_ids.append(emb.entity_id)
-                entity_types.append(emb.entity_type)
-                embedding_vectors.append(emb_repo.to_numpy(emb))
-
-            embedding_array = np.vstack(embedding_vectors).astype(np.float32)
-
-            self.index_manager.add(entity_ids, entity_types, embedding_array)
-            self.index_manager.save()
-
-            logger.info(
-                "FAISS index rebuild completed: %s vectors indexed", len(entity_ids)
-            )
+            total = self.index_manager.rebuild()
+            logger.info("FAISS index rebuild completed: %s vectors indexed", total)
         except Exception as exc:
             raise SearchProviderError(f"Index rebuild failed: {exc}") from exc
 
+    def _candidate_texts(
+        self, session: Session, candidates: List[Dict[str, object]]
+    ) -> List[str]:
+        texts: List[str] = []
+        for candidate in candidates:
+            entity = self._fetch_entity(
+                session, candidate["entity_id"], candidate["entity_type"]
+            )
+            if entity:
+                if candidate["entity_type"] == "experience":
+                    text = f"{entity.title}\n\n{entity.playbook}"
+                else:
+                    text = f"{entity.name}\n\n{entity.description}\n\n{entity.content}"
+                texts.append(text)
+            else:
+                texts.append("")
+        return texts
+
     def _rerank_candidates(
         self,
         session: Session,
         query_parts: Dict[str, str],
         candidates: List[Dict[str, object]],
+        top_k: Optional[int] = None,
     ) -> List[Dict[str, object]]:
+        """Rerank candidates (in vector order) and sort them by reranker score.
+
+        With a ``rerank_policy`` and ``top_k``, only as many candidates as the
+        policy needs are reranked and returned (a skipped rerank still scores
+        the ``top_k`` head), so every returned score is a reranker score.
+        """
         if not self.reranker_client:
             return candidates
 
         try:
-            texts: List[str] = []
-            for candidate in candidates:
-                entity = self._fetch_entity(
-                    session, candidate["entity_id"], candidate["entity_type"]
+            if self.rerank_policy is None or top_k is None:
+                reranked_scores = self.reranker_client.rerank(
+                    query_parts, self._candidate_texts(session, candidates)
                 )
-                if entity:
-                    if candidate["entity_type"] == "experience":
-                        text = f"{entity.title}\n\n{entity.playbook}"
-                    else:
-                        text = f"{entity.name}\n\n{entity.description}\n\n{entity.content}"
-                    texts.append(text)
-                else:
-                    texts.append("")
-
-            reranked_scores = self.reranker_client.rerank(query_parts, texts)
+            else:
+                plan = self.rerank_policy.run(
+                    [float(candidate["score"]) for candidate in candidates],
+                    top_k,
+                    lambda start, end: self.reranker_client.rerank(
+                        query_parts, self._candidate_texts(session, candidates[start:end])
+                    ),
+                )
+                metrics.observe("search.rerank.depth", plan.depth)
+                if plan.skipped:
+                    metrics.increment("search.rerank.skipped")
+                reranked_scores = plan.scores
+                candidates = candidates[: plan.depth]
 
             for candidate, new_score in zip(candidates, reranked_scores):
                 candidate["score"] = new_score
@@ -419,14 +534,40 @@ class VectorFAISSProvider(SearchProvider):
         mappings: List[Dict[str, object]],
         category_code: str,
     ) -> List[Dict[str, object]]:
-        filtered: List[Dict[str, object]] = []
-        for mapping in mappings:
-            entity = self._fetch_entity(
-                session, mapping["entity_id"], mapping["entity_type"]
+        """Keep mappings whose entity currently belongs to ``category_code``."""
+        exp_ids = [str(m["entity_id"]) for m in mappings if m["entity_type"] == "experience"]
+        skill_ids = [str(m["entity_id"]) for m in mappings if m["entity_type"] != "experience"]
+        allowed: set[tuple[str, str]] = set()
+        try:
+            if exp_ids:
+                rows = (
+                    session.query(Experience.id)
+                    .filter(Experience.id.in_(exp_ids), Experience.category_code == category_code)
+                    .all()
+                )
+                allowed.update(("experience", row[0]) for row in rows)
+            if skill_ids:
+                rows = (
+                    session.query(CategorySkill.id)
+                    .filter(
+                        CategorySkill.id.in_(skill_ids),
+                        CategorySkill.category_code == category_code,
+                    )
+                    .all()
+                )
+                allowed.update(("skill", row[0]) for row in rows)
+        except Exception as exc:
+            logger.warning("Failed to verify category %s: %s", category_code, exc)
+            return []
+        return [
+            m
+            for m in mappings
+            if (
+                "experience" if m["entity_type"] == "experience" else "skill",
+                str(m["entity_id"]),
             )
-            if entity and getattr(entity, "category_code", None) == category_code:
-                filtered.append(mapping)
-        return filtered
+            in allowed
+        ]
 
     @staticmethod
     def _dedup_by_entity(mappings: List[Dict[str, object]]) -> List[Dict[str, object]]:
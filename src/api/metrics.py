@@ -11,6 +11,7 @@ class SimpleMetrics:
     def __init__(self):
         self._counters = defaultdict(int)
         self._histograms = defaultdict(list)
+        self._gauges = {}
         self._lock = threading.Lock()
 
     def increment(self, name: str, value: int = 1):
@@ -18,6 +19,11 @@ class SimpleMetrics:
         with self._lock:
             self._counters[name] += value
 
+    def set_gauge(self, name: str, value: float):
+        """Set a gauge metric to its current value."""
+        with self._lock:
+            self._gauges[name] = value
+
     def observe(self, name: str, value: float):
         """Observe a value for a histogram metric."""
         with self._lock:
@@ -31,6 +37,7 @@ class SimpleMetrics:
         with self._lock:
             return {
                 "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
                 "histograms": {
                     k: {
                         "count": len(v),
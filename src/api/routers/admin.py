@@ -33,6 +33,9 @@ def get_index_status(
     - rebuild_threshold: Threshold for automatic rebuild
     - model_name: Embedding model name
     - dimension: Vector dimension
+    - index_type: Live index kind (flat, hnsw, ivf) and configured target
+    - storage: Live vector coding (float32, sq8, pq) and configured target
+    - ann_report: Latest ANN recall@k / latency comparison against flat
     """
     # Get vector provider
     vector_provider = search_service.get_vector_provider()
@@ -63,13 +66,18 @@ def get_index_status(
 
         return {
             "status": "available",
-            "index_size": underlying_manager.index.ntotal,
+            "index_size": underlying_manager.ntotal,
             "tombstone_ratio": round(tombstone_ratio, 4),
             "needs_rebuild": needs_rebuild,
             "save_policy": config.faiss_save_policy,
             "rebuild_threshold": config.faiss_rebuild_threshold,
             "model_name": underlying_manager.model_name,
             "dimension": underlying_manager.dimension,
+            "index_type": faiss_manager.index_kind(),
+            "target_index_type": config.faiss_index_type,
+            "storage": underlying_manager.storage,
+            "target_storage": config.faiss_storage,
+            "ann_report": underlying_manager.ann_report,
         }
 
     except Exception as e:
@@ -113,7 +121,7 @@ def trigger_rebuild(
 
         # Trigger rebuild
         logger.info("Manual index rebuild triggered via admin endpoint")
-        faiss_manager._rebuild_index()
+        faiss_manager.compact()
 
         # Get new index size
         underlying_manager = getattr(faiss_manager, '_manager', faiss_manager)
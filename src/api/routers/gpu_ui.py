@@ -427,6 +427,7 @@ async def post_model_change(
     telemetry_service=Depends(get_telemetry_service),
     operations_service=Depends(get_operations_service),
     worker_control=Depends(get_worker_control_service),
+    search_service=Depends(get_search_service),
 ):
     actor = _actor_from_request(request)
 
@@ -483,6 +484,12 @@ async def post_model_change(
         )
         session.commit()
 
+        # Cached query vectors belong to the outgoing embedding model.
+        vector_provider = search_service.get_vector_provider() if search_service else None
+        query_cache = getattr(vector_provider, "query_cache", None)
+        if query_cache is not None:
+            query_cache.clear()
+
         try:
             operations_service.trigger(job_type="reembed", payload=model_selection_data, actor=actor)
             message = (
@@ -1170,8 +1177,9 @@ async def restore_settings_backup(
 def download_index_snapshot(
     background_tasks: BackgroundTasks,
     config=Depends(get_config),
+    search_service=Depends(get_search_service),
 ):
-    archive_path = _create_index_archive(config)
+    archive_path = _create_index_archive(config, search_service)
     filename = f"chl-faiss-snapshot-{int(time.time())}.zip"
 
     def _cleanup(path: str):
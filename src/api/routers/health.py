@@ -30,6 +30,12 @@ def health_check(
     - degraded: Non-critical components failing (e.g., FAISS unavailable, falling back to text search)
     - unhealthy: Critical components failing (database, embedding model)
 
+    components.runtime.status is "warming" while GPU mode loads models and the
+    FAISS index in the background and "ready" once vector search is wired in.
+    A warm-up that ended without vector search reports "degraded", one that
+    raised reports "failed"; the detail carries the error. The overall status
+    is degraded in every state but "ready".
+
     Returns 200 for healthy/degraded, 503 for unhealthy.
     """
     components = {}
@@ -45,6 +51,20 @@ def health_check(
         components["database"] = {"status": "unhealthy", "detail": str(e)}
         overall_status = "unhealthy"
 
+    # Runtime readiness: GPU mode serves CRUD and text search while models load
+    runtime_status = getattr(mode_runtime, "status", "ready") if mode_runtime else "ready"
+    runtime_error = getattr(mode_runtime, "error", None) if mode_runtime else None
+    warming = runtime_status == "warming"
+    if warming:
+        runtime_detail = "Loading models and FAISS index; text search in use meanwhile"
+    elif runtime_status == "ready":
+        runtime_detail = "Startup complete"
+    else:
+        runtime_detail = runtime_error or "Startup incomplete; text search in use"
+    components["runtime"] = {"status": runtime_status, "detail": runtime_detail}
+    if runtime_status != "ready" and overall_status == "healthy":
+        overall_status = "degraded"
+
     semantic_enabled = True
     if config and hasattr(config, "is_semantic_enabled"):
         try:
@@ -105,8 +125,12 @@ def health_check(
             }
         else:
             components["embedding_model"] = {
-                "status": "degraded",
-                "detail": "Vector provider unavailable; falling back to SQLite",
+                "status": "warming" if warming else "degraded",
+                "detail": (
+                    "Model loading in the background; using SQLite meanwhile"
+                    if warming
+                    else "Vector provider unavailable; falling back to SQLite"
+                ),
             }
             if overall_status == "healthy":
                 overall_status = "degraded"
@@ -735,11 +735,28 @@ def _index_dir(config) -> Optional[Path]:
     return Path(path)
 
 
-def _create_index_archive(config) -> Path:
+def _checkpoint_index(search_service) -> None:
+    """Write the live index so the snapshot includes writes still only in the WAL."""
+    try:
+        vector_provider = search_service.get_vector_provider() if search_service else None
+    except Exception:  # pragma: no cover
+        return
+    manager = getattr(vector_provider, "index_manager", None) if vector_provider else None
+    if not manager:
+        return
+    try:
+        manager.save()
+    except Exception as exc:  # pragma: no cover
+        logger.warning("Failed to checkpoint FAISS index before snapshot: %s", exc)
+
+
+def _create_index_archive(config, search_service=None) -> Path:
     index_dir = _index_dir(config)
     if not index_dir or not index_dir.exists():
         raise IndexUploadError("FAISS index directory not found.")
 
+    _checkpoint_index(search_service)
+
     tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".zip")
     tmp.close()
     archive_path = Path(tmp.name)
@@ -797,8 +814,7 @@ def _reload_index_from_disk(search_service) -> bool:
     lock = getattr(manager, "_lock", None)
 
     def _reload():
-        underlying._index = None
-        underlying._load_or_create_index()
+        underlying.reload()
 
     try:
         if lock:
@@ -122,9 +122,14 @@ async def lifespan(app: FastAPI):
         except Exception as exc:
             logger.warning("Failed to attach mode adapter to OperationsService: %s", exc)
 
-        # Expose background worker / pool for telemetry if available
-        app.state.background_worker = getattr(app.state.mode_runtime, "background_worker", None)
-        app.state.worker_pool = getattr(app.state.mode_runtime, "worker_pool", None)
+        # Expose background worker / pool for telemetry if available. GPU mode
+        # loads them in the background, so refresh once the runtime is ready.
+        def _expose_runtime(runtime):
+            app.state.thread_safe_faiss = runtime.thread_safe_faiss
+            app.state.background_worker = getattr(runtime, "background_worker", None)
+            app.state.worker_pool = getattr(runtime, "worker_pool", None)
+
+        app.state.mode_runtime.when_ready(_expose_runtime)
 
         def get_queue_depth():
             with app.state.db.session_scope() as session:
@@ -432,6 +432,9 @@ class WorkerPool:
             'last_run': stats['last_run'],
             'last_batch_size': stats['last_batch_size'],
         }
+        throughput = getattr(self.worker.embedding_client, 'throughput_stats', None)
+        if throughput is not None:
+            worker_obj.update(throughput())
 
         return {
             'active_workers': 1 if stats['is_running'] and not stats['is_paused'] else 0,
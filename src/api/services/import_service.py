@@ -95,13 +95,13 @@ class ImportService:
             self.faiss_index_dir.mkdir(parents=True, exist_ok=True)
             logger.info("FAISS index directory cleared and recreated")
 
-        # Clear existing data
-        logger.info("Clearing existing categories, experiences, skills, and embeddings")
+        # Clear existing data. Embedding rows are kept: their content hashes let
+        # unchanged entries reuse the stored vector instead of being re-encoded.
+        logger.info("Clearing existing categories, experiences, and skills")
         from sqlalchemy import text
 
         try:
             # Use raw deletes to avoid ORM state sync and FK ordering issues.
-            session.execute(text("DELETE FROM embeddings"))
             session.execute(text("DELETE FROM faiss_metadata"))
             session.execute(text("DELETE FROM experiences"))
             if skills_enabled:
@@ -112,7 +112,6 @@ class ImportService:
             # Retry with FK checks temporarily disabled if SQLite is enforcing aggressively.
             session.rollback()
             session.execute(text("PRAGMA foreign_keys=OFF"))
-            session.execute(text("DELETE FROM embeddings"))
             session.execute(text("DELETE FROM faiss_metadata"))
             session.execute(text("DELETE FROM experiences"))
             if skills_enabled:
@@ -199,6 +198,17 @@ class ImportService:
                 session.add(skill)
                 skills_count += 1
 
+        # Drop embeddings whose entity did not come back with this import
+        session.flush()
+        orphaned = session.execute(
+            text(
+                "DELETE FROM embeddings WHERE entity_id NOT IN ("
+                "SELECT id FROM experiences UNION SELECT id FROM category_skills)"
+            )
+        ).rowcount
+        if orphaned:
+            logger.info("Removed %d embeddings for entities no longer present", orphaned)
+
         session.commit()
 
         logger.info(
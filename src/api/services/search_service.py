@@ -90,6 +90,18 @@ class SearchService:
             self._providers["vector_faiss"] = vector_provider
             logger.info("Vector FAISS provider registered and available")
 
+    def attach_vector_provider(self, vector_provider: Optional[SearchProvider]) -> None:
+        """Register a vector provider that finished loading after startup.
+
+        Searches switch from SQLite text search to it once it is available.
+        """
+        if not vector_provider or not vector_provider.is_available:
+            logger.info("Vector provider unavailable; staying on %s", self.primary_provider_name)
+            return
+        self._providers["vector_faiss"] = vector_provider
+        self.primary_provider_name = "vector_faiss"
+        logger.info("Vector FAISS provider attached; primary provider is now vector_faiss")
+
     def get_vector_provider(self) -> Optional[SearchProvider]:
         """Return the registered vector provider if available."""
         provider = self._providers.get("vector_faiss")
@@ -33,6 +33,12 @@ Search & retrieval:
 - CHL_BACKEND: Optional override for runtime backend (not recommended - use scripts/setup/check_api_env.py instead)
 - CHL_SEARCH_TIMEOUT_MS: Query timeout in milliseconds (default: 5000)
 - CHL_SEARCH_FALLBACK_RETRIES: Retries before fallback (default: 1)
+- CHL_INFERENCE_BATCH_WAIT_MS: How long concurrent searches wait to share one model forward pass (default: 5, 0 disables)
+- CHL_INFERENCE_MAX_BATCH: Most texts / reranker pairs merged into one shared pass (default: 32)
+- CHL_QUERY_CACHE_SIZE: Query embeddings kept in the in-memory LRU (default: 1024, 0 disables)
+- CHL_RERANK_CACHE_SIZE: Reranker scores kept in the in-memory LRU (default: 4096, 0 disables)
+- CHL_RERANK_CACHE_PATH: SQLite file persisting reranker scores (default: <experience_root>/rerank_cache.db; "off" keeps scores in memory only)
+  - Keys hash the document text, so edited entries are re-scored automatically
 
 Model selection (GGUF quantized):
 - CHL_EMBEDDING_REPO: Advanced override for embedding repo (defaults to selection recorded by `scripts/setup/setup-gpu.py`)
@@ -46,12 +52,28 @@ GPU Acceleration (Optional - Smart defaults based on backend):
   - 0 = CPU-only inference (automatic for cpu backend)
   - N = specific number of layers (for limited VRAM)
 - CHL_RERANKER_N_GPU_LAYERS: Same as above for reranker model (default: -1 for GPU backends, 0 for CPU)
+- CHL_INFERENCE_RUNTIME: Runtime for the embedding and reranker models (default: torch)
+  - torch = HF Transformers (fp16 on CUDA/MPS, fp32 on CPU)
+  - onnx = int8 dynamic-quantized ONNX Runtime on CPU (needs `pip install "optimum[onnxruntime]"`)
+  - auto = onnx when no CUDA/MPS device is present and onnxruntime is installed, else torch
+  - int8 vectors differ from torch ones: re-embed existing entries after switching
+- CHL_ONNX_THREADS: Intra-op threads for ONNX Runtime sessions (default: 0 = all cores)
+- CHL_ONNX_CACHE_DIR: Where exported int8 ONNX models are kept (default: <experience_root>/onnx_models)
+- CHL_EMBEDDING_BATCH_TOKENS: Padded-token budget per embedding forward pass (default: 16384, min: 512)
+  - Texts are grouped by token length, so short texts share large batches and long ones small batches
+- CHL_RERANKER_BATCH_TOKENS: Padded-token budget per reranker forward pass (default: 8192, min: 512)
+- CHL_RERANKER_MAX_SEQ_LEN: Token budget per reranker prompt; longer documents keep head + tail tokens (default: 1024, min: 256)
+- CHL_RERANKER_PREFIX_CACHE: Reuse the KV cache of the shared reranker prompt prefix (default: true, torch runtime only)
 
 Thresholds:
 - CHL_DUPLICATE_THRESHOLD_UPDATE: Similarity threshold for updates (default: 0.85, range: 0.0-1.0)
 - CHL_DUPLICATE_THRESHOLD_INSERT: Similarity threshold for inserts (default: 0.60, range: 0.0-1.0)
 - CHL_TOPK_RETRIEVE: FAISS candidates (default: 100)
 - CHL_TOPK_RERANK: Reranker candidates (default: 40)
+- CHL_RERANK_ADAPTIVE: Rerank only as deep as each search needs (default: true; false reranks CHL_TOPK_RERANK always)
+- CHL_RERANK_DOMINANCE_MARGIN: Skip reranking when the top vector score leads the runner-up by this much (default: 0.2, 0 never skips)
+- CHL_RERANK_TIER_SIZE: Candidates reranked per tier; stops once a tier leaves the best top_k unchanged (default: 8)
+- CHL_RERANK_DEPTH_FACTOR: Rerank at most this many times the requested top_k (default: 3)
 
 API Client:
 - CHL_API_BASE_URL: API server base URL (default: http://localhost:8000)
@@ -68,6 +90,28 @@ FAISS Persistence:
 - CHL_FAISS_SAVE_INTERVAL: Save interval in seconds for periodic mode (default: 300)
 - CHL_FAISS_REBUILD_THRESHOLD: Tombstone ratio threshold for automatic rebuild (default: 0.10)
 
+FAISS index type:
+- CHL_FAISS_INDEX_TYPE: Target index (default: hnsw; options: flat, hnsw, ivf)
+  - flat: exact brute-force search at any size
+  - hnsw/ivf: stay flat until CHL_FAISS_ANN_THRESHOLD vectors, then train and switch in the background
+- CHL_FAISS_ANN_THRESHOLD: Vector count at which the ANN index replaces flat (default: 50000)
+- CHL_FAISS_ANN_MIN_RECALL: Minimum recall@10 vs flat required before switching (default: 0.90)
+- CHL_FAISS_HNSW_M: HNSW graph degree (default: 32)
+- CHL_FAISS_HNSW_EF_CONSTRUCTION: HNSW build-time beam width (default: 80)
+- CHL_FAISS_HNSW_EF_SEARCH: HNSW query-time beam width (default: 64)
+- CHL_FAISS_IVF_NLIST: IVF centroid count (default: 0 = 4*sqrt(ntotal))
+- CHL_FAISS_IVF_NPROBE: IVF lists probed per query (default: 16)
+- CHL_FAISS_STORAGE: Vector coding (default: float32; options: float32, sq8, pq)
+  - sq8/pq: quantize once enough vectors exist to train (1000 / 9984)
+- CHL_FAISS_PQ_M: PQ sub-quantizers, must divide the dimension (default: 0 = dimension/4)
+- CHL_FAISS_RESCORE_FACTOR: Shortlist multiplier re-scored against float32 embeddings
+  for sq8/pq indexes (default: 4; 0 disables re-scoring)
+- CHL_FAISS_MMAP: Map the index file read-only instead of reading it into memory;
+  new vectors go to an in-memory overlay until the next save (default: false)
+- CHL_FAISS_WAL: Log adds/removes to an append-only WAL and checkpoint the index in the
+  background instead of rewriting it per add; replayed on startup (default: true)
+- CHL_FAISS_WAL_CHECKPOINT_MB: WAL size that triggers an early checkpoint (default: 64)
+
 Note: Author is automatically populated from the OS username during core setup.
 """
 from __future__ import annotations
@@ -199,6 +243,10 @@ class Config:
 
         self.search_timeout_ms = int(os.getenv("CHL_SEARCH_TIMEOUT_MS", "5000"))
         self.search_fallback_retries = int(os.getenv("CHL_SEARCH_FALLBACK_RETRIES", "1"))
+        self.query_cache_size = int(os.getenv("CHL_QUERY_CACHE_SIZE", "1024"))
+        self.rerank_cache_size = int(os.getenv("CHL_RERANK_CACHE_SIZE", "4096"))
+        self.inference_batch_wait_ms = float(os.getenv("CHL_INFERENCE_BATCH_WAIT_MS", "5"))
+        self.inference_max_batch = int(os.getenv("CHL_INFERENCE_MAX_BATCH", "32"))
 
         # Model settings (GGUF models)
         model_selection = load_model_selection()
@@ -223,12 +271,22 @@ class Config:
         default_gpu_layers = "-1" if self.backend != "cpu" else "0"
         self.embedding_n_gpu_layers = int(os.getenv("CHL_EMBEDDING_N_GPU_LAYERS", default_gpu_layers))
         self.reranker_n_gpu_layers = int(os.getenv("CHL_RERANKER_N_GPU_LAYERS", default_gpu_layers))
+        self.embedding_batch_tokens = int(os.getenv("CHL_EMBEDDING_BATCH_TOKENS", "16384"))
+        self.reranker_batch_tokens = int(os.getenv("CHL_RERANKER_BATCH_TOKENS", "8192"))
+        self.reranker_max_seq_len = int(os.getenv("CHL_RERANKER_MAX_SEQ_LEN", "1024"))
+        self.reranker_prefix_cache = os.getenv("CHL_RERANKER_PREFIX_CACHE", "true").lower() == "true"
+        self.inference_runtime = os.getenv("CHL_INFERENCE_RUNTIME", "torch").lower()
+        self.onnx_threads = int(os.getenv("CHL_ONNX_THREADS", "0"))
 
         # Threshold settings
         self.duplicate_threshold_update = float(os.getenv("CHL_DUPLICATE_THRESHOLD_UPDATE", "0.85"))
         self.duplicate_threshold_insert = float(os.getenv("CHL_DUPLICATE_THRESHOLD_INSERT", "0.60"))
         self.topk_retrieve = int(os.getenv("CHL_TOPK_RETRIEVE", "100"))
         self.topk_rerank = int(os.getenv("CHL_TOPK_RERANK", "40"))
+        self.rerank_adaptive = os.getenv("CHL_RERANK_ADAPTIVE", "true").lower() == "true"
+        self.rerank_dominance_margin = float(os.getenv("CHL_RERANK_DOMINANCE_MARGIN", "0.2"))
+        self.rerank_tier_size = int(os.getenv("CHL_RERANK_TIER_SIZE", "8"))
+        self.rerank_depth_factor = int(os.getenv("CHL_RERANK_DEPTH_FACTOR", "3"))
 
         # Path settings (default under experience_root; resolve relative paths under experience_root)
         faiss_env = os.getenv("CHL_FAISS_INDEX_PATH")
@@ -240,6 +298,26 @@ class Config:
             faiss_path = Path(self.experience_root) / "faiss_index"
         self.faiss_index_path = str(faiss_path)
 
+        onnx_env = os.getenv("CHL_ONNX_CACHE_DIR")
+        if onnx_env:
+            onnx_path = Path(onnx_env)
+            if not onnx_path.is_absolute():
+                onnx_path = Path(self.experience_root) / onnx_path
+        else:
+            onnx_path = Path(self.experience_root) / "onnx_models"
+        self.onnx_cache_dir = str(onnx_path)
+
+        rerank_cache_env = os.getenv("CHL_RERANK_CACHE_PATH")
+        if rerank_cache_env and rerank_cache_env.lower() == "off":
+            self.rerank_cache_path = None
+        elif rerank_cache_env:
+            rerank_cache_path = Path(rerank_cache_env)
+            if not rerank_cache_path.is_absolute():
+                rerank_cache_path = Path(self.experience_root) / rerank_cache_path
+            self.rerank_cache_path = str(rerank_cache_path)
+        else:
+            self.rerank_cache_path = str(Path(self.experience_root) / "rerank_cache.db")
+
         # API client configuration
         self.api_base_url = os.getenv("CHL_API_BASE_URL", "http://localhost:8000")
         self.api_timeout = float(os.getenv("CHL_API_TIMEOUT", "30.0"))
@@ -256,6 +334,22 @@ class Config:
         self.faiss_save_interval = int(os.getenv("CHL_FAISS_SAVE_INTERVAL", "300"))
         self.faiss_rebuild_threshold = float(os.getenv("CHL_FAISS_REBUILD_THRESHOLD", "0.10"))
 
+        # FAISS index type and ANN tuning
+        self.faiss_index_type = os.getenv("CHL_FAISS_INDEX_TYPE", "hnsw").lower()
+        self.faiss_ann_threshold = int(os.getenv("CHL_FAISS_ANN_THRESHOLD", "50000"))
+        self.faiss_ann_min_recall = float(os.getenv("CHL_FAISS_ANN_MIN_RECALL", "0.90"))
+        self.faiss_hnsw_m = int(os.getenv("CHL_FAISS_HNSW_M", "32"))
+        self.faiss_hnsw_ef_construction = int(os.getenv("CHL_FAISS_HNSW_EF_CONSTRUCTION", "80"))
+        self.faiss_hnsw_ef_search = int(os.getenv("CHL_FAISS_HNSW_EF_SEARCH", "64"))
+        self.faiss_ivf_nlist = int(os.getenv("CHL_FAISS_IVF_NLIST", "0"))
+        self.faiss_ivf_nprobe = int(os.getenv("CHL_FAISS_IVF_NPROBE", "16"))
+        self.faiss_storage = os.getenv("CHL_FAISS_STORAGE", "float32").lower()
+        self.faiss_pq_m = int(os.getenv("CHL_FAISS_PQ_M", "0"))
+        self.faiss_rescore_factor = int(os.getenv("CHL_FAISS_RESCORE_FACTOR", "4"))
+        self.faiss_mmap = os.getenv("CHL_FAISS_MMAP", "false").lower() == "true"
+        self.faiss_wal = os.getenv("CHL_FAISS_WAL", "true").lower() == "true"
+        self.faiss_wal_checkpoint_mb = int(os.getenv("CHL_FAISS_WAL_CHECKPOINT_MB", "64"))
+
         # Validate configuration
         self._validate_paths()
         self._validate_search_config()
@@ -373,6 +467,22 @@ class Config:
             raise ValueError(
                 f"Invalid CHL_SEARCH_FALLBACK_RETRIES={self.search_fallback_retries}. Must be >= 0."
             )
+        if self.query_cache_size < 0:
+            raise ValueError(
+                f"Invalid CHL_QUERY_CACHE_SIZE={self.query_cache_size}. Must be >= 0."
+            )
+        if self.rerank_cache_size < 0:
+            raise ValueError(
+                f"Invalid CHL_RERANK_CACHE_SIZE={self.rerank_cache_size}. Must be >= 0."
+            )
+        if self.inference_batch_wait_ms < 0:
+            raise ValueError(
+                f"Invalid CHL_INFERENCE_BATCH_WAIT_MS={self.inference_batch_wait_ms}. Must be >= 0."
+            )
+        if self.inference_max_batch <= 0:
+            raise ValueError(
+                f"Invalid CHL_INFERENCE_MAX_BATCH={self.inference_max_batch}. Must be > 0."
+            )
 
         if self.topk_retrieve <= 0:
             raise ValueError(
@@ -383,6 +493,18 @@ class Config:
             raise ValueError(
                 f"Invalid CHL_TOPK_RERANK={self.topk_rerank}. Must be > 0."
             )
+        if self.rerank_dominance_margin < 0:
+            raise ValueError(
+                f"Invalid CHL_RERANK_DOMINANCE_MARGIN={self.rerank_dominance_margin}. Must be >= 0."
+            )
+        if self.rerank_tier_size <= 0:
+            raise ValueError(
+                f"Invalid CHL_RERANK_TIER_SIZE={self.rerank_tier_size}. Must be > 0."
+            )
+        if self.rerank_depth_factor <= 0:
+            raise ValueError(
+                f"Invalid CHL_RERANK_DEPTH_FACTOR={self.rerank_depth_factor}. Must be > 0."
+            )
 
         # Basic sanity check for GPU layer settings (allow -1 for "all layers").
         if self.embedding_n_gpu_layers < -1:
@@ -395,6 +517,25 @@ class Config:
                 f"Invalid CHL_RERANKER_N_GPU_LAYERS={self.reranker_n_gpu_layers}. "
                 f"Must be -1 (all layers) or >= 0."
             )
+        if self.embedding_batch_tokens < 512:
+            raise ValueError(
+                f"Invalid CHL_EMBEDDING_BATCH_TOKENS={self.embedding_batch_tokens}. Must be >= 512."
+            )
+        if self.reranker_batch_tokens < 512:
+            raise ValueError(
+                f"Invalid CHL_RERANKER_BATCH_TOKENS={self.reranker_batch_tokens}. Must be >= 512."
+            )
+        if self.reranker_max_seq_len < 256:
+            raise ValueError(
+                f"Invalid CHL_RERANKER_MAX_SEQ_LEN={self.reranker_max_seq_len}. Must be >= 256."
+            )
+        if self.inference_runtime not in ("auto", "torch", "onnx"):
+            raise ValueError(
+                f"Invalid CHL_INFERENCE_RUNTIME='{self.inference_runtime}'. "
+                f"Must be one of: auto, torch, onnx."
+            )
+        if self.onnx_threads < 0:
+            raise ValueError(f"Invalid CHL_ONNX_THREADS={self.onnx_threads}. Must be >= 0.")
 
         # Create FAISS index directory if it doesn't exist (skip in CPU mode)
         if self.backend != "cpu":
@@ -431,6 +572,53 @@ class Config:
                 f"Must be in range [0.0, 1.0]."
             )
 
+        valid_index_types = ("flat", "hnsw", "ivf")
+        if self.faiss_index_type not in valid_index_types:
+            raise ValueError(
+                f"Invalid CHL_FAISS_INDEX_TYPE='{self.faiss_index_type}'. "
+                f"Must be one of: {', '.join(valid_index_types)}"
+            )
+
+        if self.faiss_ann_threshold < 0:
+            raise ValueError(
+                f"Invalid CHL_FAISS_ANN_THRESHOLD={self.faiss_ann_threshold}. Must be >= 0."
+            )
+
+        if not (0.0 <= self.faiss_ann_min_recall <= 1.0):
+            raise ValueError(
+                f"Invalid CHL_FAISS_ANN_MIN_RECALL={self.faiss_ann_min_recall}. "
+                f"Must be in range [0.0, 1.0]."
+            )
+
+        for label, value in (
+            ("CHL_FAISS_HNSW_M", self.faiss_hnsw_m),
+            ("CHL_FAISS_HNSW_EF_CONSTRUCTION", self.faiss_hnsw_ef_construction),
+            ("CHL_FAISS_HNSW_EF_SEARCH", self.faiss_hnsw_ef_search),
+            ("CHL_FAISS_IVF_NPROBE", self.faiss_ivf_nprobe),
+        ):
+            if value <= 0:
+                raise ValueError(f"Invalid {label}={value}. Must be > 0.")
+
+        if self.faiss_ivf_nlist < 0:
+            raise ValueError(
+                f"Invalid CHL_FAISS_IVF_NLIST={self.faiss_ivf_nlist}. Must be >= 0 (0 = auto)."
+            )
+
+        valid_storage = ("float32", "sq8", "pq")
+        if self.faiss_storage not in valid_storage:
+            raise ValueError(
+                f"Invalid CHL_FAISS_STORAGE='{self.faiss_storage}'. "
+                f"Must be one of: {', '.join(valid_storage)}"
+            )
+
+        for label, value in (
+            ("CHL_FAISS_PQ_M", self.faiss_pq_m),
+            ("CHL_FAISS_RESCORE_FACTOR", self.faiss_rescore_factor),
+            ("CHL_FAISS_WAL_CHECKPOINT_MB", self.faiss_wal_checkpoint_mb),
+        ):
+            if value < 0:
+                raise ValueError(f"Invalid {label}={value}. Must be >= 0.")
+
     # ========================================================================
     # Computed Properties - Single Source of Truth for Model Names
     # ========================================================================
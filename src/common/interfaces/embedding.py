@@ -13,6 +13,9 @@ class EmbeddingProvider(Protocol):
 
     def get_model_version(self) -> str: ...
 
+    @property
+    def vector_space(self) -> str: ...
+
     def encode(self, texts: List[str]) -> List[List[float]]: ...
 
     def encode_single(self, text: str) -> List[float]: ...
@@ -2,9 +2,10 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+import threading
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, Optional, Protocol
+from typing import Any, Callable, Dict, List, Optional, Protocol
 
 
 class OperationsModeAdapter(Protocol):
@@ -21,7 +22,13 @@ class DiagnosticsModeAdapter(Protocol):
 
 @dataclass
 class ModeRuntime:
-    """Container for mode-specific runtime components."""
+    """Container for mode-specific runtime components.
+
+    ``status`` is ``"warming"`` while models and the FAISS index load in the
+    background (GPU mode) and ``"ready"`` once loading has succeeded. A
+    warm-up that finished without vector search is ``"degraded"`` and one
+    that raised is ``"failed"``; ``error`` then says why.
+    """
 
     search_service: Optional[Any]
     thread_safe_faiss: Optional[Any]
@@ -29,3 +36,39 @@ class ModeRuntime:
     diagnostics_adapter: Optional[DiagnosticsModeAdapter] = None
     background_worker: Optional[Any] = None
     worker_pool: Optional[Any] = None
+    status: str = "ready"
+    error: Optional[str] = None
+    _ready_callbacks: List[Callable[["ModeRuntime"], None]] = field(
+        default_factory=list, repr=False
+    )
+    _ready_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def is_ready(self) -> bool:
+        return self.status == "ready"
+
+    def when_ready(self, callback: Callable[["ModeRuntime"], None]) -> None:
+        """Run ``callback(runtime)`` once loading has finished, successfully or not.
+
+        Runs now if loading is already over; callers check ``status`` for the outcome.
+        """
+        with self._ready_lock:
+            if self.status == "warming":
+                self._ready_callbacks.append(callback)
+                return
+        callback(self)
+
+    def mark_ready(self) -> None:
+        self._finish("ready", None)
+
+    def mark_failed(self, error: str, status: str = "failed") -> None:
+        """End warm-up without full readiness (``"failed"`` or ``"degraded"``)."""
+        self._finish(status, error)
+
+    def _finish(self, status: str, error: Optional[str]) -> None:
+        with self._ready_lock:
+            self.status = status
+            self.error = error
+            callbacks, self._ready_callbacks = self._ready_callbacks, []
+        for callback in callbacks:
+            callback(self)
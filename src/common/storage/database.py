@@ -1,5 +1,6 @@
 """Database connection and session management for CHL (shared)."""
 
+import logging
 from pathlib import Path
 from contextlib import contextmanager
 from sqlalchemy import create_engine, event, text
@@ -9,6 +10,7 @@ from sqlalchemy.pool import NullPool
 
 from .schema import Base
 
+logger = logging.getLogger(__name__)
 
 class Database:
     """Database connection manager."""
@@ -154,6 +156,13 @@ class Database:
             ).fetchone()
             return row is not None
 
+        def _has_index(conn, index: str) -> bool:
+            row = conn.execute(
+                text("SELECT name FROM sqlite_master WHERE type='index' AND name=:name"),
+                {"name": index},
+            ).fetchone()
+            return row is not None
+
         with self.engine.begin() as conn:
             def _add_column(table: str, column: str, ddl: str, fill_sql: str | None = None):
                 conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
@@ -229,6 +238,43 @@ class Database:
                     "UPDATE telemetry_samples SET recorded_at = created_at WHERE recorded_at IS NULL",
                 )
 
+            # Embeddings: binary float32 vectors (text rows are converted in the background)
+            if not _has_column(conn, "embeddings", "vector_blob"):
+                _add_column("embeddings", "vector_blob", "BLOB")
+            if not _has_column(conn, "embeddings", "vector_dtype"):
+                _add_column("embeddings", "vector_dtype", "TEXT")
+            if not _has_column(conn, "embeddings", "vector_dim"):
+                _add_column("embeddings", "vector_dim", "INTEGER")
+
+            # Embeddings: content hash so unchanged text reuses its stored vector
+            if not _has_column(conn, "embeddings", "content_hash"):
+                _add_column("embeddings", "content_hash", "TEXT")
+            if not _has_index(conn, "ix_embeddings_content_hash"):
+                conn.execute(
+                    text(
+                        "CREATE INDEX ix_embeddings_content_hash "
+                        "ON embeddings(content_hash)"
+                    )
+                )
+
+            # Embeddings: keep only the newest row per entity and model, then enforce it
+            if not _has_index(conn, "uq_embeddings_entity_model"):
+                removed = conn.execute(
+                    text(
+                        "DELETE FROM embeddings WHERE id NOT IN ("
+                        "SELECT MAX(id) FROM embeddings "
+                        "GROUP BY entity_id, entity_type, model_version)"
+                    )
+                ).rowcount
+                if removed:
+                    logger.info("Removed %s superseded embedding rows", removed)
+                conn.execute(
+                    text(
+                        "CREATE UNIQUE INDEX uq_embeddings_entity_model "
+                        "ON embeddings(entity_id, entity_type, model_version)"
+                    )
+                )
+
             # Experience split provenance table
             if not _has_table(conn, "experience_split_provenance"):
                 conn.execute(
@@ -2,12 +2,14 @@
 
 import os
 import getpass
+import hashlib
 import json
 from datetime import datetime, timezone
-from typing import List, Optional
+from typing import Dict, Iterator, List, NamedTuple, Optional
 
 import numpy as np
-from sqlalchemy import func
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
 from .schema import (
@@ -316,8 +318,24 @@ class CategorySkillRepository:
         return json.dumps({"value": value}, ensure_ascii=False)
 
 
+class EmbeddingChunk(NamedTuple):
+    """One block of embedding rows streamed by ``EmbeddingRepository.iter_by_model``."""
+
+    entity_ids: List[str]
+    entity_types: List[str]
+    matrix: np.ndarray
+    category_codes: List[Optional[str]]
+
+
 class EmbeddingRepository:
-    """Repository for embedding operations."""
+    """Repository for embedding operations.
+
+    Vectors are stored as raw little-endian float32 bytes in ``vector_blob``.
+    Rows written before that column existed keep space-separated floats in
+    ``vector`` until ``migrate_text_vectors`` converts them.
+    """
+
+    VECTOR_DTYPE = "float32"
 
     def __init__(self, session: Session):
         self.session = session
@@ -330,6 +348,102 @@ class EmbeddingRepository:
     def _decode_vector(vector_str: str) -> np.ndarray:
         return np.array([float(x) for x in vector_str.split()], dtype=float)
 
+    @staticmethod
+    def _encode_blob(vector: np.ndarray) -> bytes:
+        return np.ascontiguousarray(vector, dtype="<f4").tobytes()
+
+    @staticmethod
+    def _decode_blob(blob: bytes, dim: Optional[int] = None) -> np.ndarray:
+        vector = np.frombuffer(blob, dtype="<f4")
+        if dim is not None and vector.shape[0] != dim:
+            raise ValueError(f"Embedding blob holds {vector.shape[0]} floats, expected {dim}")
+        return vector
+
+    @classmethod
+    def decode_stored(
+        cls,
+        blob: Optional[bytes],
+        vector_str: Optional[str],
+        dim: Optional[int] = None,
+    ) -> np.ndarray:
+        """Decode a row's binary vector, falling back to its legacy text column."""
+        if blob is not None:
+            return cls._decode_blob(blob, dim)
+        return cls._decode_vector(vector_str or "").astype(np.float32)
+
+    @staticmethod
+    def content_hash(text: str, model_version: str) -> str:
+        """Hash of the exact text passed to the encoder, keyed by model."""
+        digest = hashlib.sha256()
+        digest.update(model_version.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(text.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get_vectors_by_hash(
+        self, content_hashes: List[str], model_version: str
+    ) -> Dict[str, np.ndarray]:
+        """Map each known content hash to a stored vector encoded from that text.
+
+        Any entity's row will do: the hash covers the text and the model, not
+        which experience or skill it came from.
+        """
+        if not content_hashes:
+            return {}
+        table = Embedding.__table__
+        rows = self.session.execute(
+            select(
+                table.c.content_hash,
+                table.c.vector_blob,
+                table.c.vector,
+                table.c.vector_dim,
+            ).where(
+                table.c.content_hash.in_(list(set(content_hashes))),
+                table.c.model_version == model_version,
+            )
+        ).all()
+        return {row[0]: self.decode_stored(row[1], row[2], row[3]) for row in rows}
+
+    def upsert(
+        self,
+        entity_id: str,
+        entity_type: str,
+        category_code: str,
+        vector: np.ndarray,
+        model_version: str,
+        content_hash: Optional[str] = None,
+    ) -> None:
+        """Insert or replace the embedding of an entity for ``model_version``."""
+        values = {
+            "entity_id": entity_id,
+            "entity_type": entity_type,
+            "category_code": category_code,
+            "vector": "",
+            "vector_blob": self._encode_blob(vector),
+            "vector_dtype": self.VECTOR_DTYPE,
+            "vector_dim": int(np.asarray(vector).shape[-1]),
+            "content_hash": content_hash,
+            "model_version": model_version,
+            "created_at": utc_now(),
+        }
+        stmt = sqlite_insert(Embedding).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["entity_id", "entity_type", "model_version"],
+            set_={
+                key: stmt.excluded[key]
+                for key in (
+                    "category_code",
+                    "vector",
+                    "vector_blob",
+                    "vector_dtype",
+                    "vector_dim",
+                    "content_hash",
+                    "created_at",
+                )
+            },
+        )
+        self.session.execute(stmt)
+
     def create(
         self,
         entity_id: str,
@@ -338,17 +452,18 @@ class EmbeddingRepository:
         vector: np.ndarray,
         model_version: str,
     ) -> Embedding:
-        embedding = Embedding(
-            entity_id=entity_id,
-            entity_type=entity_type,
-            category_code=category_code,
-            vector=self._encode_vector(vector),
-            model_version=model_version,
-            created_at=utc_now(),
+        """Upsert an embedding and return its (single) row."""
+        self.upsert(entity_id, entity_type, category_code, vector, model_version)
+        return (
+            self.session.query(Embedding)
+            .filter(
+                Embedding.entity_id == entity_id,
+                Embedding.entity_type == entity_type,
+                Embedding.model_version == model_version,
+            )
+            .populate_existing()
+            .one()
         )
-        self.session.add(embedding)
-        self.session.flush()
-        return embedding
 
     def get_by_entity(self, entity_id: str, entity_type: str) -> Optional[Embedding]:
         return (
@@ -407,9 +522,87 @@ class EmbeddingRepository:
             query = query.filter(Embedding.entity_type == entity_type)
         return query.all()
 
+    def iter_by_model(
+        self,
+        model_version: str,
+        entity_type: Optional[str] = None,
+        chunk_size: int = 2000,
+        max_row: Optional[int] = None,
+    ) -> Iterator[EmbeddingChunk]:
+        """Stream embeddings for a model as ``(entity_ids, entity_types, matrix)`` chunks.
+
+        Rows come from a Core ``SELECT`` (no ORM objects) in ``Embedding.id``
+        order, paged by id so no cursor stays open between chunks; each
+        chunk's vectors are decoded into one preallocated float32 matrix.
+        ``max_row`` bounds the scan to rows that existed at some point.
+        """
+        table = Embedding.__table__
+        last_row = 0
+        while True:
+            stmt = select(
+                table.c.id,
+                table.c.entity_id,
+                table.c.entity_type,
+                table.c.category_code,
+                table.c.vector_blob,
+                table.c.vector,
+                table.c.vector_dim,
+            ).where(table.c.model_version == model_version, table.c.id > last_row)
+            if entity_type:
+                stmt = stmt.where(table.c.entity_type == entity_type)
+            if max_row is not None:
+                stmt = stmt.where(table.c.id <= max_row)
+            rows = self.session.execute(stmt.order_by(table.c.id).limit(chunk_size)).all()
+            if not rows:
+                return
+            last_row = rows[-1][0]
+
+            matrix: Optional[np.ndarray] = None
+            for position, row in enumerate(rows):
+                vector = self.decode_stored(row[4], row[5], row[6])
+                if matrix is None:
+                    matrix = np.empty((len(rows), vector.shape[0]), dtype=np.float32)
+                matrix[position] = vector
+            yield EmbeddingChunk(
+                entity_ids=[row[1] for row in rows],
+                entity_types=[row[2] for row in rows],
+                matrix=matrix,
+                category_codes=[row[3] for row in rows],
+            )
+
     def to_numpy(self, embedding: Embedding) -> np.ndarray:
         """Convert an Embedding object to numpy array."""
-        return self._decode_vector(embedding.vector)
+        return self.decode_stored(embedding.vector_blob, embedding.vector, embedding.vector_dim)
+
+    def migrate_text_vectors(self, batch_size: int = 500) -> int:
+        """Convert up to ``batch_size`` legacy text rows to binary vectors.
+
+        Returns the number of rows converted (0 once every row is binary).
+        """
+        rows = (
+            self.session.query(Embedding.id, Embedding.vector)
+            .filter(Embedding.vector_blob.is_(None))
+            .order_by(Embedding.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            return 0
+        updates = []
+        for row_id, vector_str in rows:
+            vector = self._decode_vector(vector_str or "")
+            updates.append(
+                {
+                    "id": row_id,
+                    "vector": "",
+                    "vector_blob": self._encode_blob(vector),
+                    "vector_dtype": self.VECTOR_DTYPE,
+                    "vector_dim": int(vector.shape[0]),
+                }
+            )
+        self.session.bulk_update_mappings(Embedding, updates)
+        self.session.flush()
+        return len(rows)
 
 
 
@@ -15,6 +15,8 @@ from sqlalchemy import (
     JSON,
     Boolean,
     CheckConstraint,
+    Index,
+    LargeBinary,
 )
 from sqlalchemy.orm import declarative_base, relationship
 
@@ -98,12 +100,28 @@ class CategorySkill(Base):
 
 class Embedding(Base):
     __tablename__ = "embeddings"
+    __table_args__ = (
+        # One row per entity and model; EmbeddingRepository.upsert replaces it.
+        Index(
+            "uq_embeddings_entity_model",
+            "entity_id",
+            "entity_type",
+            "model_version",
+            unique=True,
+        ),
+    )
 
     id = Column(Integer, primary_key=True)
     entity_id = Column(String(64), nullable=False, index=True)
     entity_type = Column(String(32), nullable=False)  # experience or skill
     category_code = Column(String(16), nullable=False)
-    vector = Column(String, nullable=False)  # stored as space-separated floats
+    # Legacy space-separated floats; emptied once the row has a binary vector.
+    vector = Column(String, nullable=False, default="")
+    vector_blob = Column(LargeBinary, nullable=True)  # raw little-endian float32
+    vector_dtype = Column(String(16), nullable=True)
+    vector_dim = Column(Integer, nullable=True)
+    # sha256 of the model name and the exact text that was encoded.
+    content_hash = Column(String(64), nullable=True, index=True)
     model_version = Column(String(128), nullable=False)
     created_at = Column(DateTime(timezone=True), default=utc_now, nullable=False)
 
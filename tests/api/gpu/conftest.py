@@ -0,0 +1,96 @@
+"""Fixtures for FAISS index manager tests (need numpy, faiss and sqlalchemy)."""
+import zlib
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("faiss")
+pytest.importorskip("sqlalchemy")
+
+from src.api.gpu.faiss_manager import FAISSIndexManager, FAISSIndexSettings  # noqa: E402
+from src.common.storage.database import Database  # noqa: E402
+
+DIMENSION = 16
+
+
+@pytest.fixture
+def database(tmp_path):
+    db = Database(str(tmp_path / "chl.db"))
+    db.init_database()
+    return db
+
+
+@pytest.fixture
+def make_manager(tmp_path, database):
+    def _make(**settings) -> FAISSIndexManager:
+        return FAISSIndexManager(
+            index_dir=str(tmp_path / "faiss_index"),
+            model_name="test-model",
+            dimension=DIMENSION,
+            session_factory=database.get_session,
+            index_settings=FAISSIndexSettings(**settings),
+        )
+
+    return _make
+
+
+@pytest.fixture
+def random_vectors():
+    def _vectors(count: int, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        vectors = rng.standard_normal((count, DIMENSION)).astype(np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    return _vectors
+
+
+class FakeEncoder:
+    """Stand-in for EmbeddingClient: deterministic vectors per text, records encode calls."""
+
+    batch_size = 64
+    vector_space = "test-model"
+
+    def __init__(self):
+        self.calls = []
+
+    def get_model_version(self) -> str:
+        return "test-model"
+
+    def encode(self, texts):
+        self.calls.append(list(texts))
+        rows = []
+        for text in texts:
+            rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+            vector = rng.standard_normal(DIMENSION).astype(np.float32)
+            rows.append(vector / np.linalg.norm(vector))
+        return np.vstack(rows)
+
+
+@pytest.fixture
+def fake_encoder():
+    return FakeEncoder()
+
+
+@pytest.fixture
+def seed_experiences(database):
+    """Insert pending experiences ``{id: (title, playbook)}`` under category ABC."""
+    from src.common.storage.schema import Category, Experience
+
+    def _seed(items) -> None:
+        with database.session_scope() as session:
+            if session.query(Category).filter(Category.code == "ABC").first() is None:
+                session.add(Category(code="ABC", name="Abc"))
+                session.flush()
+            for entity_id, (title, playbook) in items.items():
+                session.add(
+                    Experience(
+                        id=entity_id,
+                        category_code="ABC",
+                        section="useful",
+                        title=title,
+                        playbook=playbook,
+                        embedding_status="pending",
+                    )
+                )
+
+    return _seed
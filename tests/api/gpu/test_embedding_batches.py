@@ -0,0 +1,48 @@
+"""Pending entries are claimed up to max_count and embedded in batches."""
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from src.api.gpu.embedding_service import EmbeddingService  # noqa: E402
+from src.common.storage.schema import Experience  # noqa: E402
+
+
+def test_process_pending_claims_max_count_and_batches_encode_and_add(
+    database, make_manager, fake_encoder, seed_experiences, monkeypatch
+):
+    manager = make_manager()
+    adds = []
+    real_add = manager.add
+    monkeypatch.setattr(
+        manager, "add", lambda entity_ids, *a, **kw: adds.append(list(entity_ids)) or real_add(entity_ids, *a, **kw)
+    )
+    seed_experiences(
+        {
+            "exp-1": ("Same title", "Same playbook"),
+            "exp-2": ("Same title", "Same playbook"),
+            "exp-3": ("Third", "Playbook three"),
+            "exp-4": ("Fourth", "Playbook four"),
+            "exp-5": ("Fifth", "Playbook five"),
+        }
+    )
+    session = database.get_session()
+    try:
+        service = EmbeddingService(
+            session, fake_encoder, "test-model", faiss_index_manager=manager, batch_size=2
+        )
+        stats = service.process_pending(max_count=3)
+
+        assert stats == {"processed": 3, "succeeded": 3, "failed": 0}
+        # exp-1 and exp-2 share a batch and a text: one encode row for both.
+        assert [len(call) for call in fake_encoder.calls] == [1, 1]
+        assert [len(batch) for batch in adds] == [2, 1]
+        statuses = dict(session.query(Experience.id, Experience.embedding_status))
+        assert sorted(k for k, v in statuses.items() if v == "pending") == ["exp-4", "exp-5"]
+
+        stats = service.process_pending()
+        assert stats == {"processed": 2, "succeeded": 2, "failed": 0}
+        assert [len(call) for call in fake_encoder.calls] == [1, 1, 2]
+        assert len(manager.id_map) == 5
+    finally:
+        session.close()
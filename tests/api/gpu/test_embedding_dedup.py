@@ -0,0 +1,59 @@
+"""One embedding row per (entity, model): upgrade dedup and upsert."""
+import sqlite3
+
+import numpy as np
+
+from src.common.storage.database import Database
+from src.common.storage.repository import EmbeddingRepository
+from src.common.storage.schema import Embedding
+
+
+def _insert(conn, entity_id: str, vector) -> None:
+    conn.execute(
+        "INSERT INTO embeddings (entity_id, entity_type, category_code, vector, vector_blob,"
+        " vector_dtype, vector_dim, model_version, created_at)"
+        " VALUES (?, 'experience', 'ABC', '', ?, 'float32', ?, 'test-model', '2024-01-01 00:00:00')",
+        (entity_id, vector.astype("<f4").tobytes(), vector.shape[0]),
+    )
+
+
+def test_upgrade_keeps_newest_row_per_entity_and_adds_unique_index(tmp_path, random_vectors):
+    path = tmp_path / "chl.db"
+    Database(str(path)).init_database()
+    old, new, other = random_vectors(3)
+    # A database from before the unique index, holding re-embedded duplicates.
+    with sqlite3.connect(path) as conn:
+        conn.execute("DROP INDEX uq_embeddings_entity_model")
+        _insert(conn, "exp-1", old)
+        _insert(conn, "exp-2", other)
+        _insert(conn, "exp-1", new)
+
+    db = Database(str(path))
+    db.init_database()
+
+    with db.session_scope() as session:
+        rows = {row.entity_id: row for row in session.query(Embedding).all()}
+        assert sorted(rows) == ["exp-1", "exp-2"]
+        repo = EmbeddingRepository(session)
+        assert np.array_equal(repo.to_numpy(rows["exp-1"]), new)
+    with sqlite3.connect(path) as conn:
+        assert conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='index' AND name='uq_embeddings_entity_model'"
+        ).fetchone()
+
+
+def test_upsert_replaces_the_row_of_an_entity(database, random_vectors):
+    first, second = random_vectors(2)
+    with database.session_scope() as session:
+        EmbeddingRepository(session).upsert("exp-1", "experience", "ABC", first, "test-model")
+    with database.session_scope() as session:
+        EmbeddingRepository(session).upsert("exp-1", "experience", "XYZ", second, "test-model")
+        # A different model keeps its own row.
+        EmbeddingRepository(session).upsert("exp-1", "experience", "ABC", first, "other-model")
+
+    with database.session_scope() as session:
+        rows = session.query(Embedding).filter(Embedding.model_version == "test-model").all()
+        assert len(rows) == 1
+        assert rows[0].category_code == "XYZ"
+        assert np.array_equal(EmbeddingRepository(session).to_numpy(rows[0]), second)
+        assert session.query(Embedding).count() == 2
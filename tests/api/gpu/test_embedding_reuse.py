@@ -0,0 +1,44 @@
+"""Content-hash reuse: unchanged text skips the encoder but is still indexed."""
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from src.api.gpu.embedding_service import EmbeddingService  # noqa: E402
+from src.common.storage.schema import Embedding, Experience  # noqa: E402
+
+TEXT = ("Pool timeout", "Raise the pool size and set a pool timeout.")
+
+
+def test_hash_hit_skips_encoder_but_still_adds_to_faiss(
+    database, make_manager, fake_encoder, seed_experiences
+):
+    manager = make_manager()
+    seed_experiences({"exp-1": TEXT})
+    session = database.get_session()
+    try:
+        service = EmbeddingService(session, fake_encoder, "test-model", faiss_index_manager=manager)
+        assert service.generate_for_experience("exp-1")
+        assert len(fake_encoder.calls) == 1
+
+        # Same text under another entry, e.g. a re-imported row.
+        seed_experiences({"exp-2": TEXT})
+        assert service.generate_for_experience("exp-2")
+        assert len(fake_encoder.calls) == 1
+
+        reused = manager.reconstruct_ids(manager.id_map.ids_for_entities(["exp-2"]))
+        original = manager.reconstruct_ids(manager.id_map.ids_for_entities(["exp-1"]))
+        assert reused.shape == (1, original.shape[1])
+        assert np.array_equal(reused, original)
+        assert session.get(Experience, "exp-2").embedding_status == "embedded"
+        hashes = {row.entity_id: row.content_hash for row in session.query(Embedding)}
+        assert hashes["exp-1"] == hashes["exp-2"] is not None
+
+        # Edited text misses the cache and is encoded again.
+        session.get(Experience, "exp-2").playbook = "Use a connection pool per worker."
+        session.commit()
+        assert service.generate_for_experience("exp-2")
+        assert len(fake_encoder.calls) == 2
+    finally:
+        session.close()
@@ -0,0 +1,70 @@
+"""Binary float32 embedding columns and the text -> blob background migration."""
+import sqlite3
+
+import numpy as np
+
+from src.common.storage.database import Database
+from src.common.storage.repository import EmbeddingRepository
+from src.common.storage.schema import Embedding
+
+# embeddings as created before vectors were stored as binary float32.
+LEGACY_EMBEDDINGS = (
+    "CREATE TABLE embeddings ("
+    " id INTEGER PRIMARY KEY,"
+    " entity_id VARCHAR(64) NOT NULL,"
+    " entity_type VARCHAR(32) NOT NULL,"
+    " category_code VARCHAR(16) NOT NULL,"
+    " vector VARCHAR NOT NULL,"
+    " model_version VARCHAR(128) NOT NULL,"
+    " created_at DATETIME NOT NULL)"
+)
+
+
+def test_legacy_text_vectors_migrate_to_blobs(tmp_path, random_vectors):
+    path = tmp_path / "legacy.db"
+    vectors = random_vectors(5)
+    with sqlite3.connect(path) as conn:
+        conn.execute(LEGACY_EMBEDDINGS)
+        conn.executemany(
+            "INSERT INTO embeddings (entity_id, entity_type, category_code, vector, model_version, created_at)"
+            " VALUES (?, 'experience', 'ABC', ?, 'test-model', '2024-01-01 00:00:00')",
+            [
+                (f"exp-{i}", EmbeddingRepository._encode_vector(vector))
+                for i, vector in enumerate(vectors)
+            ],
+        )
+
+    db = Database(str(path))
+    db.init_database()  # bootstrap adds vector_blob / vector_dtype / vector_dim
+
+    with db.session_scope() as session:
+        repo = EmbeddingRepository(session)
+        # Text rows still decode before they are converted.
+        legacy = next(repo.iter_by_model("test-model"))
+        np.testing.assert_allclose(legacy.matrix, vectors, atol=1e-7)
+
+        assert repo.migrate_text_vectors(batch_size=3) == 3
+        assert repo.migrate_text_vectors(batch_size=3) == 2
+        assert repo.migrate_text_vectors(batch_size=3) == 0
+
+    with db.session_scope() as session:
+        rows = session.query(Embedding).order_by(Embedding.id).all()
+        assert all(row.vector == "" and row.vector_dim == vectors.shape[1] for row in rows)
+        assert all(row.vector_dtype == "float32" for row in rows)
+        repo = EmbeddingRepository(session)
+        np.testing.assert_allclose(
+            np.vstack([repo.to_numpy(row) for row in rows]), vectors, atol=1e-7
+        )
+        chunk = next(repo.iter_by_model("test-model"))
+        assert chunk.matrix.dtype == np.float32
+        assert chunk.entity_ids == [f"exp-{i}" for i in range(5)]
+
+
+def test_upsert_writes_exact_float32_bytes(database, random_vectors):
+    vector = random_vectors(1)[0]
+    with database.session_scope() as session:
+        EmbeddingRepository(session).upsert("exp-1", "experience", "ABC", vector, "test-model")
+    with database.session_scope() as session:
+        row = session.query(Embedding).one()
+        assert row.vector_blob == vector.astype("<f4").tobytes()
+        assert np.array_equal(EmbeddingRepository(session).to_numpy(row), vector)
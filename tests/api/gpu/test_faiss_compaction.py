@@ -0,0 +1,29 @@
+"""Compaction trigger on the ThreadSafeFAISSManager write path."""
+from src.api.gpu.faiss_manager import ThreadSafeFAISSManager
+
+
+def test_compaction_check_uses_counters_until_threshold(make_manager, random_vectors, monkeypatch):
+    inner = make_manager(rebuild_threshold=0.5)
+    manager = ThreadSafeFAISSManager(inner, save_policy="manual", rebuild_threshold=0.5)
+    ids = [f"exp-{i}" for i in range(20)]
+    manager.add(ids, ["experience"] * 20, random_vectors(20))
+    # The first check seeds the counters from the database.
+    assert inner.estimated_tombstone_ratio() == 0.0
+
+    queries = []
+    real_ratio = inner.get_tombstone_ratio
+    monkeypatch.setattr(
+        inner, "get_tombstone_ratio", lambda: queries.append(1) or real_ratio()
+    )
+
+    manager.add(["exp-0"], ["experience"], random_vectors(1, seed=1))
+    manager.remove(ids[1:5])
+    assert queries == []
+    assert inner.estimated_tombstone_ratio() == 5 / 21
+
+    manager.remove(ids[5:16])
+    assert queries, "crossing the threshold must confirm against the database"
+    thread = manager._compaction_thread
+    if thread is not None:
+        thread.join(timeout=60)
+    manager.shutdown()
@@ -0,0 +1,60 @@
+"""Background ANN migration on ThreadSafeFAISSManager."""
+import pytest
+
+from src.api.gpu.faiss_manager import MIGRATION_RETRY_GROWTH, ThreadSafeFAISSManager
+
+
+@pytest.fixture
+def add(random_vectors):
+    def _add(manager, start: int, count: int) -> None:
+        ids = [f"exp-{i}" for i in range(start, start + count)]
+        manager.add(ids, ["experience"] * count, random_vectors(count, seed=start))
+
+    return _add
+
+
+def _wait_for_migration(manager: ThreadSafeFAISSManager) -> None:
+    thread = manager._migration_thread
+    if thread is not None:
+        thread.join(timeout=60)
+
+
+def test_low_recall_candidate_is_not_retried_on_next_add(make_manager, add, monkeypatch):
+    # min_recall above 1.0 forces every ANN candidate to be rejected.
+    inner = make_manager(index_type="hnsw", ann_threshold=20, min_recall=1.01)
+    manager = ThreadSafeFAISSManager(inner, save_policy="manual")
+
+    add(manager, 0, 40)
+    _wait_for_migration(manager)
+    assert inner.ann_report is not None
+    assert inner.ann_report["switched"] is False
+    assert inner.index_kind() == "flat"
+
+    builds = []
+    real_build = inner.build_index
+    monkeypatch.setattr(
+        inner, "build_index", lambda *a, **kw: builds.append(a) or real_build(*a, **kw)
+    )
+
+    add(manager, 40, 1)
+    _wait_for_migration(manager)
+    assert inner.migration_target() is None
+    assert builds == []
+
+    # Enough growth makes the candidate worth another try.
+    monkeypatch.setattr(manager, "_maybe_start_migration", lambda: None)
+    add(manager, 41, int(40 * MIGRATION_RETRY_GROWTH))
+    assert inner.migration_target() == ("hnsw", "float32")
+    manager.shutdown()
+
+
+def test_settings_change_clears_rejection(make_manager, add):
+    inner = make_manager(index_type="hnsw", ann_threshold=20, min_recall=1.01)
+    manager = ThreadSafeFAISSManager(inner, save_policy="manual")
+    add(manager, 0, 40)
+    _wait_for_migration(manager)
+    assert inner.migration_target() is None
+
+    inner.index_settings.min_recall = 0.5
+    assert inner.migration_target() == ("hnsw", "float32")
+    manager.shutdown()
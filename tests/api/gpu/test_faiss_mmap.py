@@ -0,0 +1,52 @@
+"""Saving an index loaded through a read-only mmap (CHL_FAISS_MMAP)."""
+
+
+def _add(manager, start: int, count: int, random_vectors):
+    ids = [f"exp-{i}" for i in range(start, start + count)]
+    vectors = random_vectors(count, seed=start)
+    manager.add(ids, ["experience"] * count, vectors)
+    return ids, vectors
+
+
+def _top_entity(manager, vector) -> str:
+    _, internal_ids = manager.search(vector, top_k=1)
+    return manager.get_entity_id(int(internal_ids[0]))["entity_id"]
+
+
+def test_mmap_add_then_save_merges_overlay(make_manager, random_vectors):
+    first = make_manager(mmap=True)
+    _add(first, 0, 10, random_vectors)
+    first.save()
+
+    mapped = make_manager(mmap=True)
+    assert mapped.index.ntotal == 10
+    assert mapped._mapped
+    ids, vectors = _add(mapped, 10, 5, random_vectors)
+    mapped.save()
+
+    assert mapped.ntotal == 15
+    assert _top_entity(mapped, vectors[0]) == ids[0]
+    reopened = make_manager(mmap=True)
+    assert reopened.ntotal == 15
+    assert _top_entity(reopened, vectors[-1]) == ids[-1]
+
+
+def test_mmap_wal_replay_on_restart_checkpoints(make_manager, random_vectors):
+    first = make_manager(mmap=True, wal=True)
+    _add(first, 0, 10, random_vectors)
+    first.save()
+    # Logged but never checkpointed: the process "crashes" here.
+    ids, vectors = _add(first, 10, 3, random_vectors)
+    first.wal.close()
+
+    restarted = make_manager(mmap=True, wal=True)
+    assert restarted.index.ntotal == 10
+    assert restarted._mapped
+    assert restarted.replay_wal() == 1
+    restarted.save()
+
+    assert restarted.ntotal == 13
+    assert _top_entity(restarted, vectors[1]) == ids[1]
+    again = make_manager(mmap=True, wal=True)
+    assert again.replay_wal() == 0
+    assert again.ntotal == 13
@@ -0,0 +1,38 @@
+"""Shadow rebuild from streamed embedding chunks."""
+import numpy as np
+
+from src.api.gpu.faiss_manager import ShadowRebuild
+from src.common.storage.repository import EmbeddingChunk
+
+
+def test_build_shadow_keeps_latest_vector_without_copying(make_manager, random_vectors, monkeypatch):
+    manager = make_manager()
+    vectors = random_vectors(6)
+    chunks = [
+        EmbeddingChunk(["a", "b", "c"], ["experience"] * 3, vectors[:3], ["X", "X", "X"]),
+        # "a" again (latest wins), twice within one chunk for "d".
+        EmbeddingChunk(["a", "d", "d"], ["experience", "skill", "skill"], vectors[3:], ["Y", "Z", "Z"]),
+    ]
+    monkeypatch.setattr(manager, "iter_embedding_chunks", lambda max_row, chunk_size: iter(chunks))
+
+    built = {}
+    real_build = manager.build_index
+
+    def capture(kind, ids, matrix, storage=None):
+        built["vectors"] = matrix
+        return real_build(kind, ids, matrix, storage)
+
+    monkeypatch.setattr(manager, "build_index", capture)
+
+    plan = ShadowRebuild(base_id=100, max_row=6, rows=4, kind="flat", storage="float32")
+    shadow = manager.build_shadow(plan)
+
+    assert shadow.index.ntotal == 4
+    # Sized to the live count up front: the matrix handed to FAISS is the buffer itself.
+    assert built["vectors"].shape == (4, vectors.shape[1])
+    assert built["vectors"].base is None
+    mappings = dict(zip(["a", "b", "c", "d"], shadow.id_map.gather(list(range(100, 104)))))
+    assert mappings["a"]["category_code"] == "Y"
+    np.testing.assert_allclose(built["vectors"][0], vectors[3])
+    np.testing.assert_allclose(built["vectors"][3], vectors[5])
+    assert mappings["d"]["entity_type"] == "skill"
@@ -0,0 +1,47 @@
+"""Filtered-search selector cache under concurrent searches."""
+import threading
+
+from src.api.gpu.faiss_manager import ThreadSafeFAISSManager
+
+
+def test_concurrent_filtered_searches_share_one_selector(make_manager, random_vectors):
+    inner = make_manager()
+    manager = ThreadSafeFAISSManager(inner, save_policy="manual")
+    count = 50
+    manager.add(
+        [f"id-{i}" for i in range(count)],
+        ["experience" if i % 2 else "skill" for i in range(count)],
+        random_vectors(count),
+        [f"C{i % 3}" for i in range(count)],
+    )
+    query = random_vectors(1, seed=7)[0]
+    filters = [("experience", None), ("skill", "C1"), (None, "C2")]
+    expected = {f: manager.search(query, 5, *f) for f in filters}
+    inner._selectors = {}
+    inner._selectors_version = -1
+
+    seen, errors = [], []
+    barrier = threading.Barrier(12)
+
+    def worker(n: int) -> None:
+        try:
+            barrier.wait()
+            for _ in range(20):
+                f = filters[n % len(filters)]
+                scores, ids = manager.search(query, 5, *f)
+                assert (ids == expected[f][1]).all()
+                seen.append((f, id(inner._selector_for(*f))))
+        except Exception as exc:  # surfaced below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert set(inner._selectors) == set(filters)
+    # Each filter resolved to exactly one cached selector across all threads.
+    assert len({entry for entry in seen}) == len(filters)
+    manager.shutdown()
@@ -0,0 +1,42 @@
+"""Compressed (sq8) storage: background migration and exact re-scoring."""
+import numpy as np
+
+from src.api.gpu.faiss_manager import ThreadSafeFAISSManager
+from src.common.storage.repository import EmbeddingRepository
+
+COUNT = 1000  # sq8 trains once this many vectors exist
+
+
+def test_sq8_migration_rescores_shortlist_exactly(make_manager, database, random_vectors):
+    ids = [f"exp-{i}" for i in range(COUNT)]
+    vectors = random_vectors(COUNT)
+    # Re-scoring reads the float32 originals from the embeddings table.
+    with database.session_scope() as session:
+        repo = EmbeddingRepository(session)
+        for entity_id, vector in zip(ids, vectors):
+            repo.upsert(entity_id, "experience", "ABC", vector, "test-model")
+
+    inner = make_manager(storage="sq8", rescore_factor=4, min_recall=0.5)
+    manager = ThreadSafeFAISSManager(inner, save_policy="manual")
+    manager.add(ids, ["experience"] * COUNT, vectors)
+    if manager._migration_thread is not None:
+        manager._migration_thread.join(timeout=120)
+
+    assert inner.ann_report["switched"] is True
+    assert inner.storage == "sq8"
+    assert inner.migration_target() is None
+
+    query = random_vectors(1, seed=99)[0]
+    scores, internal_ids = manager.search(query, top_k=10)
+    hits = [inner.get_entity_id(int(i))["entity_id"] for i in internal_ids]
+    exact = {entity_id: float(vector @ query) for entity_id, vector in zip(ids, vectors)}
+
+    # Scores are exact inner products (not sq8 decodes), in descending order.
+    np.testing.assert_allclose(scores, [exact[h] for h in hits], rtol=1e-5, atol=1e-6)
+    assert list(scores) == sorted(scores, reverse=True)
+    assert hits[0] == max(exact, key=exact.get)
+
+    # The storage choice survives a reload from disk.
+    assert make_manager(storage="sq8").index.ntotal == COUNT
+    assert make_manager(storage="sq8").storage == "sq8"
+    manager.shutdown()
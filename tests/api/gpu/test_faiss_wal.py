@@ -0,0 +1,64 @@
+"""FAISS write-ahead log: replay after a crash, torn tails and stale logs."""
+import os
+
+
+def _add(manager, start: int, count: int, random_vectors):
+    ids = [f"exp-{i}" for i in range(start, start + count)]
+    vectors = random_vectors(count, seed=start)
+    manager.add(ids, ["experience"] * count, vectors)
+    return ids, vectors
+
+
+def _crash(manager) -> None:
+    """Drop the manager without a checkpoint, as a killed process would."""
+    manager.wal.close()
+
+
+def test_replay_restores_writes_logged_before_any_checkpoint(make_manager, random_vectors):
+    first = make_manager(wal=True)
+    for start in range(0, 5):
+        _add(first, start, 1, random_vectors)
+    first.remove(["exp-4"])
+    _crash(first)
+
+    restarted = make_manager(wal=True)
+    # Loading creates the missing index; it must not log a reset ahead of replay.
+    assert restarted.index.ntotal == 0
+    assert restarted.replay_wal() == 6
+
+    assert len(restarted.id_map) == 4
+    _, internal_ids = restarted.search(random_vectors(1, seed=2)[0], top_k=1)
+    assert restarted.get_entity_id(int(internal_ids[0]))["entity_id"] == "exp-2"
+
+
+def test_torn_tail_is_truncated_and_earlier_records_replay(make_manager, random_vectors):
+    first = make_manager(wal=True)
+    _add(first, 0, 3, random_vectors)
+    _add(first, 3, 2, random_vectors)
+    _crash(first)
+    intact = first.wal.size_bytes
+    with open(first.wal.path, "ab") as fh:
+        # Frame header promising more bytes than were written before the crash.
+        fh.write(first.wal._FRAME.pack(first.wal._MAGIC, 64, 4096) + b'{"op": "add"')
+
+    restarted = make_manager(wal=True)
+    assert restarted.replay_wal() == 2
+    assert restarted.ntotal == 5
+    assert restarted.wal.size_bytes == intact
+
+
+def test_log_for_a_replaced_index_file_is_discarded(make_manager, random_vectors):
+    first = make_manager(wal=True)
+    _add(first, 0, 10, random_vectors)
+    first.save()
+    _add(first, 10, 3, random_vectors)
+    _crash(first)
+    # The index file changes underneath the log, e.g. a backup restore.
+    stat = first.index_path.stat()
+    os.utime(first.index_path, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10**9))
+
+    restarted = make_manager(wal=True)
+    assert not restarted.wal.has_pending()
+    assert restarted.replay_wal() == 0
+    assert restarted.ntotal == 10
+    assert not restarted.wal.has_pending()
@@ -0,0 +1,28 @@
+"""Inference runtime selection and the vector cache key it implies."""
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from src.api.gpu.embedding_client import EmbeddingClient  # noqa: E402
+from src.api.gpu.onnx_backend import resolve_runtime  # noqa: E402
+
+
+def _client(runtime: str) -> EmbeddingClient:
+    client = EmbeddingClient.__new__(EmbeddingClient)
+    client.model_repo, client.quantization, client.runtime = "Qwen/Qwen3-Embedding-0.6B", "Q8_0", runtime
+    return client
+
+
+def test_runtime_defaults_to_torch():
+    assert resolve_runtime("") == "torch"
+    assert resolve_runtime(None) == "torch"
+
+
+def test_onnx_vectors_never_share_cache_keys_with_torch():
+    torch_client, onnx_client = _client("torch"), _client("onnx")
+
+    # torch keeps the plain model version, so existing content hashes stay valid.
+    assert torch_client.vector_space == torch_client.get_model_version()
+    assert onnx_client.vector_space != torch_client.vector_space
+    assert onnx_client.get_model_version() == torch_client.get_model_version()
@@ -0,0 +1,106 @@
+"""A skipped (dominant-hit) rerank must still return reranker-scale scores."""
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from src.api.gpu.rerank_policy import AdaptiveRerankPolicy  # noqa: E402
+from src.api.gpu.search_provider import VectorFAISSProvider  # noqa: E402
+from src.api.services.search_service import SearchService  # noqa: E402
+
+# Experiences: e1 dominates on vector score, so the policy skips deeper reranking.
+VECTOR_HITS = {
+    "experience": [("e1", 0.95), ("e2", 0.50), ("e3", 0.45)],
+    "skill": [("s1", 0.60), ("s2", 0.58)],
+}
+RERANK_SCORES = {"e1": 0.30, "e2": 0.90, "e3": 0.80, "s1": 0.70, "s2": 0.20}
+
+
+class _IndexManager:
+    is_available = True
+
+    def __init__(self):
+        self._mappings = {}
+
+    def search(self, query_embedding, top_k, entity_type=None, category_code=None):
+        hits = VECTOR_HITS[entity_type][:top_k]
+        ids = []
+        for entity_id, _ in hits:
+            internal_id = len(self._mappings)
+            self._mappings[internal_id] = {"entity_id": entity_id, "entity_type": entity_type}
+            ids.append(internal_id)
+        return np.array([score for _, score in hits], dtype=np.float32), np.array(ids)
+
+    def get_entity_ids(self, internal_ids):
+        return [self._mappings.get(int(internal_id)) for internal_id in internal_ids]
+
+
+class _EmbeddingClient:
+    vector_space = "fake-embedder"
+
+    def get_model_version(self):
+        return "fake-embedder"
+
+    def encode(self, texts):
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+class _Reranker:
+    def __init__(self):
+        self.calls = []
+
+    def rerank(self, query, documents, batch_size=None):
+        self.calls.append(list(documents))
+        return [RERANK_SCORES[document] for document in documents]
+
+
+def _provider(reranker, topk_rerank=40):
+    provider = VectorFAISSProvider(
+        index_manager=_IndexManager(),
+        embedding_client=_EmbeddingClient(),
+        model_name="fake-embedder",
+        reranker_client=reranker,
+        topk_rerank=topk_rerank,
+        rerank_policy=AdaptiveRerankPolicy(dominance_margin=0.2, tier_size=8, depth_factor=3),
+    )
+    provider._candidate_texts = lambda session, candidates: [c["entity_id"] for c in candidates]
+    return provider
+
+
+def test_skipped_rerank_keeps_scores_on_reranker_scale_in_unified_search():
+    service = SearchService(primary_provider="vector_faiss", vector_provider=_provider(_Reranker()))
+
+    response = service.unified_search(
+        session=None, query="pool timeout", types=["experience", "skill"], min_score=0.5
+    )
+
+    results = response["results"]
+    assert all(result.score == RERANK_SCORES[result.entity_id] for result in results)
+    # Raw FAISS scores (e1 at 0.95) would have outranked and outlived min_score.
+    assert [result.entity_id for result in results] == ["e2", "e3", "s1"]
+
+
+def test_skipped_rerank_scores_only_the_top_k_head():
+    reranker = _Reranker()
+    provider = _provider(reranker, topk_rerank=2)
+
+    results = provider.search(session=None, query="pool timeout", entity_type="experience", top_k=1)
+
+    assert reranker.calls == [["e1"]]
+    assert [(result.entity_id, result.score) for result in results] == [("e1", RERANK_SCORES["e1"])]
+
+
+def test_policy_skip_returns_head_scores():
+    policy = AdaptiveRerankPolicy(dominance_margin=0.2, tier_size=8, depth_factor=3)
+    ranges = []
+
+    def score_range(start, end):
+        ranges.append((start, end))
+        return [float(pos) for pos in range(start, end)]
+
+    plan = policy.run([0.9, 0.5, 0.4, 0.3], top_k=2, score_range=score_range)
+
+    assert plan.skipped and plan.depth == 2
+    assert plan.scores == [0.0, 1.0]
+    assert ranges == [(0, 2)]
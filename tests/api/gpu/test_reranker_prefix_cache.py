@@ -0,0 +1,119 @@
+"""Prefix-cached reranker scores must match the flat (uncached) path.
+
+Uses a tiny randomly initialised Qwen2 model and a locally trained BPE
+tokenizer, so no model download is needed.
+"""
+from types import SimpleNamespace
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+tokenizers = pytest.importorskip("tokenizers")
+
+from src.api.gpu import reranker_client as reranker_module  # noqa: E402
+from src.api.gpu.reranker_client import RerankerClient  # noqa: E402
+
+QUERIES = [
+    {"search": "database connection timeout", "task": "Fix intermittent timeouts in a web service"},
+    {"search": "flaky tests, race condition", "task": "Stabilize a test suite that fails randomly"},
+    {"search": "", "task": "Write a clear bug report"},
+]
+DOCUMENTS = [
+    "Increase the connection pool size and set a pool timeout.",
+    "Use a thread-safe logger and add deterministic seeds when tests depend on ordering.",
+    "Include reproduction steps, expected vs actual behavior and environment details.",
+    "Prefer short functions.",
+    "Retry with backoff " * 12,
+]
+TOLERANCE = 1e-4
+
+
+def _tokenizer():
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+
+    tok = Tokenizer(models.BPE())
+    tok.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tok.decoder = decoders.ByteLevel()
+    trainer = trainers.BpeTrainer(
+        vocab_size=400,
+        special_tokens=["<pad>", "<|im_start|>", "<|im_end|>"],
+        initial_alphabet=pre_tokenizers.ByteLevel.alphabet(),
+    )
+    corpus = [f"{query['search']} {query['task']}" for query in QUERIES] + DOCUMENTS
+    tok.train_from_iterator(corpus * 4, trainer)
+    fast = transformers.PreTrainedTokenizerFast(
+        tokenizer_object=tok, pad_token="<pad>", padding_side="left"
+    )
+    fast.add_tokens(["yes", "no"])
+    return fast
+
+
+@pytest.fixture(scope="module")
+def tiny_reranker_parts():
+    tokenizer = _tokenizer()
+    torch.manual_seed(0)
+    config = transformers.Qwen2Config(
+        vocab_size=len(tokenizer),
+        hidden_size=32,
+        intermediate_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        num_key_value_heads=2,
+        max_position_embeddings=1024,
+    )
+    model = transformers.AutoModelForCausalLM.from_config(config, attn_implementation="eager")
+    return tokenizer, model
+
+
+@pytest.fixture
+def make_client(monkeypatch, tiny_reranker_parts):
+    tokenizer, model = tiny_reranker_parts
+    monkeypatch.setattr(
+        reranker_module, "AutoTokenizer", SimpleNamespace(from_pretrained=lambda *a, **k: tokenizer)
+    )
+    monkeypatch.setattr(
+        reranker_module, "AutoModelForCausalLM", SimpleNamespace(from_pretrained=lambda *a, **k: model)
+    )
+
+    def _make(prefix_cache: bool) -> RerankerClient:
+        # Small row limit so every path runs several padded batches.
+        return RerankerClient(
+            model_repo="tiny-reranker", quantization="", batch_size=2, prefix_cache=prefix_cache
+        )
+
+    return _make
+
+
+def _assert_close(cached, flat):
+    assert [len(job) for job in cached] == [len(job) for job in flat]
+    for cached_job, flat_job in zip(cached, flat):
+        for a, b in zip(cached_job, flat_job):
+            assert abs(a - b) <= TOLERANCE
+
+
+def test_single_job_prefix_cache_matches_flat_scores(make_client):
+    jobs = [(QUERIES[0], DOCUMENTS)]
+
+    _assert_close(make_client(True).rerank_many(jobs), make_client(False).rerank_many(jobs))
+
+
+def test_merged_jobs_prefix_cache_matches_flat_scores(make_client):
+    jobs = [(query, DOCUMENTS) for query in QUERIES] + [(QUERIES[0], [])]
+
+    _assert_close(make_client(True).rerank_many(jobs), make_client(False).rerank_many(jobs))
+
+
+def test_merged_jobs_share_the_system_prefix_pass(make_client, monkeypatch):
+    client = make_client(True)
+    client.rerank(QUERIES[0], DOCUMENTS[:1])  # computes the system block KV once
+    prefix_runs = []
+    original = client._prefix_kv
+    monkeypatch.setattr(
+        client, "_prefix_kv", lambda *args, **kwargs: prefix_runs.append(1) or original(*args, **kwargs)
+    )
+
+    client.rerank_many([(query, DOCUMENTS) for query in QUERIES])
+
+    # Merged jobs go straight after the cached system block: no per-job query pass.
+    assert prefix_runs == []
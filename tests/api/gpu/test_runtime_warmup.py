@@ -0,0 +1,68 @@
+"""GPU runtime warm-up must only report ready when vector search came up."""
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from src.api.gpu import runtime as gpu_runtime  # noqa: E402
+from src.common.interfaces.runtime import ModeRuntime  # noqa: E402
+
+
+class _Adapter:
+    def attach(self, **components):
+        self.components = components
+
+
+def _warming_runtime():
+    runtime = ModeRuntime(
+        search_service=None,
+        thread_safe_faiss=None,
+        operations_mode_adapter=_Adapter(),
+        status="warming",
+    )
+    exposed = []
+    runtime.when_ready(lambda rt: exposed.append(rt.status))
+    return runtime, exposed
+
+
+def test_failed_warm_up_reports_failed_with_error(monkeypatch):
+    def _boom(config, db):
+        raise RuntimeError("model download failed")
+
+    monkeypatch.setattr(gpu_runtime, "_build_embedding_stack", _boom)
+    runtime, exposed = _warming_runtime()
+
+    gpu_runtime._warm_up_runtime(runtime, config=None, db=None, worker_control=None)
+
+    assert runtime.status == "failed"
+    assert not runtime.is_ready
+    assert "model download failed" in runtime.error
+    # Waiters are still released so app state reflects the outcome.
+    assert exposed == ["failed"]
+
+
+def test_warm_up_without_vector_provider_is_degraded(monkeypatch):
+    monkeypatch.setattr(gpu_runtime, "_build_embedding_stack", lambda config, db: (None, None, None, None))
+    monkeypatch.setattr(gpu_runtime, "_start_vector_migration", lambda db: None)
+    monkeypatch.setattr(gpu_runtime, "_build_worker_stack", lambda *args: (None, None))
+    runtime, exposed = _warming_runtime()
+
+    gpu_runtime._warm_up_runtime(runtime, config=None, db=None, worker_control=None)
+
+    assert runtime.status == "degraded"
+    assert runtime.error
+    assert exposed == ["degraded"]
+
+
+def test_successful_warm_up_marks_ready(monkeypatch):
+    provider = object()
+    monkeypatch.setattr(gpu_runtime, "_build_embedding_stack", lambda config, db: (object(), object(), None, provider))
+    monkeypatch.setattr(gpu_runtime, "_start_vector_migration", lambda db: None)
+    monkeypatch.setattr(gpu_runtime, "_build_worker_stack", lambda *args: (None, None))
+    runtime, exposed = _warming_runtime()
+
+    gpu_runtime._warm_up_runtime(runtime, config=None, db=None, worker_control=None)
+
+    assert runtime.status == "ready"
+    assert runtime.error is None
+    assert exposed == ["ready"]